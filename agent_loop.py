@@ -0,0 +1,51 @@
+import config
+import utils
+
+
+def step(ego, agent, decision, controller, watchdog, episode=None, next_destination=None, metrics=None):
+    """One control frame, shared by main.py, replay_episode and the scenario executor.
+
+    Runs after world.tick() between watchdog.begin() and watchdog.end():
+    destination (when the route is done), agent, emergency brake override,
+    then applies and records the control. Returns (control, decision state, ttc).
+    """
+    if episode: episode.on_tick()
+    state = agent.state
+    if next_destination is not None and agent.route is None:
+        watchdog.deferrable("destination", next_destination)  # Draws only when it runs
+    control = watchdog.critical("agent", agent.tick)
+
+    # Emergency brake overrides the agent's longitudinal command
+    seen = agent.obstacle_dist < config.RADAR_RANGE
+    dstate, ttc = watchdog.critical("decision", decision.decide,
+                                    agent.obstacle_dist if seen else None, agent.obstacle_vel)
+    if dstate == "EMERGENCY" and ttc < config.WATCHDOG_EMERGENCY_TTC:
+        brake = controller.get_control(dstate, ttc)
+        control.throttle, control.brake = brake.throttle, brake.brake
+    ego.apply_control(control)
+    if episode: episode.record(control, ego)
+
+    # Live metrics: ring/counter writes only, the server thread does the rest
+    if metrics:
+        metrics.inc("agent_ticks_total")
+        metrics.observe("agent_radar_points", agent.radar.tick_points)
+        if agent.state != state:
+            metrics.inc("agent_state_transitions_total", from_state=state, to_state=agent.state)
+    return control, dstate, ttc
+
+
+def respawn_obstacle(world, ego, respawn, watchdog, last_spawn, episode=None, metrics=None):
+    """Scenario respawn: an obstacle respawn[1] m ahead every respawn[0] s of sim time.
+
+    Deferrable, so a tight frame retries on the next one. Returns (the new
+    obstacle or None, sim time of the last spawn).
+    """
+    now = utils.sim_time(world)
+    if not respawn or now - last_spawn <= respawn[0]:
+        return None, last_spawn
+    obstacle = watchdog.deferrable("spawn_obstacle", utils.spawn_obstacle, world, ego,
+                                   distance=respawn[1], episode=episode, fallback=False, reuse=False)
+    if obstacle is False:
+        return None, last_spawn
+    if metrics: metrics.inc("agent_obstacles_spawned_total")
+    return obstacle, now
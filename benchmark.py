@@ -0,0 +1,309 @@
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import numpy as np
+
+# Benchmarks never need a server: always run against the stand-in module
+import fake_carla
+fake_carla.install()
+
+import carla
+import config
+
+BENCHMARKS = []  # (name, factory); factory() returns a zero-arg callable to time
+POINT_COUNTS = (100, 1000, 10000)  # Default synthetic radar frame sizes
+
+
+def benchmark(name):
+    def register(factory):
+        BENCHMARKS.append((name, factory))
+        return factory
+    return register
+
+
+def synthetic_frame(n_points, rng, frame=0):
+    """Radar measurement with n_points random detections (CARLA raw layout)."""
+    pts = np.empty((n_points, 4), dtype=np.float32)
+    pts[:, 0] = rng.uniform(-15.0, 5.0, n_points)                                  # velocity
+    pts[:, 1] = rng.uniform(-0.26, 0.26, n_points)                                 # azimuth
+    pts[:, 2] = rng.uniform(-0.09, 0.09, n_points)                                 # altitude
+    pts[:, 3] = rng.uniform(1.0, config.RADAR_RANGE, n_points)                     # depth
+    return carla.RadarMeasurement(frame, frame * config.FIXED_DELTA_SECONDS, carla.Transform(), pts)
+
+
+def timeit(fn, min_time=0.05, repeat=5):
+    """Best per-call time (s) over `repeat` runs of an auto-sized loop."""
+    fn()  # Warm-up (lazy imports, caches)
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        dt = time.perf_counter() - t0
+        if dt >= min_time:
+            break
+        number *= 2 if dt <= 0 else max(2, int(min_time / dt) + 1)
+    best = dt / number
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / number)
+    return best
+
+
+def sim_world():
+    """Fresh stand-in world with a spawned ego (and radar-visible obstacle ahead)."""
+    import utils
+    client = carla.Client()
+    world = utils.setup_world(client, prefetch=False)
+    ego = utils.spawn_safe_ego(world, rng=random.Random(0))
+    utils.spawn_obstacle(world, ego, distance=60.0)
+    return world, ego
+
+
+# ---------------------------------------------------------------------------
+# Micro-benchmarks
+
+def register_radar(n):
+    """Radar decoding benchmarks on synthetic frames of n points."""
+    @benchmark(f"radar_process_{n}")
+    def _():
+        from radar_processor import RadarProcessor
+        proc = RadarProcessor()
+        data = synthetic_frame(n, np.random.default_rng(0))
+        return lambda: proc.process(data)
+
+    @benchmark(f"radar_closest_in_lane_{n}")
+    def _():
+        from radar_processor import decode, closest_in_lane
+        data = synthetic_frame(n, np.random.default_rng(0))
+        return lambda: closest_in_lane(decode(data))
+
+    @benchmark(f"agent_obstacle_dist_{n}")
+    def _():
+        from simple_agent import SimpleAgent
+        world, ego = sim_world()
+        agent = SimpleAgent(world, ego)
+        agent.radar.destroy()  # Only the synthetic frames below
+        data = synthetic_frame(n, np.random.default_rng(0))
+
+        def run():
+            agent.radar.queue.put((0, data))
+            agent._get_obstacle_dist()
+        return run
+
+
+@benchmark("bspline")
+def _():
+    from bspline_planner import BSplinePlanner
+    pts = [carla.Location(x=0.0), carla.Location(x=15.0), carla.Location(x=35.0, y=6.0),
+           carla.Location(x=70.0, y=6.0)]
+    planner = BSplinePlanner()
+    return lambda: planner._bspline(pts)
+
+
+@benchmark("path_follower_tick")
+def _():
+    from path_follower import PathFollower
+    world, ego = sim_world()
+    loc = ego.get_location()
+    fwd = ego.get_transform().get_forward_vector()
+    path = [carla.Location(x=loc.x + fwd.x * s, y=loc.y + fwd.y * s, z=loc.z) for s in np.arange(0.0, 200.0, 0.5)]
+    follower = PathFollower(ego)
+    follower.set_path(path)
+
+    def run():
+        follower.index = 0  # Lookahead search restarts from the path start
+        follower.tick()
+    return run
+
+
+@benchmark("mpc_steer")
+def _():
+    from mpc_lateral import MPCLateral
+    s = np.arange(0.0, 200.0, 0.5)
+    mpc = MPCLateral()
+    mpc.set_path(np.column_stack([s, 3.5 * np.sin(s / 30.0)]))
+    mpc.gain(10.0)  # Cached per speed bin; timed solves reuse it
+    return lambda: mpc.steer(20.0, 1.0, 0.05, 10.0)
+
+
+@benchmark("collision_check_100x30")
+def _():
+    from collision_checker import CollisionChecker
+    rng = np.random.default_rng(0)
+    cc = CollisionChecker()
+    m = 40
+    cc.set_obstacles(rng.uniform([-50, -12], [250, 12], (m, 2)), rng.uniform(-0.2, 0.2, m),
+                     (2.3, 1.0), np.column_stack([rng.uniform(3, 10, m), np.zeros(m)]))
+    x = np.linspace(0.0, 70.0, 30)
+    paths = np.stack([np.column_stack([x, o * np.clip((x - 15) / 20, 0, 1)]) for o in rng.uniform(-8, 8, 100)])
+    return lambda: cc.check(paths, speed=10.0)
+
+
+@benchmark("route_query")
+def _():
+    import utils
+    world, ego = sim_world()
+    planner = utils.get_route_planner(world)
+    spawns = utils.get_map(world).get_spawn_points()
+    pairs = [(spawns[i].location, spawns[(i * 7 + 3) % len(spawns)].location) for i in range(len(spawns))]
+    it = iter(range(1 << 62))
+    return lambda: planner.route(*pairs[next(it) % len(pairs)])
+
+
+@benchmark("scenario_compile")
+def _():
+    import scenarios
+    world, ego = sim_world()
+    spec = dict(scenarios.DEFAULT, seed=0, traffic=20, obstacles=[{"distance": 120.0}, {"distance": 60.0, "offset": 1.0}])
+    it = iter(range(1 << 62))
+    return lambda: scenarios.compile_plan(world, dict(spec, seed=next(it)))
+
+
+def _newfile():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import pygame
+    import newfile
+    newfile.init_display()
+    player = newfile.PlayerCar(newfile.LANE_CENTERS[1], 500)
+    player.current_speed = newfile.CRUISE_SPEED
+    traffic = pygame.sprite.Group()
+    rng = random.Random(0)
+    for lane in newfile.LANE_CENTERS:
+        traffic.add(newfile.Car(lane, rng.randint(-600, 300), newfile.BLUE, rng.choice(newfile.TRAFFIC_SPEEDS)))
+    return newfile, player, traffic
+
+
+@benchmark("player_is_lane_free")
+def _():
+    _, player, traffic = _newfile()
+    return lambda: player.is_lane_free(2, traffic)
+
+
+@benchmark("player_drive")
+def _():
+    _, player, traffic = _newfile()
+    return lambda: player.drive(traffic)
+
+
+@benchmark("plan_overtake")
+def _():
+    _, player, traffic = _newfile()
+    return lambda: player.plan_overtake(2)
+
+
+@benchmark("overtake_env_step_1024")
+def _():
+    from overtake_env import OvertakeEnv
+    env = OvertakeEnv(1024, seed=0)
+    return env.step
+
+
+# ---------------------------------------------------------------------------
+# Macro-benchmarks (reported as time per tick; ticks/s printed alongside)
+
+@benchmark("agent_tick")
+def _():
+    from simple_agent import SimpleAgent
+    world, ego = sim_world()
+    agent = SimpleAgent(world, ego)
+    agent.set_destination(world.get_map().get_spawn_points()[5].location)
+
+    def run():
+        world.tick()
+        ego.apply_control(agent.tick())
+    return run
+
+
+@benchmark("world_tick_only")
+def _():
+    world, ego = sim_world()
+    return world.tick
+
+
+# ---------------------------------------------------------------------------
+
+def run(names=None, min_time=0.05):
+    import event_log
+    results = {}
+    for name, factory in BENCHMARKS:
+        if names and not any(n in name for n in names):
+            continue
+        try:
+            fn = factory()
+        except ImportError as e:
+            print(f"⏭️  {name:<28} skipped ({e})")
+            continue
+        secs = timeit(fn, min_time=min_time)
+        results[name] = secs * 1e6
+        print(f"⏱️  {name:<28} {secs * 1e6:12.2f} us   ({1.0 / secs:12.0f} /s)")
+    event_log.shutdown()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print per-benchmark ratios against a baseline. Returns names that regressed."""
+    worse = []
+    for name, us in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        ratio = us / base if base > 0 else float("inf")
+        if ratio > 1.0 + tolerance:
+            mark = "❌"
+            worse.append(name)
+        elif ratio < 1.0 - tolerance:
+            mark = "✅"
+        else:
+            mark = "  "
+        print(f"{mark} {name:<28} {base:12.2f} -> {us:12.2f} us  ({ratio:5.2f}x)")
+    return worse
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server-free micro/macro benchmarks")
+    parser.add_argument("filter", nargs="*", help="Only run benchmarks whose name contains one of these")
+    parser.add_argument("--save", help="Write results as a JSON baseline")
+    parser.add_argument("--compare", help="JSON baseline to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before a regression (0.2 = 20%%)")
+    parser.add_argument("--points", type=int, nargs="+", default=list(POINT_COUNTS),
+                        help="Synthetic radar frame sizes")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Min seconds per timing run")
+    args = parser.parse_args()
+
+    # Keep benchmark output readable: events go to a file
+    config.LOG_FILE = os.devnull
+    for n in args.points:
+        register_radar(n)
+    results = run(args.filter, args.min_time)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2)
+        print(f"💾 Baseline saved to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        worse = compare(results, baseline, args.tolerance)
+        if worse:
+            print(f"❌ {len(worse)} regressions: {', '.join(worse)}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,16 @@
 import numpy as np
-from scipy.interpolate import splprep, splev
 import math
 import carla
 
 class BSplinePlanner:
-    def generate_path(self, current, target, offset=6.0):
-        # Align to road, not target
-        import carla
-        client = carla.Client("localhost", 2000)
-        world = client.get_world()
-        m = world.get_map()
-        ego_wp = m.get_waypoint(current)
-        yaw = math.radians(ego_wp.transform.rotation.yaw)
+    def __init__(self, world_map=None):
+        self.map = world_map  # e.g. utils.get_map(world); only needed to look up the road heading
+
+    def generate_path(self, current, target, offset=6.0, yaw=None):
+        # Align to road, not target (yaw in degrees, else the map's heading at current)
+        if yaw is None:
+            yaw = self.map.get_waypoint(current).transform.rotation.yaw
+        yaw = math.radians(yaw)
         
         c = math.cos(yaw)
         s = math.sin(yaw)
@@ -38,7 +37,25 @@ class BSplinePlanner:
         points = [p0, p1, p2, p3]
         return self._bspline(points)
 
+    def lateral_profile(self, length, d0, d1, n=30):
+        """Lane-change offset over arc length: (s, d) arrays from d0 at s=0 to d1 at s=length.
+
+        Clamped cubic B-spline on the control polygon (0, d0), (L/3, d0),
+        (2L/3, d1), (L, d1). Unlike _bspline it approximates the polygon, so d
+        never overshoots the target lane and starts and ends with zero slope.
+        With a single knot span that is a cubic Bezier, evaluated in closed
+        form here: no SciPy on the tick path.
+        """
+        ctrl = np.array([[0.0, d0], [length / 3.0, d0], [2.0 * length / 3.0, d1], [length, d1]])
+        t = np.linspace(0.0, 1.0, n)[:, None]
+        u = 1.0 - t
+        out = u**3 * ctrl[0] + 3.0 * u**2 * t * ctrl[1] + 3.0 * u * t**2 * ctrl[2] + t**3 * ctrl[3]
+        return out[:, 0], out[:, 1]
+
     def _bspline(self, points):
+        # SciPy is slow to import; only pay for it once a path is planned
+        from scipy.interpolate import splprep, splev
+        
         x = [p.x for p in points]
         y = [p.y for p in points]
         
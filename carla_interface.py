@@ -1,10 +1,11 @@
 
 import carla
-import queue
 import config
+import utils
 import math
 import random
 import time
+from radar_rig import RadarRig
 
 class CarlaInterface:
     def __init__(self):
@@ -12,36 +13,18 @@ class CarlaInterface:
         self.world = None
         self.ego_vehicle = None
         self.radar_sensor = None
-        self.radar_queue = queue.Queue()
+        self.radar_rig = None
         self.actor_list = []
 
     def setup_world(self):
         self.client = carla.Client(config.HOST, config.PORT)
         self.client.set_timeout(config.TIMEOUT)
-        self.world = self.client.get_world()
         
-        # Nuclear Cleanup: Destroy ALL existing vehicles ("Ghosts")
-        # This prevents the <10m collisions on restart
-        print("☢️ Nuclear Cleanup: Removing old actors...")
-        commands = []
-        for actor in self.world.get_actors().filter('vehicle.*'):
-            commands.append(carla.command.DestroyActor(actor))
-        for actor in self.world.get_actors().filter('sensor.*'):
-            commands.append(carla.command.DestroyActor(actor))
-        self.client.apply_batch(commands)
-        
-        # Apply 60Hz Sync Mode
-        settings = self.world.get_settings()
-        settings.synchronous_mode = config.SYNC_MODE
-        settings.fixed_delta_seconds = config.FIXED_DELTA_SECONDS
-        self.world.apply_settings(settings)
-
-        # Graphical Optimization (Safe)
+        # Nuclear Cleanup, sync settings and layer unloads (shared, concurrent)
+        self.world = utils.setup_world(self.client)
+        # Props too, as before the shared setup (main.py keeps them)
         try:
-            self.world.unload_map_layer(carla.MapLayer.Buildings)
-            self.world.unload_map_layer(carla.MapLayer.Foliage)
             self.world.unload_map_layer(carla.MapLayer.Props)
-            self.world.unload_map_layer(carla.MapLayer.ParkedVehicles)
         except:
             pass
 
@@ -85,28 +68,21 @@ class CarlaInterface:
         self.update_spectator()
 
     def attach_radar(self):
-        bp = self.world.get_blueprint_library().find('sensor.other.radar')
-        bp.set_attribute('horizontal_fov', str(config.RADAR_FOV_AZIMUTH))
-        bp.set_attribute('vertical_fov', str(config.RADAR_FOV_ELEVATION))
-        bp.set_attribute('range', str(config.RADAR_RANGE))
-        bp.set_attribute('points_per_second', str(config.RADAR_POINTS_PER_SECOND))
-        
-        # Sensor tick 0.0 matches simulation step
-        bp.set_attribute('sensor_tick', '0.0')
-
-        transform = carla.Transform(carla.Location(x=2.5, z=1.6))
-        self.radar_sensor = self.world.spawn_actor(bp, transform, attach_to=self.ego_vehicle)
-        self.radar_sensor.listen(self.radar_queue.put)
-        self.actor_list.append(self.radar_sensor)
+        # Full rig from config.RADAR_RIG; unit 0 is the forward radar.
+        # Nothing here calls adapt(), so keep the full per-unit budgets
+        self.radar_rig = RadarRig(self.world, self.ego_vehicle, adaptive=False)
+        self.radar_sensor = self.radar_rig.sensors[0]
+        # Not in actor_list: adapt() replaces units, the rig destroys its current ones
 
     def get_latest_radar_data(self):
         """
         DRAINS THE QUEUE to ensure we always get the freshest data.
-        Prevents lag accumulation.
+        Prevents lag accumulation. Returns the latest forward-radar frame.
         """
         data = None
-        while not self.radar_queue.empty():
-            data = self.radar_queue.get()
+        for sid, frame in self.radar_rig.drain():
+            if sid == 0:
+                data = frame
         return data
 
     def update_spectator(self):
@@ -137,6 +113,8 @@ class CarlaInterface:
 
     def cleanup(self):
         print("🧹 Cleaning up actors...")
+        if self.radar_rig:
+            self.radar_rig.destroy()
         for actor in self.actor_list:
             if actor.is_alive:
                 actor.destroy()
@@ -0,0 +1,198 @@
+
+import math
+import numpy as np
+import config
+
+
+def path_yaw(xy):
+    """Heading (rad) along an (n, 2) path from its tangents."""
+    if len(xy) < 2:
+        return np.zeros(len(xy))
+    d = np.gradient(xy, axis=0)
+    return np.arctan2(d[:, 1], d[:, 0])
+
+
+def _cell_keys(ix, iy, it):
+    """One int64 key per (x cell, y cell, time slice)."""
+    off = 1 << 20
+    return ((it.astype(np.int64) << 42) + ((ix.astype(np.int64) + off) << 21)
+            + (iy.astype(np.int64) + off))
+
+
+class CollisionChecker:
+    """Swept oriented-box collision checks of planned paths against moving obstacles.
+
+    The ego footprint is an oriented box at every path point, placed in time
+    by `times` (or arc length / speed). Obstacles are oriented boxes moving at
+    constant velocity. Broad phase: each obstacle's swept box per time slice
+    is rasterized into a uniform space-time grid, then every ego box looks up
+    the obstacles sharing its cell and slice with one searchsorted. Narrow
+    phase: circle prefilter, then separating-axis test on all candidate pairs
+    at once. Units are whatever the caller uses consistently (m and s for
+    CARLA, pixels and s for newfile.py).
+    """
+
+    def __init__(self, half_extent=None, cell=None, margin=None, time_slice=None):
+        self.half = np.asarray(half_extent or config.EGO_HALF_EXTENT, dtype=np.float64)
+        self.cell = cell or config.COLLISION_CELL
+        self.time_slice = time_slice or config.COLLISION_TIME_SLICE
+        self.margin = config.COLLISION_MARGIN if margin is None else margin
+        self.set_obstacles(np.empty((0, 2)))
+
+    def set_obstacles(self, xy, yaw=None, half_extent=None, vel=None):
+        """Obstacle centres (m, 2), yaw (m,) rad, half extents (m, 2) (length, width), velocity (m, 2)."""
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        m = len(xy)
+        self.obs_xy = xy
+        self.obs_yaw = np.zeros(m) if yaw is None else np.asarray(yaw, dtype=np.float64)
+        self.obs_half = (np.broadcast_to(self.half, (m, 2)) if half_extent is None
+                         else np.broadcast_to(np.asarray(half_extent, dtype=np.float64), (m, 2)))
+        self.obs_vel = np.zeros((m, 2)) if vel is None else np.asarray(vel, dtype=np.float64).reshape(-1, 2)
+        self.obs_r = np.hypot(self.obs_half[:, 0], self.obs_half[:, 1])
+
+    def set_actors(self, actors, exclude_id=None):
+        """Obstacles from carla actors (bounding box, transform and velocity)."""
+        xy, yaw, half, vel = [], [], [], []
+        for a in actors:
+            if a.id == exclude_id:
+                continue
+            tf = a.get_transform()
+            ext = a.bounding_box.extent
+            v = a.get_velocity()
+            xy.append((tf.location.x, tf.location.y))
+            yaw.append(math.radians(tf.rotation.yaw))
+            half.append((ext.x, ext.y))
+            vel.append((v.x, v.y))
+        self.set_obstacles(np.array(xy).reshape(-1, 2), np.array(yaw), np.array(half).reshape(-1, 2),
+                           np.array(vel).reshape(-1, 2))
+
+    def _broad_phase(self, ego_xy, ego_t):
+        """Candidate (ego point, obstacle) index pairs."""
+        if not len(self.obs_xy) or not len(ego_xy):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        dt = self.time_slice
+        n_slices = int(ego_t.max() // dt) + 1
+
+        # One swept AABB per (obstacle, time slice), inflated by the ego radius
+        reach = self.obs_r + math.hypot(*self.half) + self.margin
+        sub = np.repeat(np.arange(len(self.obs_xy)), n_slices)
+        sl = np.tile(np.arange(n_slices), len(self.obs_xy))
+        p0 = self.obs_xy[sub] + self.obs_vel[sub] * (sl * dt)[:, None]
+        p1 = p0 + self.obs_vel[sub] * dt
+        lo = np.floor((np.minimum(p0, p1) - reach[sub, None]) / self.cell).astype(np.int64)
+        hi = np.floor((np.maximum(p0, p1) + reach[sub, None]) / self.cell).astype(np.int64)
+
+        # Rasterize into sorted (cell key, obstacle) pairs
+        nx = hi[:, 0] - lo[:, 0] + 1
+        ny = hi[:, 1] - lo[:, 1] + 1
+        n = nx * ny
+        j = np.repeat(np.arange(len(n)), n)
+        k = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        keys = _cell_keys(lo[j, 0] + k // ny[j], lo[j, 1] + k % ny[j], sl[j])
+        order = np.argsort(keys, kind="stable")
+        keys, oid = keys[order], sub[j][order]
+
+        # Look up each ego box's cell in its time slice
+        ek = _cell_keys(np.floor(ego_xy[:, 0] / self.cell), np.floor(ego_xy[:, 1] / self.cell),
+                        np.minimum(ego_t // dt, n_slices - 1))
+        a = np.searchsorted(keys, ek, "left")
+        b = np.searchsorted(keys, ek, "right")
+        cnt = b - a
+        pe = np.repeat(np.arange(len(ek)), cnt)
+        po = oid[np.arange(cnt.sum()) - np.repeat(np.cumsum(cnt) - cnt, cnt) + np.repeat(a, cnt)]
+        return pe, po
+
+    def _narrow_phase(self, ego_xy, ego_yaw, ego_t, pe, po):
+        """Separating-axis test per candidate pair. Returns a bool mask of overlaps."""
+        c1 = ego_xy[pe]
+        c2 = self.obs_xy[po] + self.obs_vel[po] * ego_t[pe, None]
+        d = c2 - c1
+        r1 = math.hypot(*self.half) + self.margin
+        near = np.einsum("ij,ij->i", d, d) <= (r1 + self.obs_r[po]) ** 2
+        hit = np.zeros(len(pe), dtype=bool)
+        if not near.any():
+            return hit
+        idx = np.flatnonzero(near)
+        dx, dy = d[idx, 0], d[idx, 1]
+        y1, y2 = ego_yaw[pe[idx]], self.obs_yaw[po[idx]]
+        h1x, h1y = self.half + self.margin
+        h2x, h2y = self.obs_half[po[idx]].T
+
+        # Centre offset in both box frames, relative rotation between them
+        c1, s1 = np.cos(y1), np.sin(y1)
+        c2, s2 = np.cos(y2), np.sin(y2)
+        c = np.abs(c1 * c2 + s1 * s2)
+        s = np.abs(s2 * c1 - c2 * s1)
+
+        # Four separating axes: ego forward/left, obstacle forward/left
+        overlap = np.abs(dx * c1 + dy * s1) <= h1x + h2x * c + h2y * s
+        overlap &= np.abs(-dx * s1 + dy * c1) <= h1y + h2x * s + h2y * c
+        overlap &= np.abs(dx * c2 + dy * s2) <= h2x + h1x * c + h1y * s
+        overlap &= np.abs(-dx * s2 + dy * c2) <= h2y + h1x * s + h1y * c
+        hit[idx] = overlap
+        return hit
+
+    def check(self, paths, times=None, speed=None, yaws=None):
+        """Check a batch of paths at once.
+
+        paths: list of (n_i, 2) point sequences. times: matching per-point
+        times (s), or None to derive them from arc length and speed (m/s); with
+        neither, obstacles are frozen at t=0. yaws: optional per-point headings,
+        otherwise taken from the path tangents.
+
+        Returns (collides (B,) bool, first (B,) index of the first colliding
+        point or -1).
+        """
+        if isinstance(paths, np.ndarray) and paths.ndim == 3:
+            B = len(paths)
+            lens = np.full(B, paths.shape[1], dtype=np.int64)
+            ego_xy = paths.reshape(-1, 2).astype(np.float64, copy=False)
+        else:
+            xy = [np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in paths]
+            B = len(xy)
+            lens = np.array([len(p) for p in xy], dtype=np.int64)
+            ego_xy = np.concatenate(xy) if B else np.empty((0, 2))
+        if not B or not lens.sum():
+            return np.zeros(B, dtype=bool), np.full(B, -1)
+        pid = np.repeat(np.arange(B), lens)
+        start = np.cumsum(lens) - lens
+        end = start + lens - 1
+
+        if yaws is not None:
+            ego_yaw = np.concatenate([np.broadcast_to(np.asarray(y, dtype=np.float64), (n,))
+                                      for y, n in zip(yaws, lens)])
+        else:
+            # Central differences over the whole batch, one-sided at path ends
+            d = np.zeros_like(ego_xy)
+            d[1:-1] = ego_xy[2:] - ego_xy[:-2]
+            multi = lens > 1
+            d[start[multi]] = ego_xy[start[multi] + 1] - ego_xy[start[multi]]
+            d[end[multi]] = ego_xy[end[multi]] - ego_xy[end[multi] - 1]
+            d[start[~multi]] = (1.0, 0.0)
+            ego_yaw = np.arctan2(d[:, 1], d[:, 0])
+
+        if times is not None:
+            ego_t = np.concatenate([np.asarray(t, dtype=np.float64) for t in times])
+        elif speed:
+            step = np.zeros(len(ego_xy))
+            step[1:] = np.hypot(*np.diff(ego_xy, axis=0).T)
+            step[start] = 0.0
+            s = np.cumsum(step)
+            ego_t = (s - np.repeat(s[start], lens)) / speed
+        else:
+            ego_t = np.zeros(len(ego_xy))
+
+        pe, po = self._broad_phase(ego_xy, ego_t)
+        hit = self._narrow_phase(ego_xy, ego_yaw, ego_t, pe, po)
+
+        collides = np.zeros(B, dtype=bool)
+        first = np.full(B, len(ego_xy), dtype=np.int64)
+        if hit.any():
+            hp = pe[hit]
+            collides[pid[hp]] = True
+            np.minimum.at(first, pid[hp], hp)
+        first = np.where(collides, first - start, -1)
+        return collides, first
+
+    def path_clear(self, path, **kwargs):
+        return not self.check([path], **kwargs)[0][0]
@@ -4,22 +4,173 @@
 # Simulation
 HOST = "localhost"
 PORT = 2000
+TM_PORT = 8000  # Traffic Manager port
 TIMEOUT = 10.0
 SYNC_MODE = True
 FIXED_DELTA_SECONDS = 0.033  # 30 Hz (Stable)
+SETUP_PARALLEL = True  # Run independent world-setup RPCs concurrently
+
+# Tick watchdog (watchdog.py). Budget is FIXED_DELTA_SECONDS per frame.
+WATCHDOG_RESERVE = 0.005       # Keep this much of the frame (s) free when running deferrable stages
+WATCHDOG_EMA = 0.2             # Smoothing of per-stage cost estimates
+WATCHDOG_MAX_SKIPS = 5         # A deferrable stage runs anyway after this many skipped frames
+WATCHDOG_EMERGENCY_TTC = 2.0   # Force full brake on EMERGENCY below this TTC (s)
 
 # Radar (Optimized for 30Hz)
 RADAR_RANGE = 100.0
 RADAR_FOV_AZIMUTH = 30.0   # Wider FOV for better detection
 RADAR_FOV_ELEVATION = 10.0  # Wider vertical
 RADAR_POINTS_PER_SECOND = 10000 # More points for reliability
+RADAR_MOUNT = (2.5, 0.0, 1.0, 0.0)  # x, y, z, yaw (deg) on the ego
+RADAR_HOLD_FRAMES = 6      # Stop envelope keeps the last in-lane hit through this many empty radar frames
+
+# Radar rig (radar_rig.py). Unit 0 is the primary forward radar.
+# Ego frame: x forward, y right; negative yaw looks left.
+RADAR_RIG = [
+    {'name': 'front', 'mount': RADAR_MOUNT, 'fov': RADAR_FOV_AZIMUTH,
+     'vfov': RADAR_FOV_ELEVATION, 'range': RADAR_RANGE, 'pps': RADAR_POINTS_PER_SECOND},
+    {'name': 'front_left', 'mount': (2.2, -0.9, 0.8, -60.0), 'fov': 90.0, 'vfov': 10.0, 'range': 40.0, 'pps': 2000},
+    {'name': 'front_right', 'mount': (2.2, 0.9, 0.8, 60.0), 'fov': 90.0, 'vfov': 10.0, 'range': 40.0, 'pps': 2000},
+    {'name': 'rear_left', 'mount': (-2.2, -0.9, 0.8, -150.0), 'fov': 90.0, 'vfov': 10.0, 'range': 40.0, 'pps': 2000},
+    {'name': 'rear_right', 'mount': (-2.2, 0.9, 0.8, 150.0), 'fov': 90.0, 'vfov': 10.0, 'range': 40.0, 'pps': 2000},
+]
+RADAR_RIG_MAX_PPS = 18000  # Total points/s across the rig; units are scaled down to fit
+
+# Adaptive radar budget (RadarRig.adapt). Sensors are re-spawned to change it.
+RADAR_ADAPT = True
+RADAR_LEVELS = {  # Scale of each unit's points/s: forward unit, other units
+    'idle':   {'pps': 0.3, 'side_pps': 0.25},  # Nothing tracked in lane
+    'cruise': {'pps': 0.6, 'side_pps': 0.5},   # Target tracked, far away
+    'alert':  {'pps': 1.0, 'side_pps': 1.0},   # Target inside AVOID_DIST or lane change
+}
+RADAR_ADAPT_HORIZON = 3.0       # Idle forward range covers this many seconds of travel (+ AVOID_DIST)
+RADAR_ADAPT_MIN_RANGE = 60.0    # Never shorter than this (m)
+RADAR_ADAPT_RANGE_STEP = 20.0   # Range is quantized to this (m)
+RADAR_ADAPT_RANGE_HYST = 30.0   # Same level: shorten the forward range only by more than this (m)
+RADAR_ADAPT_UP_INTERVAL = 0.5   # Min sim seconds between respawns when escalating
+RADAR_ADAPT_DOWN_INTERVAL = 3.0 # ... and when reducing
 
 # Control
-TARGET_SPEED_KMH = 7.0 # Reduced speed to prevent getting stuck/missing logic
+TARGET_SPEED_KMH = 20.0 # Cruise cap; curves and radar targets are slowed by speed_profile
 LOOKAHEAD_BASE = 8.0
 EMERGENCY_DIST = 10.0
 AVOID_DIST = 45.0 # Earlier reaction (User req)
 
+# Lane change (planned once at the decision point, tracked by PathFollower)
+LANE_CHANGE_TIME = 3.0         # Lateral move spans speed * this much road (s)
+LANE_CHANGE_MIN_LENGTH = 20.0  # ... but at least this long (m)
+LANE_CHANGE_TAIL = 20.0        # Path continues this far in the target lane past the move (m)
+LANE_CHANGE_SETTLED = 0.3      # Done past the move once within this of the path (m)
+LANE_CHANGE_STEP = 2.0         # Path point spacing (m)
+LANE_CHANGE_TIMEOUT = 10.0     # Abort a lane change not completed by then (sim s)
+
+# Lateral control
+LATERAL_CONTROLLER = "pure_pursuit"  # "pure_pursuit" | "mpc" (mpc_lateral.py) for the path/route followers
+MPC_HORIZON = 20          # Prediction steps
+MPC_DT = 0.1              # Model step (s)
+MPC_WHEELBASE = 2.9       # Kinematic bicycle wheelbase (m)
+MPC_MAX_STEER_DEG = 70.0  # Front wheel angle at steer = 1.0
+MPC_Q_Y = 1.0             # Weight on lateral error (m)
+MPC_Q_PSI = 2.0           # Weight on heading error (rad)
+MPC_R = 20.0              # Weight on curvature beyond the path's own (1/m)
+MPC_R_RATE = 400.0        # Weight on curvature change per step (1/m)
+MPC_SPEED_BIN = 0.5       # Gains are built once per speed bin (m/s)
+MPC_MIN_SPEED = 1.0       # Model speed floor (m/s)
+
+# Rate groups (rate_scheduler.py), Hz. Steering always runs every tick.
+RATE_RADAR = 30.0        # In-lane radar distance
+RATE_PLAN = 10.0         # Lane-change decisions and waypoint lookups
+RATE_GRID = 15.0         # Occupancy grid updates
+RATE_RADAR_ADAPT = 5.0   # Radar budget re-evaluation
+
+# Speed profile (speed_profile.py)
+SPEED_PROFILE_DS = 1.0      # Profile sample spacing (m)
+SPEED_CURV_BASE = 4.0       # Curvature stencil spacing (m)
+SPEED_A_LAT = 2.0           # Max lateral acceleration in curves (m/s^2)
+SPEED_A_ACCEL = 1.5         # Planned acceleration (m/s^2)
+SPEED_A_DECEL = 3.0         # Planned deceleration, also used for radar stops (m/s^2)
+SPEED_STOP_MARGIN = 8.0     # Standstill gap kept to a radar target (m)
+LONG_KP = 0.5               # Throttle per m/s of speed error
+LONG_KB = 0.3               # Brake per m/s of overspeed
+LONG_THROTTLE_FF = 0.2      # Throttle needed to hold speed
+LONG_THROTTLE_MAX = 0.7
+LONG_BRAKE_DEADBAND = 0.5   # Overspeed (m/s) tolerated before braking
+LONG_STOP_BRAKE = 0.3       # Brake held inside SPEED_STOP_MARGIN of a radar target
+
+# Collision checking (collision_checker.py)
+EGO_HALF_EXTENT = (2.4, 1.05)  # Ego footprint half length, half width (m)
+COLLISION_CELL = 5.0           # Broad-phase grid cell (m)
+COLLISION_TIME_SLICE = 0.5     # Broad-phase time slice (s)
+COLLISION_MARGIN = 0.3         # Extra clearance around the ego box (m)
+
 # Actors
 EGO_FILTER = 'vehicle.tesla.model3'
 OBSTACLE_FILTER = 'vehicle.nissan.patrol'
+
+# Background traffic (traffic_spawner.py)
+TRAFFIC_VEHICLES = 0            # Autopilot vehicles batch-spawned at startup (100-300 for density tests)
+TRAFFIC_BATCH_SIZE = 50         # SpawnActor+SetAutopilot commands per apply_batch_sync
+TRAFFIC_HYBRID_RADIUS = 70.0    # Full physics within this radius of the ego (role 'hero'), teleported beyond (m)
+TRAFFIC_LEADING_DISTANCE = 2.5  # TM gap to the vehicle ahead (m)
+TRAFFIC_REPORT_INTERVAL = 10.0  # Sim seconds between server step time reports
+
+# Logging (event_log.py)
+LOG_FILE = None           # None = stdout
+LOG_FORMAT = "text"       # "text" | "jsonl"
+LOG_BUFFER_SIZE = 4096    # Preallocated ring slots
+LOG_FLUSH_INTERVAL = 0.1  # Writer thread wake-up (s)
+LOG_RATE_LIMITS = {       # Min seconds between events of a kind
+    'radar': 1.0,
+    'decision': 1.0,
+    'waypoint': 1.0,
+    'route': 1.0,
+    'watchdog': 1.0,
+}
+
+# Live metrics (metrics.py)
+METRICS_PORT = None         # e.g. 9108: Prometheus text at http://METRICS_HOST:PORT/metrics. None = off
+METRICS_HOST = "127.0.0.1"  # Local only
+METRICS_WINDOW = 2048       # Recent samples per latency/points series (quantiles)
+
+# Telemetry (telemetry.py)
+TELEMETRY_DIR = None         # e.g. "telemetry": per-run subdirectory is created here. None = off
+TELEMETRY_CHUNK = 4096       # Rows buffered in memory before flushing to disk
+RECORD_RADAR = False         # Also write raw radar frames (radar_log.py) into the run dir (unbounded)
+
+# Episodes (episode.py)
+SEED = None  # Fixed RNG seed for spawns/traffic. None = random (still recorded)
+EPISODE_DIR = "episodes"  # main.py saves <run>.npz here for episode.py replays. None = off
+
+# Scenarios (scenarios.py)
+SCENARIO_FILE = None              # JSON scenario file for main.py; None = built-in (obstacle at 150m, respawn every 20s at 80m)
+SCENARIO_INDEX = 0                # Which of the file's scenarios main.py runs
+SCENARIO_TRAFFIC_CLEARANCE = 20.0  # Planned traffic keeps at least this far from the ego spawn (m)
+
+# Scenario executor (scenario_executor.py)
+ENDPOINTS = None                  # [(host, port, tm_port)]; None = [(HOST, PORT, TM_PORT)]
+EXECUTOR_EPISODE_TIMEOUT = 600.0  # Wall seconds before an episode's worker is killed and the episode retried
+EXECUTOR_RETRIES = 2              # Extra attempts per episode (on any endpoint)
+EXECUTOR_MAX_FAILURES = 3         # Consecutive failures before an endpoint is retired
+EXECUTOR_RESET_IN_PLACE = True    # Later episodes on an endpoint reuse ego/sensors/obstacle; False = full setup_world
+EXECUTOR_SERVER_CMD = None        # Local server launch, e.g. "./CarlaUE4.sh -RenderOffScreen -carla-rpc-port={port}"
+EXECUTOR_SERVER_STARTUP = 20.0    # Seconds to wait after (re)launching a server
+
+# Occupancy grid (occupancy_grid.py)
+GRID_RES = 0.5             # Cell size (m)
+GRID_X_BACK = 20.0         # Grid extent behind ego (m)
+GRID_X_FRONT = 80.0        # Grid extent ahead of ego (m)
+GRID_Y_HALF = 10.0         # Grid half-width (m)
+GRID_DECAY = 0.85          # Occupancy decay per FIXED_DELTA_SECONDS of sim time
+GRID_HIT = 0.5             # Occupancy added per radar hit
+GRID_OCC_THRESHOLD = 0.5   # Cell counts as occupied above this
+GRID_MIN_Z = 0.3           # Drop ground returns below this height (m)
+LANE_CHECK_AHEAD = 30.0    # Target-lane corridor checked before a lane change (m)
+LANE_CHECK_BEHIND = 10.0
+
+# Route planning (route_planner.py)
+ROUTE_RESOLUTION = 2.0      # Dense route point spacing (m)
+ROUTE_SEARCH_WINDOW = 50    # Points searched ahead of the last match per tick
+ROUTE_HASH_CELL = 10.0      # Spatial hash cell for locating the nearest segment (m)
+ROUTE_END_DIST = 10.0       # Route counts as finished this close to the goal (m)
+ROUTE_LANE_CHANGE_COST = 30.0  # A* cost of switching to a neighbour lane (m)
+ROUTE_LANE_CHANGE_AHEAD = 40.0  # Start a route's lane change this far before its link (m)
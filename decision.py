@@ -1,4 +1,5 @@
 import config
+from event_log import event
 
 class DecisionEngine:
     def __init__(self):
@@ -11,7 +12,7 @@ class DecisionEngine:
         if distance is None or relative_velocity is None:
             self.current_state = "NORMAL"
             ttc = float('inf')
-            print(f"State: {self.current_state}, Dist: None, TTC: inf")
+            event("decision", "State: {}, Dist: None, TTC: inf", self.current_state)
             return self.current_state, ttc
 
         # Compute closing speed
@@ -0,0 +1,260 @@
+
+import argparse
+import json
+import math
+import os
+import random
+import time
+import numpy as np
+import carla
+import config
+import utils
+from event_log import event
+
+# Per-frame arrays stored in an episode file
+CONTROL_FIELDS = ("throttle", "steer", "brake", "hand_brake", "reverse")
+POSE_FIELDS = ("x", "y", "yaw", "speed")
+
+
+def make_rng(seed=None):
+    """Seeded RNG for an episode. seed=None draws (and returns) a fresh seed."""
+    if seed is None:
+        seed = config.SEED if config.SEED is not None else random.randrange(2**31)
+    return seed, random.Random(seed)
+
+
+def destination_rng(seed):
+    """Separate RNG for route destinations: how many get drawn (and when) must
+    not shift the episode RNG's stream."""
+    return random.Random(f"{seed}/destinations")
+
+
+def _tf_to_list(tf):
+    return [tf.location.x, tf.location.y, tf.location.z,
+            tf.rotation.pitch, tf.rotation.yaw, tf.rotation.roll]
+
+
+def _list_to_tf(v):
+    return carla.Transform(carla.Location(x=v[0], y=v[1], z=v[2]),
+                           carla.Rotation(pitch=v[3], yaw=v[4], roll=v[5]))
+
+
+class EpisodeRecorder:
+    """Records a seeded episode: seed, spawn layout and every applied control."""
+
+    def __init__(self, seed, map_name):
+        self.meta = {
+            "seed": seed,
+            "map": map_name,
+            "fixed_delta_seconds": config.FIXED_DELTA_SECONDS,
+            "actors": [],  # {"tick", "role", "blueprint", "transform"}
+            "destinations": [],  # {"tick", "location"}: set_destination calls
+            "tm_seed": None,  # Traffic Manager seed when there is "traffic"
+        }
+        self.frame = 0  # Recorded control frames
+        self.ticks = 0  # World ticks so far (actors spawn "after N ticks")
+        self.rows = {k: [] for k in CONTROL_FIELDS + POSE_FIELDS}
+
+    def on_tick(self):
+        self.ticks += 1
+
+    def add_actor(self, role, blueprint_id, transform):
+        self.meta["actors"].append({
+            "tick": self.ticks,
+            "role": role,
+            "blueprint": blueprint_id,
+            "transform": _tf_to_list(transform),
+        })
+
+    def add_destination(self, location):
+        self.meta["destinations"].append({
+            "tick": self.ticks,
+            "location": [location.x, location.y, location.z],
+        })
+
+    def record(self, control, ego):
+        tf = ego.get_transform()
+        v = ego.get_velocity()
+        r = self.rows
+        r["throttle"].append(control.throttle)
+        r["steer"].append(control.steer)
+        r["brake"].append(control.brake)
+        r["hand_brake"].append(control.hand_brake)
+        r["reverse"].append(control.reverse)
+        r["x"].append(tf.location.x)
+        r["y"].append(tf.location.y)
+        r["yaw"].append(tf.rotation.yaw)
+        r["speed"].append(math.sqrt(v.x**2 + v.y**2))
+        self.frame += 1
+
+    def save(self, path):
+        arrays = {k: np.asarray(v, dtype=np.float32) for k, v in self.rows.items()}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, meta=np.array(json.dumps(self.meta)), **arrays)
+        event("main", "💾 Episode saved: {} frames, seed {} -> {}", self.frame, self.meta["seed"], path)
+
+
+def load_episode(path):
+    with np.load(path) as data:
+        meta = json.loads(str(data["meta"]))
+        arrays = {k: data[k] for k in CONTROL_FIELDS + POSE_FIELDS}
+    return meta, arrays
+
+
+def _spawn_recorded(world, actor):
+    bp = utils.get_blueprint_library(world).find(actor["blueprint"])
+    if actor["role"] == "obstacle":
+        bp.set_attribute('role_name', 'obstacle')
+    elif actor["role"] == "ego":
+        bp.set_attribute('role_name', 'hero')
+    elif actor["role"] == "traffic":
+        bp.set_attribute('role_name', 'autopilot')
+    spawned = world.try_spawn_actor(bp, _list_to_tf(actor["transform"]))
+    if spawned and actor["role"] == "obstacle":
+        spawned.set_simulate_physics(True)
+        spawned.apply_control(carla.VehicleControl(hand_brake=True))
+    elif spawned and actor["role"] == "traffic":
+        spawned.set_autopilot(True, config.TM_PORT)
+    return spawned
+
+
+def replay_episode(client, path, agent_factory=None, pos_tol=0.05, ctrl_tol=1e-3):
+    """Replays a recorded episode in synchronous mode.
+
+    Without agent_factory the recorded controls are applied open-loop, which
+    checks simulator determinism. With agent_factory(world, ego) a (new) agent
+    drives to the recorded destinations through main.py's step (emergency
+    override included, watchdog skips as recorded) and its controls are
+    compared against the recording. Returns per-frame divergence arrays and
+    step latency of the agent. The recorded scenario config overrides are
+    applied for the duration of the replay.
+    """
+    import scenarios
+
+    meta, rec = load_episode(path)
+    with scenarios.config_overrides(meta.get("config")):
+        return _replay_episode(client, meta, rec, agent_factory, pos_tol, ctrl_tol)
+
+
+def _replay_episode(client, meta, rec, agent_factory, pos_tol, ctrl_tol):
+    if client.get_world().get_map().name != meta["map"]:
+        client.load_world(meta["map"].split("/")[-1])
+    world = utils.setup_world(client)
+    if any(a["role"] == "traffic" for a in meta["actors"]):
+        from traffic_spawner import TrafficSpawner
+        # Same TM settings and seed as the recorded run
+        TrafficSpawner(world, None, client=client).tm.set_random_device_seed(meta["tm_seed"])
+
+    n = len(rec["throttle"])
+    pending = sorted(meta["actors"], key=lambda a: a["tick"])
+    goals = sorted(meta.get("destinations", ()), key=lambda d: d["tick"])
+    actors = []
+    ego = None
+    agent = None
+    # Same step as main.py, with the recorded watchdog skips instead of the frame budget
+    from agent_loop import step
+    from decision import DecisionEngine
+    from controller import Controller
+    from watchdog import TickWatchdog
+    watchdog = TickWatchdog(skips=meta.get("skips", {}))
+    decision = DecisionEngine()
+    controller = Controller()
+
+    pos_err = np.zeros(n, dtype=np.float32)
+    ctrl_err = np.zeros(n, dtype=np.float32)
+    latency = np.zeros(n, dtype=np.float64)
+
+    def spawn_due(ticks):
+        nonlocal ego, agent
+        while pending and pending[0]["tick"] <= ticks:
+            actor = pending.pop(0)
+            spawned = _spawn_recorded(world, actor)
+            if spawned is None and actor["role"] == "traffic":
+                continue  # Traffic is the planned batch, entries can fail there too
+            if spawned is None:
+                raise RuntimeError(f"Replay could not spawn {actor['role']} after tick {actor['tick']}")
+            actors.append(spawned)
+            if actor["role"] == "ego":
+                ego = spawned
+                if agent_factory:
+                    agent = agent_factory(world, ego)
+                    agent.watchdog = watchdog
+
+    def route_due(ticks):
+        # Same order as main.py: destination before the agent's tick
+        while agent and goals and goals[0]["tick"] <= ticks:
+            x, y, z = goals.pop(0)["location"]
+            agent.set_destination(carla.Location(x=x, y=y, z=z))
+
+    try:
+        spawn_due(0)
+        route_due(0)
+        for i in range(n):
+            world.tick()
+            spawn_due(i + 1)
+            route_due(i + 1)
+
+            if agent:
+                watchdog.begin()
+                t0 = time.perf_counter()
+                control, _, _ = step(ego, agent, decision, controller, watchdog)
+                latency[i] = time.perf_counter() - t0
+                watchdog.end()
+                ctrl_err[i] = max(abs(control.throttle - rec["throttle"][i]),
+                                  abs(control.steer - rec["steer"][i]),
+                                  abs(control.brake - rec["brake"][i]))
+            else:
+                control = carla.VehicleControl(throttle=float(rec["throttle"][i]),
+                                               steer=float(rec["steer"][i]),
+                                               brake=float(rec["brake"][i]),
+                                               hand_brake=bool(rec["hand_brake"][i]),
+                                               reverse=bool(rec["reverse"][i]))
+                ego.apply_control(control)
+
+            loc = ego.get_location()
+            pos_err[i] = math.hypot(loc.x - rec["x"][i], loc.y - rec["y"][i])
+    finally:
+        if agent: agent.destroy()
+        for a in actors:
+            if a.is_alive: a.destroy()
+
+    diverged = np.nonzero((pos_err > pos_tol) | (ctrl_err > ctrl_tol))[0]
+    return {
+        "pos_err": pos_err,
+        "ctrl_err": ctrl_err,
+        "latency": latency,
+        "first_divergence": int(diverged[0]) if len(diverged) else None,
+        "diverged_frames": len(diverged),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded episode")
+    parser.add_argument("episode")
+    parser.add_argument("--agent", action="store_true", help="Drive with SimpleAgent and compare controls")
+    args = parser.parse_args()
+
+    client = carla.Client(config.HOST, config.PORT)
+    client.set_timeout(config.TIMEOUT)
+
+    factory = None
+    if args.agent:
+        from simple_agent import SimpleAgent
+        factory = SimpleAgent
+
+    res = replay_episode(client, args.episode, agent_factory=factory)
+    n = len(res["pos_err"])
+    print(f"🔁 Replayed {n} frames: max pos err {res['pos_err'].max():.3f}m, "
+          f"max ctrl err {res['ctrl_err'].max():.4f}")
+    if res["first_divergence"] is None:
+        print("✅ No divergence")
+    else:
+        print(f"❌ {res['diverged_frames']} divergent frames, first at frame {res['first_divergence']}")
+    if args.agent and n:
+        lat = res["latency"] * 1000.0
+        print(f"⏱️ Agent tick: mean {lat.mean():.2f}ms | p95 {np.percentile(lat, 95):.2f}ms | max {lat.max():.2f}ms")
+    utils.setup_world(client, prefetch=False)
+
+
+if __name__ == "__main__":
+    main()
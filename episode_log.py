@@ -0,0 +1,177 @@
+
+import argparse
+import glob
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import newfile
+
+# Per-frame event bits
+EMERGENCY_BRAKE = 1    # FOLLOW with the gap under critical: braking to a stop
+OVERTAKE_BLOCKED = 2   # Closed in on a car with no lane to overtake into
+OVERTAKE_START = 4
+CONTACT = 8            # Player rect overlaps a traffic car
+EVENTS = {"emergency": EMERGENCY_BRAKE, "blocked": OVERTAKE_BLOCKED, "overtake": OVERTAKE_START,
+          "contact": CONTACT}
+
+
+class EpisodeRecorder:
+    """Per-physics-step arrays for one newfile.Sim episode.
+
+    Stores what the drawing code needs to rebuild a frame: player x/y,
+    angle, speed, state, lane, traffic (x, y, speed), road scroll, the
+    detected car, plus smoke spawns as (step, x, y, size) events and an
+    event bitmask per step. Rows are preallocated and grown by doubling.
+    """
+
+    def __init__(self, sim, capacity=3600):
+        self.sim = sim
+        self.n = 0
+        n_traffic = len(sim.traffic_group)
+        self.cols = {
+            "time": np.empty(capacity),
+            "road_y": np.empty(capacity, dtype=np.float32),
+            "x": np.empty(capacity, dtype=np.float32),
+            "y": np.empty(capacity, dtype=np.float32),
+            "angle": np.empty(capacity, dtype=np.float32),
+            "speed": np.empty(capacity, dtype=np.float32),
+            "state": np.empty(capacity, dtype=np.int8),
+            "lane": np.empty(capacity, dtype=np.float32),
+            "detected": np.empty(capacity, dtype=np.int8),   # Traffic slot, -1 if none
+            "traffic": np.empty((capacity, n_traffic, 3), dtype=np.float32),
+            "events": np.empty(capacity, dtype=np.uint8),
+        }
+        self.smoke = []  # (step, x, y, size)
+        self._particles = set()
+        self._prev_state = sim.player.state
+
+    def _grow(self):
+        for key, col in self.cols.items():
+            self.cols[key] = np.concatenate([col, np.empty_like(col)])
+
+    def record(self):
+        """Append the current (post-step) state."""
+        if self.n == len(self.cols["time"]):
+            self._grow()
+        sim, i, c = self.sim, self.n, self.cols
+        p = sim.player
+        cars = list(sim.traffic_group)
+        c["time"][i] = sim.time
+        c["road_y"][i] = sim.road_y
+        c["x"][i] = p.x
+        c["y"][i] = p.y
+        c["angle"][i] = p.angle
+        c["speed"][i] = p.current_speed
+        c["state"][i] = newfile.STATES.index(p.state)
+        c["lane"][i] = p.lane_idx
+        c["detected"][i] = cars.index(p.detected_obj) if p.detected_obj in cars else -1
+        c["traffic"][i] = [(car.x, car.y, car.speed) for car in cars]
+
+        events = 0
+        if p.state == "FOLLOW" and p.detected_obj is not None and p.target_speed == 0:
+            events |= EMERGENCY_BRAKE
+        if self._prev_state == "CRUISE" and p.state == "FOLLOW":
+            events |= OVERTAKE_BLOCKED
+        if self._prev_state != "OVERTAKE" and p.state == "OVERTAKE":
+            events |= OVERTAKE_START
+        if p.rect.collidelist([car.rect for car in cars]) != -1:
+            events |= CONTACT
+        c["events"][i] = events
+        self._prev_state = p.state
+
+        # Smoke spawned this step (particles are deterministic after spawning)
+        alive = set(p.smoke_group.sprites())
+        for part in alive - self._particles:
+            self.smoke.append((i, part.rect.centerx, part.y, part.image.get_width()))
+        self._particles = alive
+        self.n += 1
+
+    def arrays(self, **meta):
+        out = {k: v[:self.n] for k, v in self.cols.items()}
+        out["smoke"] = np.array(self.smoke, dtype=np.float32).reshape(-1, 4)
+        out["dt"] = np.float64(newfile.DT)
+        for key, value in meta.items():
+            out[key] = np.asarray(value)
+        return out
+
+
+def summarize(events):
+    """Event name -> number of steps flagged."""
+    events = np.asarray(events)
+    return {name: int(np.count_nonzero(events & bit)) for name, bit in EVENTS.items()}
+
+
+def record_episodes(out_dir, episodes, duration, seed=0, keep=None, writers=1):
+    """Run episodes headless with a recorder attached, saving episode-NNNN.npz files.
+
+    keep: event names; episodes flagging none of them are dropped.
+    Compression runs on a writer thread while the next episode simulates.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    steps = int(round(duration / newfile.DT))
+    mask = sum(EVENTS[k] for k in keep) if keep else 0
+    pool = ThreadPoolExecutor(writers, thread_name_prefix="episode-writer")
+    futures, saved = [], []
+    sim = newfile.Sim()
+    try:
+        for ep in range(episodes):
+            random.seed(seed + ep)
+            sim.reset()
+            rec = EpisodeRecorder(sim, capacity=steps)
+            for _ in range(steps):
+                sim.step()
+                rec.record()
+            flags = np.bitwise_or.reduce(rec.cols["events"][:rec.n])
+            if mask and not flags & mask:
+                continue
+            path = os.path.join(out_dir, f"episode-{ep:04d}.npz")
+            futures.append(pool.submit(_save, path, rec.arrays(seed=seed + ep, episode=ep)))
+            saved.append(path)
+    finally:
+        pool.shutdown(wait=True)
+    for f in futures:
+        f.result()
+    return saved
+
+
+def _save(path, arrays):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp, path)
+
+
+def list_episodes(log_dir):
+    """(path, duration s, event counts) for every episode log in log_dir."""
+    out = []
+    for path in sorted(glob.glob(os.path.join(log_dir, "episode-*.npz"))):
+        with np.load(path) as log:
+            out.append((path, float(log["time"][-1]) if len(log["time"]) else 0.0, summarize(log["events"])))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record headless overtaking-sim episodes")
+    parser.add_argument("out_dir")
+    parser.add_argument("--episodes", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60.0, help="Sim seconds per episode")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", nargs="+", choices=sorted(EVENTS),
+                        help="Only save episodes with at least one of these events")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    saved = record_episodes(args.out_dir, args.episodes, args.duration, args.seed, args.keep)
+    dt = time.perf_counter() - t0
+    sim_time = args.episodes * args.duration
+    print(f"💾 {len(saved)}/{args.episodes} episodes saved in {dt:.1f}s ({sim_time / dt:.0f}x real time)")
+    for path, duration, counts in list_episodes(args.out_dir):
+        print(f"   {os.path.basename(path)}  {duration:6.1f}s  " + "  ".join(f"{k}={v}" for k, v in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+
+import argparse
+import os
+import numpy as np
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import pygame
+import newfile
+from episode_log import EVENTS, list_episodes
+
+SEEK_SECONDS = 1.0
+TIMELINE_H = 12
+EVENT_COLORS = {"emergency": newfile.RED, "blocked": newfile.YELLOW, "overtake": newfile.BLUE,
+                "contact": newfile.BLACK}
+
+
+class Replay:
+    """A recorded episode replayed through newfile's own sprites and Sim.draw()."""
+
+    def __init__(self, path):
+        with np.load(path) as log:
+            self.log = {k: log[k] for k in log.files}
+        self.path = path
+        self.dt = float(self.log["dt"])
+        self.n = len(self.log["time"])
+        # A Sim only for its sprites and draw(); its own physics never runs
+        self.sim = newfile.Sim()
+        self.cars = list(self.sim.traffic_group)
+        smoke = self.log["smoke"]
+        self.smoke_steps = smoke[:, 0].astype(np.int64) if len(smoke) else np.empty(0, dtype=np.int64)
+        self.particle_steps = int(np.ceil(0.5 / self.dt)) + 1  # Particle life
+
+    def frame(self, i):
+        """Load step i into the sprites."""
+        log, sim, p = self.log, self.sim, self.sim.player
+        sim.road_y = float(log["road_y"][i])
+        sim.time = float(log["time"][i])
+        sim.steps = i + 1
+        for car, (x, y, speed) in zip(self.cars, log["traffic"][i]):
+            car.place(float(x), float(y))
+            car.speed = float(speed)
+        p.x, p.y = float(log["x"][i]), float(log["y"][i])
+        p.angle = float(log["angle"][i])
+        p.current_speed = float(log["speed"][i])
+        p.state = newfile.STATES[log["state"][i]]
+        lane = float(log["lane"][i])
+        p.lane_idx = int(lane) if lane.is_integer() else lane
+        d = int(log["detected"][i])
+        p.detected_obj = self.cars[d] if d >= 0 else None
+        p.rotate()
+
+        # Smoke: respawn the particles still alive at step i and age them
+        p.smoke_group.empty()
+        lo = np.searchsorted(self.smoke_steps, i - self.particle_steps, "right")
+        hi = np.searchsorted(self.smoke_steps, i, "right")
+        for step, x, y, size in log["smoke"][lo:hi]:
+            part = newfile.Particle(float(x), float(y), int(size))
+            p.smoke_group.add(part)
+            for _ in range(i - int(step)):
+                part.update(self.dt)
+
+    def event_steps(self, names=None):
+        bits = sum(EVENTS[k] for k in (names or EVENTS))
+        return np.flatnonzero(self.log["events"] & bits)
+
+
+def draw_timeline(surface, replay, i):
+    w, h = surface.get_size()
+    y = h - TIMELINE_H
+    pygame.draw.rect(surface, newfile.GRAY, (0, y, w, TIMELINE_H))
+    for name, bit in EVENTS.items():
+        for s in np.flatnonzero(replay.log["events"] & bit):
+            pygame.draw.line(surface, EVENT_COLORS[name], (s * w // replay.n, y), (s * w // replay.n, h))
+    x = i * w // max(1, replay.n - 1)
+    pygame.draw.rect(surface, newfile.WHITE, (x - 1, y - 2, 3, TIMELINE_H + 2))
+
+
+def view(path, speed=1.0, start=0.0):
+    """Space: pause, Left/Right: seek, Up/Down: playback speed, N/P: next/previous
+    event, ,/.: single step while paused, click the timeline to jump."""
+    newfile.init_display()
+    replay = Replay(path)
+    events = replay.event_steps()
+    pos = min(replay.n - 1, start / replay.dt)  # Fractional step index
+    paused = False
+    seek = int(round(SEEK_SECONDS / replay.dt))
+
+    running = True
+    while running:
+        frame_time = newfile.clock.tick(newfile.FPS) / 1000.0
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key in (pygame.K_ESCAPE, pygame.K_q):
+                    running = False
+                elif event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key == pygame.K_RIGHT:
+                    pos += seek
+                elif event.key == pygame.K_LEFT:
+                    pos -= seek
+                elif event.key == pygame.K_UP:
+                    speed *= 2
+                elif event.key == pygame.K_DOWN:
+                    speed /= 2
+                elif event.key == pygame.K_PERIOD:
+                    pos += 1
+                elif event.key == pygame.K_COMMA:
+                    pos -= 1
+                elif event.key == pygame.K_n and len(events):
+                    later = events[events > int(pos)]
+                    pos = later[0] if len(later) else pos
+                elif event.key == pygame.K_p and len(events):
+                    earlier = events[events < int(pos)]
+                    pos = earlier[-1] if len(earlier) else pos
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.pos[1] >= newfile.HEIGHT - TIMELINE_H:
+                pos = event.pos[0] / newfile.WIDTH * replay.n
+
+        if not paused:
+            pos += frame_time * speed / replay.dt
+        pos = min(max(pos, 0.0), replay.n - 1)
+
+        i = int(pos)
+        replay.frame(i)
+        replay.sim.draw(newfile.screen, speed)
+        draw_timeline(newfile.screen, replay, i)
+        label = newfile.font.render(f"{os.path.basename(path)}  step {i}/{replay.n}"
+                                    f"{'  PAUSED' if paused else ''}", True, newfile.BLACK)
+        newfile.screen.blit(label, (10, 30))
+        pygame.display.flip()
+
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded overtaking-sim episode")
+    parser.add_argument("path", help="episode-NNNN.npz, or a log directory with --list")
+    parser.add_argument("--list", action="store_true", help="List the episodes in a log directory")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed")
+    parser.add_argument("--start", type=float, default=0.0, help="Start time (s)")
+    args = parser.parse_args()
+    if args.list:
+        for path, duration, counts in list_episodes(args.path):
+            print(f"{os.path.basename(path)}  {duration:6.1f}s  " + "  ".join(f"{k}={v}" for k, v in counts.items()))
+        return
+    view(args.path, args.speed, args.start)
+
+
+if __name__ == "__main__":
+    main()
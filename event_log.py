@@ -0,0 +1,193 @@
+
+import json
+import sys
+import threading
+import time
+import atexit
+import config
+
+
+class EventLogger:
+    """Non-blocking structured event logger for the tick loop.
+
+    The hot path only drops (time, kind, fmt, args) into a preallocated ring
+    slot. Formatting and I/O happen on a background writer thread, so a slow
+    pipe or file never stalls a tick. Events of the same kind can be
+    rate-limited (seconds between emits) to keep per-tick cost bounded.
+    """
+
+    def __init__(self, path=None, capacity=None, rate_limits=None, flush_interval=None, fmt=None):
+        self.path = path if path is not None else config.LOG_FILE
+        self.capacity = capacity or config.LOG_BUFFER_SIZE
+        self.flush_interval = flush_interval or config.LOG_FLUSH_INTERVAL
+        self.fmt = fmt or config.LOG_FORMAT
+        self.rate_limits = dict(config.LOG_RATE_LIMITS if rate_limits is None else rate_limits)
+
+        # Preallocated ring (parallel slot lists, never resized)
+        self._t = [0.0] * self.capacity
+        self._kind = [None] * self.capacity
+        self._fmt = [None] * self.capacity
+        self._args = [None] * self.capacity
+        self._head = 0  # Next slot to write (producer)
+        self._tail = 0  # Next slot to read (writer)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._last_emit = {}
+
+        self._thread = None
+        self._stop = False
+        self._out = None
+
+        # Stats
+        self.emitted = 0
+        self.suppressed = 0
+        self.dropped = 0
+        self.written = 0
+        self.cost_ns = 0
+        self.max_cost_ns = 0
+        self.calls = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if self.path:
+            self._out = open(self.path, "a", buffering=1 << 16, encoding="utf-8")
+        else:
+            self._out = sys.stdout
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+        self._thread.start()
+
+    def event(self, kind, fmt, *args):
+        """Queue one event. Returns False if it was rate-limited or dropped."""
+        t0 = time.perf_counter_ns()
+        now = time.monotonic()
+        ok = True
+
+        limit = self.rate_limits.get(kind)
+        if limit:
+            last = self._last_emit.get(kind)
+            if last is not None and now - last < limit:
+                self.suppressed += 1
+                ok = False
+            else:
+                self._last_emit[kind] = now
+
+        if ok:
+            with self._lock:
+                pending = self._head - self._tail
+                if pending >= self.capacity:
+                    self.dropped += 1
+                    ok = False
+                else:
+                    i = self._head % self.capacity
+                    self._t[i] = time.time()
+                    self._kind[i] = kind
+                    self._fmt[i] = fmt
+                    self._args[i] = args
+                    self._head += 1
+                    self.emitted += 1
+            # Only wake the writer early when the ring is filling up
+            if ok and pending + 1 >= self.capacity // 2:
+                self._wake.set()
+            if self._thread is None:
+                self.start()
+
+        cost = time.perf_counter_ns() - t0
+        self.calls += 1
+        self.cost_ns += cost
+        if cost > self.max_cost_ns:
+            self.max_cost_ns = cost
+        return ok
+
+    def _drain(self):
+        with self._lock:
+            batch = []
+            while self._tail < self._head:
+                i = self._tail % self.capacity
+                batch.append((self._t[i], self._kind[i], self._fmt[i], self._args[i]))
+                self._args[i] = None
+                self._tail += 1
+        return batch
+
+    def _format(self, t, kind, fmt, args):
+        try:
+            msg = fmt.format(*args) if args else fmt
+        except Exception as e:
+            msg = f"{fmt} <format error: {e}>"
+        if self.fmt == "jsonl":
+            return json.dumps({"t": round(t, 4), "kind": kind, "msg": msg}, ensure_ascii=False)
+        return msg
+
+    def _write(self, batch):
+        if not batch:
+            return
+        lines = [self._format(*rec) for rec in batch]
+        try:
+            self._out.write("\n".join(lines) + "\n")
+            self._out.flush()
+        except (ValueError, OSError):
+            pass  # Sink closed underneath us (interpreter shutdown)
+        self.written += len(lines)
+
+    def _run(self):
+        while not self._stop:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._write(self._drain())
+        self._write(self._drain())
+
+    def flush(self):
+        """Synchronously write everything queued so far."""
+        self._wake.set()
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + 1.0
+        while self._tail < self._head and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._stop = True
+        self._wake.set()
+        self._thread.join(timeout=2.0)
+        self._thread = None
+        if self._out is not None and self._out is not sys.stdout:
+            self._out.close()
+        self._out = None
+
+    def stats(self):
+        mean_us = (self.cost_ns / self.calls / 1000.0) if self.calls else 0.0
+        return {
+            "calls": self.calls,
+            "emitted": self.emitted,
+            "suppressed": self.suppressed,
+            "dropped": self.dropped,
+            "written": self.written,
+            "mean_cost_us": mean_us,
+            "max_cost_us": self.max_cost_ns / 1000.0,
+        }
+
+
+_logger = None
+
+
+def get_logger():
+    global _logger
+    if _logger is None:
+        _logger = EventLogger()
+        _logger.start()
+        atexit.register(_logger.close)
+    return _logger
+
+
+def event(kind, fmt, *args):
+    """Log an event on the shared logger (see EventLogger.event)."""
+    return get_logger().event(kind, fmt, *args)
+
+
+def shutdown():
+    """Flush and stop the shared logger."""
+    if _logger is not None:
+        _logger.close()
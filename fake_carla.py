@@ -0,0 +1,820 @@
+
+"""Server-free stand-in for the `carla` module.
+
+Implements just enough of the CARLA Python API for this repo to run without
+a simulator: a closed two-lane ring road, kinematic vehicles, a synthetic
+radar and a synchronous world clock. Used by the benchmarks and offline
+tools; install it with fake_carla.install() before importing repo modules.
+"""
+import copy
+import math
+import sys
+import types
+import numpy as np
+
+
+# ---------------------------------------------------------------------------
+# Geometry
+
+class Vector3D:
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+    def __add__(self, o):
+        return type(self)(self.x + o.x, self.y + o.y, self.z + o.z)
+
+    def __sub__(self, o):
+        return type(self)(self.x - o.x, self.y - o.y, self.z - o.z)
+
+    def __mul__(self, k):
+        return type(self)(self.x * k, self.y * k, self.z * k)
+
+    __rmul__ = __mul__
+
+    def length(self):
+        return math.sqrt(self.x**2 + self.y**2 + self.z**2)
+
+    def __repr__(self):
+        return f"{type(self).__name__}(x={self.x:.2f}, y={self.y:.2f}, z={self.z:.2f})"
+
+
+class Location(Vector3D):
+    def distance(self, o):
+        return math.sqrt((self.x - o.x)**2 + (self.y - o.y)**2 + (self.z - o.z)**2)
+
+
+class Rotation:
+    def __init__(self, pitch=0.0, yaw=0.0, roll=0.0):
+        self.pitch, self.yaw, self.roll = float(pitch), float(yaw), float(roll)
+
+
+class Transform:
+    def __init__(self, location=None, rotation=None):
+        self.location = location if location is not None else Location()
+        self.rotation = rotation if rotation is not None else Rotation()
+
+    def get_forward_vector(self):
+        yaw = math.radians(self.rotation.yaw)
+        return Vector3D(math.cos(yaw), math.sin(yaw), 0.0)
+
+    def get_right_vector(self):
+        yaw = math.radians(self.rotation.yaw)
+        return Vector3D(-math.sin(yaw), math.cos(yaw), 0.0)
+
+    def _copy(self):
+        l, r = self.location, self.rotation
+        return Transform(Location(l.x, l.y, l.z), Rotation(r.pitch, r.yaw, r.roll))
+
+
+class VehicleControl:
+    def __init__(self, throttle=0.0, steer=0.0, brake=0.0, hand_brake=False, reverse=False,
+                 manual_gear_shift=False, gear=0):
+        self.throttle = float(throttle)
+        self.steer = float(steer)
+        self.brake = float(brake)
+        self.hand_brake = bool(hand_brake)
+        self.reverse = bool(reverse)
+        self.manual_gear_shift = manual_gear_shift
+        self.gear = gear
+
+
+class LaneType:
+    NONE = 1
+    Driving = 2
+    Shoulder = 4
+    Sidewalk = 8
+    Any = 0xFFFF
+
+
+class MapLayer:
+    NONE = 0
+    Buildings = 1
+    Decals = 2
+    Foliage = 4
+    Ground = 8
+    ParkedVehicles = 16
+    Particles = 32
+    Props = 64
+    StreetLights = 128
+    Walls = 256
+    All = 0xFFFF
+
+
+class WorldSettings:
+    def __init__(self):
+        self.synchronous_mode = False
+        self.fixed_delta_seconds = None
+        self.no_rendering_mode = False
+        self.max_substep_delta_time = 0.01
+        self.max_substeps = 10
+
+
+# ---------------------------------------------------------------------------
+# Road network: a rounded-rectangle ring with two same-direction lanes.
+
+class _Lane:
+    def __init__(self, lane_id, road_id, xy, width):
+        self.lane_id = lane_id
+        self.road_id = road_id
+        self.xy = xy
+        d = np.diff(xy, axis=0)
+        seg = np.hypot(d[:, 0], d[:, 1])
+        self.s = np.concatenate([[0.0], np.cumsum(seg)])
+        self.length = float(self.s[-1])
+        self.yaw = np.degrees(np.arctan2(d[:, 1], d[:, 0]))
+        self.yaw = np.append(self.yaw, self.yaw[-1])
+        self.width = width
+        self.successors = []
+        self.left = None
+        self.right = None
+
+    def pose_at(self, s):
+        s = min(max(s, 0.0), self.length)
+        i = min(int(np.searchsorted(self.s, s, side="right")) - 1, len(self.s) - 2)
+        t = (s - self.s[i]) / max(self.s[i + 1] - self.s[i], 1e-9)
+        p = self.xy[i] + t * (self.xy[i + 1] - self.xy[i])
+        return float(p[0]), float(p[1]), float(self.yaw[i])
+
+
+class Waypoint:
+    def __init__(self, cmap, lane, s):
+        self._map = cmap
+        self._lane = lane
+        self.s = float(s)
+        x, y, yaw = lane.pose_at(s)
+        self.transform = Transform(Location(x, y, 0.0), Rotation(yaw=yaw))
+        self.lane_type = LaneType.Driving
+        self.lane_width = lane.width
+        self.road_id = lane.road_id
+        self.lane_id = lane.lane_id
+        self.section_id = 0
+        self.is_junction = False
+        self.id = hash((lane.road_id, lane.lane_id, round(self.s, 2)))
+
+    def next(self, distance):
+        out = []
+        self._walk(self._lane, self.s + distance, out)
+        return out
+
+    def _walk(self, lane, s, out):
+        if s <= lane.length:
+            out.append(Waypoint(self._map, lane, s))
+            return
+        for succ in lane.successors:
+            self._walk(succ, s - lane.length, out)
+
+    def previous(self, distance):
+        lane, s = self._lane, self.s - distance
+        while s < 0.0:
+            preds = [l for l in self._map._lanes if lane in l.successors]
+            if not preds:
+                return []
+            lane = preds[0]
+            s += lane.length
+        return [Waypoint(self._map, lane, s)]
+
+    def next_until_lane_end(self, distance):
+        out = []
+        s = self.s + distance
+        while s < self._lane.length:
+            out.append(Waypoint(self._map, self._lane, s))
+            s += distance
+        out.append(Waypoint(self._map, self._lane, self._lane.length))
+        return out
+
+    def _neighbour(self, lane):
+        if lane is None:
+            return None
+        return Waypoint(self._map, lane, self.s / self._lane.length * lane.length)
+
+    def get_left_lane(self):
+        return self._neighbour(self._lane.left)
+
+    def get_right_lane(self):
+        return self._neighbour(self._lane.right)
+
+
+class Map:
+    name = "Carla/Maps/FakeRing"
+
+    def __init__(self, straight_x=400.0, straight_y=200.0, radius=40.0, lane_width=3.5):
+        self._lanes = []
+        # Lane 0 is the outer lane, lane 1 the inner one. The ring runs
+        # counter-clockwise in x/y, which is clockwise in CARLA's left-handed
+        # frame, so the inner lane is on the driver's right.
+        for lane_idx in range(2):
+            r = radius - lane_idx * lane_width
+            pts = self._ring(straight_x, straight_y, r)
+            n = len(pts)
+            quarter = n // 4
+            chunks = [pts[i * quarter:(i + 1) * quarter + 1] for i in range(3)]
+            chunks.append(np.vstack([pts[3 * quarter:], pts[:1]]))
+            lanes = [_Lane(-(lane_idx + 1), road, c, lane_width) for road, c in enumerate(chunks)]
+            for a, b in zip(lanes, lanes[1:] + lanes[:1]):
+                a.successors.append(b)
+            self._lanes.extend(lanes)
+        n_roads = len(self._lanes) // 2
+        for i in range(n_roads):
+            outer, inner = self._lanes[i], self._lanes[n_roads + i]
+            outer.right, inner.left = inner, outer
+
+        self._all_xy = np.vstack([l.xy for l in self._lanes])
+        self._all_ref = [(l, k) for l in self._lanes for k in range(len(l.xy))]
+
+    @staticmethod
+    def _ring(lx, ly, r, step=2.0):
+        pts = []
+        corners = [(lx, 0.0, -90.0), (lx, ly, 0.0), (0.0, ly, 90.0), (0.0, 0.0, 180.0)]
+        starts = [(0.0, -r), (lx + r, 0.0), (lx, ly + r), (-r, ly)]
+        for (cx, cy, a0), (sx, sy) in zip(corners, starts):
+            # Straight leading into this corner
+            ex, ey = cx + r * math.cos(math.radians(a0)), cy + r * math.sin(math.radians(a0))
+            n = max(int(math.hypot(ex - sx, ey - sy) / step), 1)
+            for t in np.linspace(0.0, 1.0, n, endpoint=False):
+                pts.append((sx + t * (ex - sx), sy + t * (ey - sy)))
+            m = max(int(0.5 * math.pi * r / step), 2)
+            for a in np.linspace(a0, a0 + 90.0, m, endpoint=False):
+                pts.append((cx + r * math.cos(math.radians(a)), cy + r * math.sin(math.radians(a))))
+        return np.array(pts)
+
+    def get_waypoint(self, location, project_to_road=True, lane_type=LaneType.Driving):
+        d = (self._all_xy[:, 0] - location.x)**2 + (self._all_xy[:, 1] - location.y)**2
+        lane, k = self._all_ref[int(np.argmin(d))]
+        return Waypoint(self, lane, lane.s[k])
+
+    def get_spawn_points(self):
+        out = []
+        for lane in self._lanes:
+            for s in np.arange(10.0, lane.length - 5.0, 40.0):
+                wp = Waypoint(self, lane, s)
+                tf = wp.transform
+                tf.location.z = 0.3
+                out.append(tf)
+        return out
+
+    def get_topology(self):
+        out = []
+        for lane in self._lanes:
+            out.append((Waypoint(self, lane, 0.0), Waypoint(self, lane, lane.length)))
+        return out
+
+    def generate_waypoints(self, distance):
+        out = []
+        for lane in self._lanes:
+            for s in np.arange(0.0, lane.length, distance):
+                out.append(Waypoint(self, lane, s))
+        return out
+
+
+# ---------------------------------------------------------------------------
+# Actors
+
+class ActorAttribute:
+    def __init__(self, value):
+        self.value = value
+
+    def as_float(self):
+        return float(self.value)
+
+    def as_int(self):
+        return int(float(self.value))
+
+    def as_str(self):
+        return str(self.value)
+
+
+class ActorBlueprint:
+    def __init__(self, bp_id):
+        self.id = bp_id
+        self.tags = bp_id.split(".")
+        self._attrs = {"role_name": "autopilot"}
+
+    def set_attribute(self, key, value):
+        self._attrs[key] = str(value)
+
+    def has_attribute(self, key):
+        return key in self._attrs
+
+    def get_attribute(self, key):
+        return ActorAttribute(self._attrs[key])
+
+
+class BlueprintLibrary:
+    def __init__(self):
+        ids = ["vehicle.tesla.model3", "vehicle.nissan.patrol", "vehicle.audi.a2",
+               "vehicle.toyota.prius", "vehicle.mini.cooper_s", "sensor.other.radar",
+               "sensor.camera.rgb"]
+        self._bps = [ActorBlueprint(i) for i in ids]
+
+    def filter(self, pattern):
+        import fnmatch
+        return [bp for bp in self._bps if fnmatch.fnmatch(bp.id, pattern)]
+
+    def find(self, bp_id):
+        for bp in self._bps:
+            if bp.id == bp_id:
+                return bp
+        raise IndexError(bp_id)
+
+    def __iter__(self):
+        return iter(self._bps)
+
+    def __len__(self):
+        return len(self._bps)
+
+
+class ActorList(list):
+    def filter(self, pattern):
+        import fnmatch
+        return ActorList(a for a in self if fnmatch.fnmatch(a.type_id, pattern))
+
+    def find(self, actor_id):
+        for a in self:
+            if a.id == actor_id:
+                return a
+        return None
+
+
+class Actor:
+    _next_id = 1
+
+    def __init__(self, world, blueprint, transform, parent=None):
+        self.id = Actor._next_id
+        Actor._next_id += 1
+        self.world = world
+        self.type_id = blueprint.id
+        self.attributes = dict(blueprint._attrs)
+        self.parent = parent
+        self._tf = transform._copy()
+        self.is_alive = True
+        self._vel = Vector3D()
+
+    def get_transform(self):
+        if self.parent is not None:
+            p = self.parent.get_transform()
+            yaw = math.radians(p.rotation.yaw)
+            l = self._tf.location
+            return Transform(Location(p.location.x + l.x * math.cos(yaw) - l.y * math.sin(yaw),
+                                      p.location.y + l.x * math.sin(yaw) + l.y * math.cos(yaw),
+                                      p.location.z + l.z),
+                             Rotation(yaw=p.rotation.yaw + self._tf.rotation.yaw))
+        return self._tf._copy()
+
+    def get_location(self):
+        return self.get_transform().location
+
+    def get_velocity(self):
+        return Vector3D(self._vel.x, self._vel.y, self._vel.z)
+
+    def set_transform(self, transform):
+        self._tf = transform._copy()
+
+    def set_target_velocity(self, v):
+        self._vel = Vector3D(v.x, v.y, v.z)
+
+    def set_target_angular_velocity(self, v):
+        pass
+
+    def set_simulate_physics(self, enabled=True):
+        pass
+
+    def destroy(self):
+        if self.is_alive:
+            self.is_alive = False
+            self.world._actors.pop(self.id, None)
+        return True
+
+
+class Vehicle(Actor):
+    WHEELBASE = 2.9
+    MAX_STEER = math.radians(70.0)
+    BOUNDING = (2.4, 1.0)  # half length, half width
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._control = VehicleControl()
+        self._speed = 0.0
+        self.autopilot = False
+        self.bounding_box = types.SimpleNamespace(extent=Vector3D(*self.BOUNDING, 0.8))
+
+    def apply_control(self, control):
+        self._control = control
+
+    def get_control(self):
+        return self._control
+
+    def set_autopilot(self, enabled=True, tm_port=8000):
+        self.autopilot = enabled
+
+    def set_target_velocity(self, v):
+        super().set_target_velocity(v)
+        self._speed = math.hypot(v.x, v.y)
+
+    def _step(self, dt):
+        c = self._control
+        if self.autopilot:
+            self._autopilot_step(dt)
+            return
+        accel = 4.0 * c.throttle - 8.0 * c.brake - 0.3 * self._speed * 0.1
+        if c.hand_brake:
+            accel = -10.0
+        self._speed = max(0.0, self._speed + accel * dt)
+        yaw = math.radians(self._tf.rotation.yaw)
+        delta = c.steer * self.MAX_STEER * 0.5
+        yaw += self._speed / self.WHEELBASE * math.tan(delta) * dt
+        self._tf.location.x += self._speed * math.cos(yaw) * dt
+        self._tf.location.y += self._speed * math.sin(yaw) * dt
+        self._tf.rotation.yaw = math.degrees(yaw)
+        self._vel = Vector3D(self._speed * math.cos(yaw), self._speed * math.sin(yaw), 0.0)
+
+    def _autopilot_step(self, dt):
+        # Lane keeping at a fixed cruise speed
+        target = 8.0
+        self._speed += max(-3.0 * dt, min(3.0 * dt, target - self._speed))
+        wp = self.world._map.get_waypoint(self._tf.location)
+        ahead = wp.next(max(self._speed * dt, 0.01))
+        if ahead:
+            tf = ahead[0].transform
+            self._tf.location.x, self._tf.location.y = tf.location.x, tf.location.y
+            self._tf.rotation.yaw = tf.rotation.yaw
+        yaw = math.radians(self._tf.rotation.yaw)
+        self._vel = Vector3D(self._speed * math.cos(yaw), self._speed * math.sin(yaw), 0.0)
+
+
+class RadarDetection:
+    __slots__ = ("velocity", "azimuth", "altitude", "depth")
+
+    def __init__(self, velocity, azimuth, altitude, depth):
+        self.velocity, self.azimuth, self.altitude, self.depth = velocity, azimuth, altitude, depth
+
+
+class RadarMeasurement:
+    def __init__(self, frame, timestamp, transform, points):
+        self.frame = frame
+        self.timestamp = timestamp
+        self.transform = transform
+        self._points = points
+        self.raw_data = memoryview(points.tobytes())
+
+    def __len__(self):
+        return len(self._points)
+
+    def __iter__(self):
+        for row in self._points.tolist():
+            yield RadarDetection(*row)
+
+    def get_detection_count(self):
+        return len(self._points)
+
+
+class Sensor(Actor):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._callback = None
+        self._rng = np.random.default_rng(self.id)
+
+    def listen(self, callback):
+        self._callback = callback
+
+    def stop(self):
+        self._callback = None
+
+    @property
+    def is_listening(self):
+        return self._callback is not None
+
+    def _measure(self, frame, timestamp, dt):
+        if self._callback is None or not self.type_id.startswith("sensor.other.radar"):
+            return
+        a = self.attributes
+        rng_max = float(a.get("range", 100.0))
+        hfov = math.radians(float(a.get("horizontal_fov", 30.0)))
+        vfov = math.radians(float(a.get("vertical_fov", 10.0)))
+        budget = max(1, int(float(a.get("points_per_second", 1500)) * dt))
+
+        tf = self.get_transform()
+        yaw = math.radians(tf.rotation.yaw)
+        me = self.parent.get_velocity() if self.parent else Vector3D()
+
+        # Rays uniformly over the FOV; a ray hits the nearest target box in
+        # range, otherwise the ground (dropped below ~0.5 depth probability).
+        az = self._rng.uniform(-hfov / 2, hfov / 2, budget)
+        alt = self._rng.uniform(-vfov / 2, vfov / 2, budget)
+        depth = np.full(budget, np.inf)
+        vel = np.zeros(budget)
+        ca, sa = np.cos(az + yaw), np.sin(az + yaw)
+        for other in self.world._actors.values():
+            if not isinstance(other, Vehicle) or other is self.parent:
+                continue
+            o = other._tf.location
+            dx, dy = o.x - tf.location.x, o.y - tf.location.y
+            along = dx * ca + dy * sa
+            perp = np.abs(-dx * sa + dy * ca)
+            hit = (along > 0) & (along < rng_max) & (perp < 1.0) & (along < depth)
+            if hit.any():
+                ov = other._vel
+                radial = (ov.x - me.x) * ca + (ov.y - me.y) * sa
+                depth = np.where(hit, along - 2.0 * (1.0 - perp), depth)
+                vel = np.where(hit, radial, vel)
+        keep = np.isfinite(depth) & (depth > 0)
+        pts = np.column_stack([vel[keep], az[keep], alt[keep], depth[keep]]).astype(np.float32)
+        self._callback(RadarMeasurement(frame, timestamp, tf, pts))
+
+
+# ---------------------------------------------------------------------------
+# World / client
+
+class Timestamp:
+    def __init__(self, frame, elapsed, delta):
+        self.frame = frame
+        self.elapsed_seconds = elapsed
+        self.delta_seconds = delta
+        self.platform_timestamp = elapsed
+
+
+class ActorSnapshot:
+    def __init__(self, actor):
+        self.id = actor.id
+        self._tf = actor.get_transform()
+        self._vel = actor.get_velocity()
+
+    def get_transform(self):
+        return self._tf
+
+    def get_velocity(self):
+        return self._vel
+
+
+class WorldSnapshot:
+    def __init__(self, world):
+        self.frame = world._frame
+        self.timestamp = Timestamp(world._frame, world._elapsed, world._settings.fixed_delta_seconds or 0.05)
+        self._world = world
+
+    def find(self, actor_id):
+        a = self._world._actors.get(actor_id)
+        return ActorSnapshot(a) if a else None
+
+    def __len__(self):
+        return len(self._world._actors)
+
+
+class World:
+    _next_id = 1
+
+    def __init__(self, cmap=None):
+        self.id = World._next_id
+        World._next_id += 1
+        self._map = cmap or Map()
+        self._bps = BlueprintLibrary()
+        self._actors = {}
+        self._settings = WorldSettings()
+        self._frame = 0
+        self._elapsed = 0.0
+        self._spectator = Actor(self, ActorBlueprint("spectator"), Transform())
+
+    def get_map(self):
+        return self._map
+
+    def get_blueprint_library(self):
+        return self._bps
+
+    def get_settings(self):
+        s = WorldSettings()
+        s.__dict__.update(self._settings.__dict__)
+        return s
+
+    def apply_settings(self, settings):
+        self._settings.__dict__.update(settings.__dict__)
+        return self._frame
+
+    def get_spectator(self):
+        return self._spectator
+
+    def get_actors(self, ids=None):
+        actors = ActorList(self._actors.values())
+        if ids is not None:
+            actors = ActorList(a for a in actors if a.id in ids)
+        return actors
+
+    def get_actor(self, actor_id):
+        return self._actors.get(actor_id)
+
+    def _blocked(self, transform, radius=4.0):
+        l = transform.location
+        for a in self._actors.values():
+            if isinstance(a, Vehicle) and a._tf.location.distance(l) < radius:
+                return True
+        return False
+
+    def try_spawn_actor(self, blueprint, transform, attach_to=None):
+        if blueprint.id.startswith("vehicle.") and self._blocked(transform):
+            return None
+        cls = Sensor if blueprint.id.startswith("sensor.") else Vehicle
+        actor = cls(self, blueprint, transform, parent=attach_to)
+        self._actors[actor.id] = actor
+        return actor
+
+    def spawn_actor(self, blueprint, transform, attach_to=None):
+        actor = self.try_spawn_actor(blueprint, transform, attach_to)
+        if actor is None:
+            raise RuntimeError("Spawn failed because of collision at spawn position")
+        return actor
+
+    def unload_map_layer(self, layers):
+        pass
+
+    def load_map_layer(self, layers):
+        pass
+
+    def get_snapshot(self):
+        return WorldSnapshot(self)
+
+    def tick(self, seconds=10.0):
+        dt = self._settings.fixed_delta_seconds or 0.05
+        for a in list(self._actors.values()):
+            if isinstance(a, Vehicle):
+                a._step(dt)
+        self._frame += 1
+        self._elapsed += dt
+        for a in list(self._actors.values()):
+            if isinstance(a, Sensor):
+                a._measure(self._frame, self._elapsed, dt)
+        return self._frame
+
+    def wait_for_tick(self, seconds=10.0):
+        self.tick()
+        return self.get_snapshot()
+
+
+class TrafficManager:
+    def __init__(self, port):
+        self._port = port
+
+    def get_port(self):
+        return self._port
+
+    def set_synchronous_mode(self, mode=True):
+        pass
+
+    def set_hybrid_physics_mode(self, enabled=False):
+        pass
+
+    def set_hybrid_physics_radius(self, r=50.0):
+        pass
+
+    def set_global_distance_to_leading_vehicle(self, distance):
+        pass
+
+    def set_random_device_seed(self, seed):
+        pass
+
+    def global_percentage_speed_difference(self, percentage):
+        pass
+
+
+class _Command:
+    def __init__(self, kind, *args):
+        self.kind = kind
+        self.args = args
+        self._then = []
+
+    def then(self, cmd):
+        self._then.append(cmd)
+        return self
+
+
+class _FutureActor:
+    pass
+
+
+FutureActor = _FutureActor()
+
+
+class command:
+    FutureActor = FutureActor
+
+    @staticmethod
+    def DestroyActor(actor):
+        return _Command("destroy", actor)
+
+    @staticmethod
+    def SpawnActor(blueprint, transform, parent=None):
+        bp = copy.copy(blueprint)  # The real command holds a copy: later set_attribute() calls don't leak in
+        bp._attrs = dict(blueprint._attrs)
+        return _Command("spawn", bp, transform, parent)
+
+    @staticmethod
+    def SetAutopilot(actor, enabled, tm_port=8000):
+        return _Command("autopilot", actor, enabled, tm_port)
+
+    @staticmethod
+    def SetSimulatePhysics(actor, enabled):
+        return _Command("physics", actor, enabled)
+
+    @staticmethod
+    def ApplyVehicleControl(actor, control):
+        return _Command("control", actor, control)
+
+    @staticmethod
+    def ApplyTransform(actor, transform):
+        return _Command("transform", actor, transform)
+
+    @staticmethod
+    def ApplyTargetVelocity(actor, velocity):
+        return _Command("velocity", actor, velocity)
+
+    @staticmethod
+    def ApplyTargetAngularVelocity(actor, velocity):
+        return _Command("angular", actor, velocity)
+
+
+class CommandResponse:
+    def __init__(self, actor_id=0, error=""):
+        self.actor_id = actor_id
+        self.error = error
+
+    def has_error(self):
+        return bool(self.error)
+
+
+class Client:
+    def __init__(self, host="localhost", port=2000, worker_threads=0):
+        self.host, self.port = host, port
+        self._world = World()
+        self._tms = {}
+
+    def set_timeout(self, seconds):
+        pass
+
+    def get_world(self):
+        return self._world
+
+    def load_world(self, map_name, reset_settings=True):
+        self._world = World()
+        return self._world
+
+    def reload_world(self, reset_settings=True):
+        return self.load_world(None)
+
+    def get_trafficmanager(self, port=8000):
+        if port not in self._tms:
+            self._tms[port] = TrafficManager(port)
+        return self._tms[port]
+
+    def get_server_version(self):
+        return "0.9.15-fake"
+
+    def get_client_version(self):
+        return "0.9.15-fake"
+
+    def _resolve(self, ref, parent_id):
+        if ref is FutureActor:
+            return self._world.get_actor(parent_id)
+        if isinstance(ref, int):
+            return self._world.get_actor(ref)
+        return ref
+
+    def _run(self, cmd, parent_id=0):
+        w = self._world
+        if cmd.kind == "spawn":
+            bp, tf, parent = cmd.args
+            actor = w.try_spawn_actor(bp, tf, self._resolve(parent, parent_id) if parent else None)
+            if actor is None:
+                return CommandResponse(error="Spawn failed because of collision at spawn position")
+            for sub in cmd._then:
+                self._run(sub, actor.id)
+            return CommandResponse(actor.id)
+        actor = self._resolve(cmd.args[0], parent_id)
+        if actor is None:
+            return CommandResponse(error="actor not found")
+        if cmd.kind == "destroy":
+            actor.destroy()
+        elif cmd.kind == "autopilot":
+            actor.set_autopilot(cmd.args[1], cmd.args[2])
+        elif cmd.kind == "control":
+            actor.apply_control(cmd.args[1])
+        elif cmd.kind == "transform":
+            actor.set_transform(cmd.args[1])
+        elif cmd.kind == "velocity":
+            actor.set_target_velocity(cmd.args[1])
+        elif cmd.kind == "angular":
+            actor.set_target_angular_velocity(cmd.args[1])
+        return CommandResponse(actor.id)
+
+    def apply_batch(self, commands):
+        for c in commands:
+            self._run(c)
+
+    def apply_batch_sync(self, commands, do_tick=False):
+        out = [self._run(c) for c in commands]
+        if do_tick:
+            self._world.tick()
+        return out
+
+
+def install():
+    """Register this module as `carla` (no-op if already installed)."""
+    module = sys.modules[__name__]
+    sys.modules.setdefault("carla", module)
+    return sys.modules["carla"]
@@ -0,0 +1,200 @@
+
+import argparse
+import multiprocessing as mp
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import pygame
+import newfile
+
+FRAME_SIZE = (200, 150)   # Saved frame size (W, H); None keeps the full 800x600
+CHUNK_SIZE = 256          # Frames per .npz file
+CAPTURE_EVERY = 6         # Physics steps between frames (10 Hz at 60 Hz physics)
+EPISODE_STEPS = 3600      # New Sim after this many steps (1 min)
+
+
+def frame_labels(sim):
+    """Per-frame labels: player state, detected obstacle, planned path, traffic."""
+    p = sim.player
+    obstacle = np.full(3, np.nan, dtype=np.float32)  # x, y, gap (px)
+    if p.detected_obj is not None:
+        r = p.detected_obj.rect
+        obstacle[:] = (r.centerx, r.centery, p.rect.top - r.bottom)
+    path = np.full(newfile.OVERTAKE_STEPS, np.nan, dtype=np.float32)
+    if p.state == "OVERTAKE":
+        rest = [x for x, _ in p.path_points[p.path_index:]]
+        path[:len(rest)] = rest
+    return {
+        "step": sim.steps,
+        "time": sim.time,
+        "state": newfile.STATES.index(p.state),
+        "lane": float(p.lane_idx),
+        "x": float(p.x),
+        "speed": float(p.current_speed),
+        "target_lane": float(p.target_lane_idx) if p.state == "OVERTAKE" else np.nan,
+        "detected": p.detected_obj is not None,
+        "obstacle": obstacle,
+        "path": path,  # Remaining x of the lane change, one per physics step
+        "traffic": np.array([(c.x, c.y, c.speed) for c in sim.traffic_group], dtype=np.float32),
+    }
+
+
+class ChunkWriter:
+    """Frames + labels buffered into fixed-size chunks, compressed by a thread pool.
+
+    zlib releases the GIL, so encoding overlaps with the caller's sim/render
+    work. At most max_pending chunks are queued; add() blocks beyond that
+    so a slow disk throttles the producer instead of eating memory. Files
+    appear atomically (written under a temporary name, then renamed).
+    """
+
+    def __init__(self, out_dir, chunk_size=CHUNK_SIZE, workers=2, prefix="frames", max_pending=None):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.chunk_size = chunk_size
+        self.prefix = prefix
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="chunk-writer")
+        self.slots = threading.BoundedSemaphore(max_pending or 2 * workers)
+        self.futures = []
+        self.chunks = 0
+        self.written = 0
+        self.frames = None
+        self.labels = None
+        self.n = 0
+
+    def _alloc(self, frame, labels):
+        self.frames = np.empty((self.chunk_size,) + frame.shape, dtype=frame.dtype)
+        self.labels = {}
+        for key, value in labels.items():
+            value = np.asarray(value)
+            self.labels[key] = np.empty((self.chunk_size,) + value.shape, dtype=value.dtype)
+
+    def add(self, frame, labels):
+        """Copy one (H, W, 3) frame (may be a surfarray view) and its labels into the chunk."""
+        if self.frames is None:
+            self._alloc(frame, labels)
+        self.frames[self.n] = frame
+        for key, value in labels.items():
+            self.labels[key][self.n] = value
+        self.n += 1
+        if self.n == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.n:
+            return
+        n = self.n
+        path = os.path.join(self.out_dir, f"{self.prefix}-{self.chunks:05d}.npz")
+        arrays = dict((k, v[:n]) for k, v in self.labels.items())
+        arrays["frames"] = self.frames[:n]
+        self.slots.acquire()
+        future = self.pool.submit(self._write, path, arrays)
+        future.add_done_callback(lambda _: self.slots.release())
+        self.futures.append(future)
+        self.chunks += 1
+        self.written += n
+        # The pool owns the submitted buffers; next chunk gets fresh ones
+        self.frames = self.labels = None
+        self.n = 0
+
+    @staticmethod
+    def _write(path, arrays):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp, path)
+        return path
+
+    def close(self):
+        """Flush the partial chunk and wait for every file. Re-raises write errors."""
+        self.flush()
+        self.pool.shutdown(wait=True)
+        for future in self.futures:
+            future.result()
+        self.futures = []
+
+
+class FrameCapture:
+    """Offscreen renderer for a newfile.Sim: draws to a plain Surface, no window."""
+
+    def __init__(self, size=FRAME_SIZE, hud=False):
+        if hud:
+            newfile.init_offscreen()
+        self.hud = hud
+        self.canvas = pygame.Surface((newfile.WIDTH, newfile.HEIGHT))
+        full = size is None or tuple(size) == (newfile.WIDTH, newfile.HEIGHT)
+        self.out = self.canvas if full else pygame.Surface(size)
+
+    def capture(self, sim, writer, episode=0):
+        sim.draw(self.canvas, hud=self.hud)
+        if self.out is not self.canvas:
+            pygame.transform.smoothscale(self.canvas, self.out.get_size(), self.out)
+        view = pygame.surfarray.pixels3d(self.out)  # (W, H, 3) view into the Surface
+        labels = frame_labels(sim)
+        labels["episode"] = episode
+        try:
+            writer.add(view.transpose(1, 0, 2), labels)
+        finally:
+            del view  # Unlock the Surface for the next draw
+
+
+def generate(out_dir, frames, every=CAPTURE_EVERY, size=FRAME_SIZE, chunk_size=CHUNK_SIZE,
+             writers=2, seed=0, episode_steps=EPISODE_STEPS, prefix="frames", hud=False):
+    """Run the sim and capture `frames` labelled frames into out_dir. Returns frames written."""
+    random.seed(seed)
+    sim = newfile.Sim()
+    capture = FrameCapture(size, hud)
+    writer = ChunkWriter(out_dir, chunk_size, writers, prefix)
+    episode = 0
+    try:
+        for _ in range(frames):
+            for _ in range(every):
+                sim.step()
+            if sim.steps >= episode_steps:
+                sim.reset()
+                episode += 1
+            capture.capture(sim, writer, episode)
+    finally:
+        writer.close()
+    return writer.written
+
+
+def _shard(args):
+    index, out_dir, frames, seed, kwargs = args
+    return generate(out_dir, frames, seed=seed, prefix=f"shard{index:02d}", **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Labelled bird's-eye frames from the overtaking sim")
+    parser.add_argument("out_dir")
+    parser.add_argument("--frames", type=int, default=10000)
+    parser.add_argument("--every", type=int, default=CAPTURE_EVERY, help="Physics steps between frames")
+    parser.add_argument("--size", default="x".join(map(str, FRAME_SIZE)), help="WxH, or 'full'")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="Frames per .npz file")
+    parser.add_argument("--writers", type=int, default=2, help="Compression threads per process")
+    parser.add_argument("--procs", type=int, default=1, help="Independent sim processes (shards)")
+    parser.add_argument("--hud", action="store_true", help="Keep the sensor box and text overlay")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    size = None if args.size == "full" else tuple(int(v) for v in args.size.split("x"))
+    kwargs = dict(every=args.every, size=size, chunk_size=args.chunk, writers=args.writers, hud=args.hud)
+    t0 = time.perf_counter()
+    if args.procs > 1:
+        counts = [len(a) for a in np.array_split(np.arange(args.frames), args.procs)]
+        jobs = [(i, args.out_dir, n, args.seed + i, kwargs) for i, n in enumerate(counts)]
+        with mp.Pool(args.procs) as pool:
+            total = sum(pool.map(_shard, jobs))
+    else:
+        total = generate(args.out_dir, args.frames, seed=args.seed, **kwargs)
+    dt = time.perf_counter() - t0
+    print(f"📸 {total} frames in {dt:.1f}s ({total / dt:.0f} frames/s, {total / dt * 3600:.0f}/h) -> {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
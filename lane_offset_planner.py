@@ -1,12 +1,22 @@
 import carla
 import math
+import numpy as np
+import utils
 
 class LaneOffsetPlanner:
     def __init__(self, world):
         self.world = world
 
-    def generate_path(self, start_location, offset, length=80.0, step=2.0):
-        m = self.world.get_map()
+    def generate_path(self, start_location, offset, length=80.0, step=2.0, route=None):
+        """Points every `step` m down the lane, shifted `offset` m to the side (+ right).
+
+        offset can also be a lateral profile, an (s, d) pair of arrays over
+        the distance from start_location (e.g. BSplinePlanner.lateral_profile).
+        """
+        if route is not None:
+            return self._offset_route(route, start_location, offset, length, step)
+        
+        m = utils.get_map(self.world)
         wp = m.get_waypoint(start_location)
 
         path = []
@@ -17,13 +27,15 @@ class LaneOffsetPlanner:
             if not next_wps:
                 break
             wp = next_wps[0]
+            dist += step
 
             transform = wp.transform
             yaw = math.radians(transform.rotation.yaw)
+            d = self._offset_at(offset, dist)
 
             # Lateral offset (left/right)
-            ox = -math.sin(yaw) * offset
-            oy =  math.cos(yaw) * offset
+            ox = -math.sin(yaw) * d
+            oy =  math.cos(yaw) * d
 
             loc = transform.location
             shifted = carla.Location(
@@ -33,6 +45,26 @@ class LaneOffsetPlanner:
             )
 
             path.append((shifted.x, shifted.y))
-            dist += step
 
         return path
+
+    @staticmethod
+    def _offset_at(offset, dist):
+        if np.isscalar(offset):
+            return offset
+        return np.interp(dist, offset[0], offset[1])
+
+    def _offset_route(self, route, start_location, offset, length, step):
+        """Same output as generate_path, sampled from a precomputed route."""
+        idx = route.project(start_location.x, start_location.y)
+        dist = np.arange(step, length + 1e-6, step)
+        s = route.s[idx] + dist
+        keep = s <= route.length
+        s, dist = s[keep], dist[keep]
+        x = np.interp(s, route.s, route.xy[:, 0])
+        y = np.interp(s, route.s, route.xy[:, 1])
+        yaw = np.interp(s, route.s, np.unwrap(route.yaw))
+        d = self._offset_at(offset, dist)
+        x = x - np.sin(yaw) * d
+        y = y + np.cos(yaw) * d
+        return list(zip(x.tolist(), y.tolist()))
@@ -1,44 +1,149 @@
 
 import carla
+import os
 import time
 import config
 import utils
+from timing import StageTimer
+import event_log
+from event_log import event
 from simple_agent import SimpleAgent
+from decision import DecisionEngine
+from controller import Controller
+from watchdog import TickWatchdog
+from telemetry import TickRecorder
+from radar_log import RadarRecorder
+from episode import EpisodeRecorder, make_rng, destination_rng
+from traffic_spawner import TrafficSpawner
+from agent_loop import step, respawn_obstacle
+import metrics as live_metrics
+import scenarios
+
+def record_tick(recorder, world, ego, agent, ttc, control):
+    snap = world.get_snapshot()
+    v = ego.get_velocity()
+    recorder.record(snap.frame, snap.timestamp.elapsed_seconds, ego.get_transform(),
+                    (v.x**2 + v.y**2)**0.5, agent.obstacle_dist, agent.obstacle_vel,
+                    agent.state, ttc, control, agent.radar.tick_points)
+
+def load_scenario():
+    """The scenario main.py runs: SCENARIO_FILE[SCENARIO_INDEX], else the built-in one."""
+    if config.SCENARIO_FILE:
+        return scenarios.load(config.SCENARIO_FILE)[config.SCENARIO_INDEX]
+    return dict(scenarios.DEFAULT, traffic=config.TRAFFIC_VEHICLES)
 
 def main():
+    spec = load_scenario()
+    scenarios.apply_config(spec["config"])  # Before anything reads config
     client = carla.Client(config.HOST, config.PORT)
     client.set_timeout(config.TIMEOUT)
     
-    print("🚀 Ver.RADAR V3 (Lite) Starting...")
+    event("main", "🚀 Ver.RADAR V3 (Lite) Starting...")
     
     try:
         # 1. Setup
-        world = utils.setup_world(client)
-        ego = utils.spawn_safe_ego(world)
-        agent = SimpleAgent(world, ego)
+        startup = StageTimer()
+        if scenarios.needs_map(client.get_world(), spec):
+            with startup.stage("load_world"):
+                client.load_world(spec["map"])
+        with startup.stage("setup_world (wall)"):
+            world = utils.setup_world(client, timer=startup)
+        seed, rng = make_rng(spec["seed"])
+        episode = EpisodeRecorder(seed, utils.get_map(world).name)
+        episode.meta["config"] = spec["config"]  # Replays apply the same overrides
+        event("main", "🎲 Episode seed: {} (scenario {})", seed, spec["name"])
+        
+        # Ego, obstacles and traffic resolved up front, then spawned in one batch
+        with startup.stage("compile_scenario"):
+            plan = scenarios.compile_plan(world, dict(spec, seed=seed))
+        with startup.stage("spawn_batch"):
+            ego, _, vehicles = scenarios.realize(client, world, plan)
+        episode.add_actor("ego", ego.type_id, plan.ego)
+        for bp_id, tf in plan.obstacles:
+            episode.add_actor("obstacle", bp_id, tf)
+        for bp_id, tf in plan.traffic:
+            episode.add_actor("traffic", bp_id, tf)
+        decision = DecisionEngine()
+        controller = Controller()
+        metrics = live_metrics.serve()  # None unless METRICS_PORT is set
+        watchdog = TickWatchdog(metrics=metrics)
+        
+        run_name = time.strftime("run_%Y%m%d_%H%M%S")
+        recorder = None
+        radar_recorder = None
+        if config.TELEMETRY_DIR:
+            run_dir = os.path.join(config.TELEMETRY_DIR, run_name)
+            recorder = TickRecorder(run_dir)
+            if config.RECORD_RADAR:
+                radar_recorder = RadarRecorder(os.path.join(run_dir, "radar.bin"))
+            event("main", "📼 Recording telemetry to {}", run_dir)
+        
+        with startup.stage("agent_init"):
+            agent = SimpleAgent(world, ego, radar_recorder=radar_recorder, watchdog=watchdog)
+        
+        destinations = utils.get_spawn_points(world)
+        dest_rng = destination_rng(seed)
         
-        utils.spawn_obstacle(world, ego, distance=150.0)
+        def next_destination():
+            location = dest_rng.choice(destinations).location
+            episode.add_destination(location)  # Replays re-apply it on the same tick
+            agent.set_destination(location)
         
-        print("✅ System Online. Stable 30Hz Loop.")
+        next_destination()
+        
+        traffic = None
+        if vehicles:
+            traffic = TrafficSpawner(world, ego, rng=rng, client=client)
+            traffic.tm.set_random_device_seed(seed)
+            episode.meta["tm_seed"] = seed
+            traffic.spawned = vehicles
+        
+        if metrics:
+            # Read by the server thread at scrape time
+            metrics.register("agent_watchdog_frames", lambda: watchdog.frames, outcome="total")
+            metrics.register("agent_watchdog_frames", lambda: watchdog.degraded, outcome="degraded")
+            metrics.register("agent_watchdog_frames", lambda: watchdog.overruns, outcome="over_budget")
+            if traffic:
+                metrics.register("agent_traffic_vehicles", lambda: len(traffic.spawned))
+            metrics.inc("agent_obstacles_spawned_total", 0)
+        
+        event("main", "✅ System Online. Stable 30Hz Loop.")
         
         # 2. Loop
         frame = 0
         clock = time.time()
-        last_spawn_time = time.time()
+        last_spawn_time = utils.sim_time(world)
         
         while True:
             # Physics
+            step_start = time.perf_counter()
             world.tick()
-            utils.update_spectator(world, ego)
+            step_time = time.perf_counter() - step_start
+            if traffic: traffic.record_step(step_time)
+            watchdog.begin()  # Frame budget starts once the server step is back
+            if metrics:
+                metrics.tick(utils.sim_time(world))
+                metrics.observe("agent_stage_seconds", step_time, stage="world_tick")
+            
+            # Agent, emergency override, control (same step as replays)
+            control, _, ttc = step(ego, agent, decision, controller, watchdog, episode=episode,
+                                   next_destination=next_destination, metrics=metrics)
+            
+            # Everything below can slip a frame when the budget runs low
+            watchdog.deferrable("spectator", utils.update_spectator, world, ego)
+            
+            # Periodic Spawning (scenario respawn: every 20s sim time at 80m by default)
+            _, last_spawn_time = respawn_obstacle(world, ego, plan.respawn, watchdog, last_spawn_time,
+                                                  episode=episode, metrics=metrics)
             
-            # Periodic Spawning (Every 20s, further away)
-            if time.time() - last_spawn_time > 20.0:
-                 utils.spawn_obstacle(world, ego, distance=80.0)
-                 last_spawn_time = time.time()
+            if startup:
+                startup.report("Time to first tick")
+                startup = None
             
-            # Agent Logic
-            control = agent.tick()
-            ego.apply_control(control)
+            # Telemetry
+            if recorder:
+                watchdog.deferrable("telemetry", record_tick, recorder, world, ego, agent, ttc, control)
+            watchdog.end()
             
             # Stats (Every 1s)
             frame += 1
@@ -49,17 +154,31 @@ def main():
                 
                 v = ego.get_velocity()
                 spd = 3.6 * (v.x**2 + v.y**2)**0.5
-                print(f"⏱️ FPS: {fps:.1f} | Spd: {spd:.1f} | State: {agent.state}")
+                event("stats", "⏱️ FPS: {:.1f} | Spd: {:.1f} | State: {}", fps, spd, agent.state)
 
     except KeyboardInterrupt:
-        print("\nStopping...")
+        event("main", "\nStopping...")
     except Exception as e:
-        print(f"CRITICAL: {e}")
+        event("main", "CRITICAL: {}", e)
     finally:
-        print("🧹 Cleanup...")
-        if 'agent' in locals(): agent.destroy()
-        utils.setup_world(client) # Re-runs nuclear cleanup
-        print("👋 Done.")
+        event("main", "🧹 Cleanup...")
+        if 'watchdog' in locals(): watchdog.report()
+        if 'traffic' in locals() and traffic: traffic.report()
+        if 'agent' in locals():
+            agent.radar.report()
+            agent.destroy()
+        if 'recorder' in locals() and recorder: recorder.close()
+        if 'radar_recorder' in locals() and radar_recorder: radar_recorder.close()
+        if 'run_name' in locals() and episode.frame and config.EPISODE_DIR:
+            episode.meta["skips"] = watchdog.skip_log  # Replays skip the same stages
+            episode.save(os.path.join(config.EPISODE_DIR, run_name + ".npz"))
+        utils.setup_world(client, prefetch=False) # Re-runs nuclear cleanup
+        st = event_log.get_logger().stats()
+        event("main", "📝 Log: {} events, {} suppressed, {} dropped, {:.1f}us/call (max {:.1f}us)",
+              st["emitted"], st["suppressed"], st["dropped"], st["mean_cost_us"], st["max_cost_us"])
+        live_metrics.shutdown()
+        event("main", "👋 Done.")
+        event_log.shutdown()
 
 if __name__ == "__main__":
     main()
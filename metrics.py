@@ -0,0 +1,250 @@
+import os
+import resource
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import config
+from event_log import event
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Ring:
+    """Last n samples plus running count/sum. One writer, no lock: readers copy."""
+
+    def __init__(self, n):
+        self.buf = np.zeros(n)
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, value):
+        self.buf[self.count % len(self.buf)] = value
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        return self.buf[:min(self.count, len(self.buf))].copy()
+
+
+class Metrics:
+    """In-process metrics for the control loop, rendered as Prometheus text.
+
+    The loop thread only writes: observe() drops a sample into a per-series
+    ring, inc()/set() update plain dict entries. Quantiles, rates and
+    callback gauges (register()) are computed by the server thread at
+    scrape time from copies, so the hot path never takes a lock.
+    """
+
+    def __init__(self, window=None):
+        self.window = window or config.METRICS_WINDOW
+        self.rings = {}     # (name, labels) -> Ring
+        self.counters = {}  # (name, labels) -> value
+        self.gauges = {}
+        self.callbacks = []  # (name, labels, fn)
+        self.help = {}
+        self.wall0 = time.perf_counter()
+        self.wall = self.wall0
+        self.sim = None
+        self.sim0 = None
+        self._last_scrape = None  # (wall, sim) for the realtime factor
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(labels.items()))
+        ring = self.rings.get(key)
+        if ring is None:
+            ring = self.rings[key] = Ring(self.window)
+        ring.add(value)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(labels.items()))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        self.gauges[(name, tuple(labels.items()))] = value
+
+    def register(self, name, fn, **labels):
+        """Gauge read by calling fn() at scrape time (e.g. lambda: len(spawner.spawned))."""
+        self.callbacks.append((name, tuple(labels.items()), fn))
+
+    def tick(self, sim_time):
+        """Once per world tick: sim clock against wall clock."""
+        self.wall = time.perf_counter()
+        if self.sim0 is None:
+            self.sim0 = sim_time
+        self.sim = sim_time
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        items = list(labels) + list(extra)
+        if not items:
+            return ""
+        return "{" + ",".join('{}="{}"'.format(k, str(v).replace('"', '\\"')) for k, v in items) + "}"
+
+    def _head(self, out, name, kind):
+        if name in self.help:
+            out.append(f"# HELP {name} {self.help[name]}")
+        out.append(f"# TYPE {name} {kind}")
+
+    def _realtime_factor(self):
+        wall, sim = self.wall, self.sim
+        if sim is None:
+            return None
+        prev = self._last_scrape or (self.wall0, self.sim0)
+        self._last_scrape = (wall, sim)
+        if wall - prev[0] <= 0:
+            return None
+        return (sim - prev[1]) / (wall - prev[0])
+
+    def render(self):
+        """Prometheus text exposition (format 0.0.4)."""
+        out = []
+        by_name = {}
+        for (name, labels), ring in list(self.rings.items()):
+            by_name.setdefault(name, []).append((labels, ring))
+        for name, series in by_name.items():
+            self._head(out, name, "summary")
+            for labels, ring in series:
+                samples = ring.snapshot()
+                if len(samples):
+                    for q, v in zip(QUANTILES, np.quantile(samples, QUANTILES)):
+                        out.append(f"{name}{self._labels(labels, [('quantile', q)])} {v:.9g}")
+                out.append(f"{name}_sum{self._labels(labels)} {ring.sum:.9g}")
+                out.append(f"{name}_count{self._labels(labels)} {ring.count}")
+
+        for kind, values in (("counter", dict(self.counters)), ("gauge", dict(self.gauges))):
+            seen = set()
+            for (name, labels), value in sorted(values.items()):
+                if name not in seen:
+                    self._head(out, name, kind)
+                    seen.add(name)
+                out.append(f"{name}{self._labels(labels)} {value:.9g}")
+
+        seen = set()
+        for name, labels, fn in list(self.callbacks):
+            try:
+                value = float(fn())
+            except Exception:
+                continue
+            if name not in seen:
+                self._head(out, name, "gauge")
+                seen.add(name)
+            out.append(f"{name}{self._labels(labels)} {value:.9g}")
+
+        if self.sim is not None:
+            self._head(out, "agent_sim_time_seconds", "gauge")
+            out.append(f"agent_sim_time_seconds {self.sim - self.sim0:.9g}")
+        self._head(out, "agent_wall_time_seconds", "gauge")
+        out.append(f"agent_wall_time_seconds {self.wall - self.wall0:.9g}")
+        factor = self._realtime_factor()
+        if factor is not None:
+            self._head(out, "agent_realtime_factor", "gauge")
+            out.append(f"agent_realtime_factor {factor:.6g}")
+        rss = rss_bytes()
+        if rss is not None:
+            self._head(out, "process_resident_memory_bytes", "gauge")
+            out.append(f"process_resident_memory_bytes {rss}")
+        return "\n".join(out) + "\n"
+
+
+def rss_bytes():
+    """Current resident set size (Linux /proc), else peak RSS from getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        try:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except (OSError, AttributeError):
+            return None
+
+
+class MetricsServer:
+    """Serves Metrics.render() at http://host:port/metrics from a daemon thread."""
+
+    def __init__(self, metrics, host=None, port=None):
+        self.metrics = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split("?")[0] not in ("/", "/metrics"):
+                    handler.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                handler.send_response(200)
+                handler.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, fmt, *args):
+                pass  # Scrapes would flood the event log
+
+        self.httpd = ThreadingHTTPServer((host or config.METRICS_HOST, config.METRICS_PORT if port is None
+                                          else port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="metrics", daemon=True)
+
+    @property
+    def address(self):
+        return self.httpd.server_address
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+_metrics = None
+_server = None
+
+
+def get_metrics():
+    """Shared Metrics instance (created on first use)."""
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics()
+        for name, text in HELP.items():
+            _metrics.describe(name, text)
+    return _metrics
+
+
+def serve(port=None):
+    """Start the shared metrics server if a port is configured. Returns the Metrics or None."""
+    global _server
+    port = config.METRICS_PORT if port is None else port
+    if port is None:
+        return None
+    if _server is None:
+        _server = MetricsServer(get_metrics(), port=port).start()
+        host, bound = _server.address[:2]
+        event("main", "📈 Metrics on http://{}:{}/metrics", host, bound)
+    return get_metrics()
+
+
+def shutdown():
+    global _server
+    if _server is not None:
+        _server.close()
+        _server = None
+
+
+HELP = {
+    "agent_stage_seconds": "Latency of each tick stage over the last METRICS_WINDOW runs",
+    "agent_radar_points": "Radar points received per tick",
+    "agent_ticks_total": "World ticks driven by the agent loop",
+    "agent_state_transitions_total": "SimpleAgent state changes",
+    "agent_obstacles_spawned_total": "Obstacles spawned by the main loop",
+    "agent_traffic_vehicles": "Live vehicles from the traffic spawner",
+    "agent_watchdog_frames": "Watchdog frames by outcome",
+    "agent_sim_time_seconds": "Simulation time since the first tick",
+    "agent_wall_time_seconds": "Wall time since metrics started",
+    "agent_realtime_factor": "Sim seconds per wall second since the previous scrape",
+    "process_resident_memory_bytes": "Resident set size",
+}
@@ -0,0 +1,130 @@
+
+import math
+import numpy as np
+import config
+
+
+def path_heading(xy):
+    """Heading (rad, unwrapped) and signed curvature (1/m) along an (n, 2) polyline."""
+    xy = np.asarray(xy, dtype=np.float64)
+    if len(xy) < 2:
+        return np.zeros(len(xy)), np.zeros(len(xy))
+    d = np.diff(xy, axis=0)
+    seg = np.unwrap(np.arctan2(d[:, 1], d[:, 0]))
+    yaw = np.concatenate([seg, seg[-1:]])
+    if len(xy) < 3:
+        return yaw, np.zeros(len(xy))
+    s = np.concatenate([[0.0], np.cumsum(np.hypot(d[:, 0], d[:, 1]))])
+    mid = 0.5 * (s[1:] + s[:-1])  # Segment headings live at segment midpoints
+    kappa = np.gradient(seg, mid) if len(seg) > 1 else np.zeros(1)
+    return yaw, np.interp(s, mid, kappa)
+
+
+class MPCLateral:
+    """Linear MPC steering on a kinematic bicycle, in path-error coordinates.
+
+    State is (lateral error, heading error) relative to the reference path,
+    input is path curvature. Over the horizon the model is linear in the
+    errors, the reference curvatures and the previous input, so the
+    unconstrained QP's first move is a fixed linear map of those. That map
+    (the factorized Hessian solve folded in) depends only on speed: it is
+    built once per MPC_SPEED_BIN and each solve is an interp and a dot
+    product. Steering limits clip the first move, like the pure pursuit
+    followers do.
+    """
+
+    def __init__(self, horizon=None, dt=None, wheelbase=None, max_steer_deg=None):
+        self.horizon = horizon or config.MPC_HORIZON
+        self.dt = dt or config.MPC_DT
+        self.wheelbase = wheelbase or config.MPC_WHEELBASE
+        self.max_steer = math.radians(max_steer_deg or config.MPC_MAX_STEER_DEG)
+        self._gains = {}  # Speed bin -> (g_e (2,), g_k (N,), g_u)
+        self._steps = np.arange(self.horizon) * self.dt
+        self.xy = None
+        self.s = None
+        self.yaw = None
+        self.kappa = None
+        self.index = 0
+        self.u_prev = 0.0  # Curvature applied last tick
+
+    def set_path(self, xy, yaw=None):
+        """Reference polyline (n, 2); yaw (rad) is derived from it if not given."""
+        self.xy = np.ascontiguousarray(xy, dtype=np.float64)
+        heading, self.kappa = path_heading(self.xy)
+        self.yaw = heading if yaw is None else np.unwrap(np.asarray(yaw, dtype=np.float64))
+        if len(self.xy) > 1:
+            self.s = np.concatenate([[0.0], np.cumsum(np.hypot(*np.diff(self.xy, axis=0).T))])
+        else:
+            self.s = np.zeros(len(self.xy))
+        self.index = 0
+
+    def reset(self):
+        self.index = 0
+        self.u_prev = 0.0
+
+    def gain(self, speed):
+        """First-move gains for the speed bin of `speed` (built on first use)."""
+        b = int(round(max(speed, config.MPC_MIN_SPEED) / config.MPC_SPEED_BIN))
+        g = self._gains.get(b)
+        if g is None:
+            g = self._gains[b] = self._build(max(b * config.MPC_SPEED_BIN, config.MPC_MIN_SPEED))
+        return g
+
+    def _build(self, v):
+        n, dt = self.horizon, self.dt
+        A = np.array([[1.0, v * dt], [0.0, 1.0]])
+        B = np.array([0.5 * v * v * dt * dt, v * dt])
+
+        # Condensed prediction: errors e_1..e_N = Phi e_0 + Gamma (u - kappa_ref)
+        phi = np.empty((2 * n, 2))
+        gamma = np.zeros((2 * n, n))
+        Ak = np.eye(2)
+        AkB = [B]
+        for k in range(n):
+            Ak = A @ Ak
+            phi[2 * k:2 * k + 2] = Ak
+            if k:
+                AkB.append(A @ AkB[-1])
+            for j in range(k + 1):
+                gamma[2 * k:2 * k + 2, j] = AkB[k - j]
+        q = np.tile([config.MPC_Q_Y, config.MPC_Q_PSI], n)
+        D = np.eye(n) - np.eye(n, k=-1)  # u_k - u_{k-1}, u_{-1} = previous input
+        DtD = D.T @ D
+
+        H = gamma.T @ (q[:, None] * gamma) + config.MPC_R * np.eye(n) + config.MPC_R_RATE * DtD
+        L = np.linalg.cholesky(H)
+        e0 = np.zeros(n)
+        e0[0] = 1.0
+        row = np.linalg.solve(L.T, np.linalg.solve(L, e0))  # First row of H^-1 (H symmetric)
+
+        g_e = -row @ (gamma.T @ (q[:, None] * phi))
+        g_k = e0 - config.MPC_R_RATE * (row @ DtD)
+        g_u = config.MPC_R_RATE * row[0]
+        return g_e, g_k, g_u
+
+    def _project(self, x, y):
+        lo = max(self.index - 2, 0)
+        hi = min(self.index + config.ROUTE_SEARCH_WINDOW, len(self.xy))
+        seg = self.xy[lo:hi]
+        self.index = lo + int(np.argmin((seg[:, 0] - x)**2 + (seg[:, 1] - y)**2))
+        return self.index
+
+    def solve(self, e_y, e_psi, kappa_ref, speed):
+        """Curvature command (1/m) for the errors and the reference curvature over the horizon."""
+        g_e, g_k, g_u = self.gain(speed)
+        return g_e[0] * e_y + g_e[1] * e_psi + g_k @ kappa_ref + g_u * self.u_prev
+
+    def steer(self, x, y, yaw, speed, limit=0.7):
+        """Normalized steer for pose (x, y, yaw rad) at speed (m/s) against the current path."""
+        i = self._project(x, y)
+        py = self.yaw[i]
+        dx, dy = x - self.xy[i, 0], y - self.xy[i, 1]
+        e_y = -math.sin(py) * dx + math.cos(py) * dy
+        e_psi = (yaw - py + math.pi) % (2.0 * math.pi) - math.pi
+        v = max(speed, config.MPC_MIN_SPEED)
+        kappa_ref = np.interp(self.s[i] + v * self._steps, self.s, self.kappa)
+
+        u = self.solve(e_y, e_psi, kappa_ref, speed)
+        steer = max(-limit, min(limit, math.atan(self.wheelbase * u) / self.max_steer))
+        self.u_prev = math.tan(steer * self.max_steer) / self.wheelbase
+        return steer
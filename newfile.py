@@ -1,18 +1,35 @@
+import argparse
 import pygame
 import numpy as np
 import random
-from scipy.interpolate import splprep, splev
+from collision_checker import CollisionChecker
 
-# Constants
 # Constants
 WIDTH, HEIGHT = 800, 600
-FPS = 60
+FPS = 60  # Render rate only; physics runs at PHYSICS_HZ whatever this is
+PHYSICS_HZ = 60
+DT = 1.0 / PHYSICS_HZ  # Fixed physics timestep (s)
+MAX_STEPS_PER_FRAME = 2000  # Backlog cap so a slow frame can't snowball (sim slows down instead)
 ROAD_WIDTH = 600
 LANE_COUNT = 4
 LANE_WIDTH = ROAD_WIDTH // LANE_COUNT
 ROAD_LEFT = WIDTH // 2 - ROAD_WIDTH // 2
 ROAD_RIGHT = WIDTH // 2 + ROAD_WIDTH // 2
 LANE_CENTERS = [ROAD_LEFT + LANE_WIDTH // 2 + i * LANE_WIDTH for i in range(LANE_COUNT)]
+OVERTAKE_TIME = 40 / 60  # s, length of a lane-change maneuver
+OVERTAKE_STEPS = int(round(OVERTAKE_TIME * PHYSICS_HZ))  # Physics steps per maneuver
+
+# Speeds in px/s, accelerations in px/s^2
+CRUISE_SPEED = 600
+OVERTAKE_SPEED = 720
+TRAFFIC_SPEEDS = range(240, 541, 60)
+ACCEL = 720         # Normal speed change
+BRAKE = 1800        # Closing in on the car ahead
+HARD_BRAKE = 3600   # Critical gap
+STEER_GAIN = 4.0 / 60  # Visual tilt (deg) per px/s of lateral speed
+STEER_SMOOTHING = 0.2  # Fraction of the tilt error removed per 1/60 s
+
+STATES = ("CRUISE", "FOLLOW", "OVERTAKE")
 
 # Colors
 WHITE = (255, 255, 255)
@@ -23,12 +40,27 @@ RED = (255, 0, 0)
 BLUE = (0, 0, 255)
 YELLOW = (255, 255, 0)
 
-pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("B-Spline Overtaking SDC - 4 Lane")
-clock = pygame.time.Clock()
-
-font = pygame.font.SysFont("Arial", 18)
+# Display is opened on first use so importing this module stays cheap
+screen = None
+clock = None
+font = None
+
+def init_display():
+    global screen, clock, font
+    if screen is not None:
+        return
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("B-Spline Overtaking SDC - 4 Lane")
+    clock = pygame.time.Clock()
+    font = pygame.font.SysFont("Arial", 18)
+
+def init_offscreen():
+    # Fonts only: Sim.draw() onto plain Surfaces, no window
+    global font
+    if font is None:
+        pygame.font.init()
+        font = pygame.font.SysFont("Arial", 18)
 
 class Car(pygame.sprite.Sprite):
     def __init__(self, x, y, color, speed, main=False):
@@ -37,6 +69,8 @@ class Car(pygame.sprite.Sprite):
         self.image.fill(color)
         self.original_image = self.image.copy() # Store original for rotation
         self.rect = self.image.get_rect(center=(x, y))
+        # Float centre; rect is the rounded copy used for drawing and overlap checks
+        self.x, self.y = x, y
         self.speed = speed
         self.main = main
         # Determine lane based on x position
@@ -48,43 +82,62 @@ class Car(pygame.sprite.Sprite):
                  min_dist = dist
                  self.lane = i
 
+    def place(self, x, y):
+        self.x, self.y = x, y
+        self.rect.center = (x, y)
+
     def update(self):
         # Move down for traffic (simulating relative speed)
         # Player car's movement is controlled by Main loop logic
         pass
 
 class Particle(pygame.sprite.Sprite):
-    def __init__(self, x, y):
+    def __init__(self, x, y, size=None):
         super().__init__()
-        size = random.randint(10, 20)
+        size = size or random.randint(10, 20)
         self.image = pygame.Surface((size, size))
         self.image.fill((200, 200, 200)) # Grey smoke
         self.rect = self.image.get_rect(center=(x, y))
+        self.y = y
         self.alpha = 255
-        self.life = 30
+        self.life = 0.5 # s
         self.image.set_alpha(self.alpha)
 
-    def update(self):
-        self.life -= 1
-        self.alpha -= 8
-        if self.alpha < 0: self.alpha = 0
-        self.image.set_alpha(self.alpha)
-        self.rect.y += 2 # Smoke strictly falls back relative to world
+    def update(self, dt):
+        self.life -= dt
+        self.alpha = max(0, self.alpha - 480 * dt)
+        self.image.set_alpha(int(self.alpha))
+        self.y += 120 * dt # Smoke strictly falls back relative to world
+        self.rect.centery = self.y
         if self.life <= 0:
             self.kill()
 
 class PlayerCar(Car):
     def __init__(self, x, y):
         super().__init__(x, y, RED, 0, main=True)
+        self.smoke_group = pygame.sprite.Group() # Particles
+        
+        # Sensor
+        self.sensor_dist = 300
+        
+        # Swept check of overtake paths (pixels, seconds)
+        self.checker = CollisionChecker(half_extent=(40, 20), cell=LANE_WIDTH, margin=5, time_slice=10 * DT)
+        self.reset(x, y)
+
+    def reset(self, x, y):
+        """Standing start at (x, y): driving state, rotation and smoke cleared."""
         self.state = "CRUISE" # CRUISE, FOLLOW, OVERTAKE
-        self.target_speed = 10
+        self.target_speed = CRUISE_SPEED
         self.current_speed = 0
-        self.acceleration = 0.2
+        self.acceleration = ACCEL
         self.path_points = []
         self.path_index = 0
         self.target_lane_idx = 0
         self.angle = 0 # Rotation angle
-        self.smoke_group = pygame.sprite.Group() # Particles
+        self.smoke_group.empty()
+        self.detected_obj = None
+        self.place(x, y)
+        self.rotate()
         
         # Determine initial lane
         self.lane_idx = 0
@@ -94,10 +147,6 @@ class PlayerCar(Car):
              if dist < min_dist:
                  min_dist = dist
                  self.lane_idx = i
-        
-        # Sensor
-        self.sensor_dist = 300
-        self.detected_obj = None
 
     def get_lane_x(self, lane_idx):
         return ROAD_LEFT + LANE_WIDTH // 2 + lane_idx * LANE_WIDTH
@@ -125,6 +174,25 @@ class PlayerCar(Car):
                 return False
         return True
 
+    def first_clear_lane(self, lanes, traffic_group):
+        """First lane (in priority order) that is free now AND whose overtake path stays clear of traffic."""
+        lanes = [lane for lane in lanes if self.is_lane_free(lane, traffic_group)]
+        if not lanes:
+            return None
+        
+        # Traffic keeps moving (relative to us) while we change lanes
+        cars = list(traffic_group)
+        self.checker.set_obstacles([c.rect.center for c in cars], np.full(len(cars), -np.pi / 2), (40, 20),
+                                   [(0, self.current_speed - c.speed) for c in cars])
+        y = self.rect.centery
+        paths = [np.column_stack([self.overtake_path(lane), np.full(OVERTAKE_STEPS, y)]) for lane in lanes]
+        collides, _ = self.checker.check(np.array(paths), times=[np.arange(OVERTAKE_STEPS) * DT] * len(paths),
+                                         yaws=[-np.pi / 2] * len(paths))
+        for lane, hit in zip(lanes, collides):
+            if not hit:
+                return lane
+        return None
+
     def find_overtake_lane(self, traffic_group):
         # Priority:
         # 1. Standard adjacent lanes (Left/Right)
@@ -153,14 +221,14 @@ class PlayerCar(Car):
             if c < LANE_COUNT - 1: split_options.append(c + 0.5)
             
             # First pass: Standard
-            for lane in options:
-                if self.is_lane_free(lane, traffic_group):
-                    return lane
+            lane = self.first_clear_lane(options, traffic_group)
+            if lane is not None:
+                return lane
             
             # Second pass: Split
-            for lane in split_options:
-                if self.is_lane_free(lane, traffic_group):
-                    return lane
+            lane = self.first_clear_lane(split_options, traffic_group)
+            if lane is not None:
+                return lane
                     
         else:
             # We are splitting (e.g. 1.5)
@@ -170,9 +238,9 @@ class PlayerCar(Car):
             
             # Try merging back first
             merge_options = [floor_lane, ceil_lane]
-            for lane in merge_options:
-                 if self.is_lane_free(lane, traffic_group):
-                     return lane
+            lane = self.first_clear_lane(merge_options, traffic_group)
+            if lane is not None:
+                return lane
             
             # If can't merge back, maybe switch to other split? (Unlikely to jump 1.5 -> 0.5 directly check dist)
             # Just stay or keep looking.
@@ -181,11 +249,11 @@ class PlayerCar(Car):
 
     def rotate(self):
         self.image = pygame.transform.rotate(self.original_image, self.angle)
-        self.rect = self.image.get_rect(center=self.rect.center)
+        self.rect = self.image.get_rect(center=(self.x, self.y))
 
-    def drive(self, traffic_group):
+    def drive(self, traffic_group, dt=DT):
         # Update Smoke
-        self.smoke_group.update()
+        self.smoke_group.update(dt)
 
         # Default Acceleration
         accel_rate = self.acceleration
@@ -206,7 +274,7 @@ class PlayerCar(Car):
 
         # State Machine logic to set target_speed
         if self.state == "CRUISE":
-            self.target_speed = 10
+            self.target_speed = CRUISE_SPEED
             self.angle = 0 # Reset angle
             self.rotate()
             
@@ -216,11 +284,10 @@ class PlayerCar(Car):
                 floor_lane = int(self.lane_idx)
                 ceil_lane = floor_lane + 1
                 
-                # Check possibilities (Prefer continuing straight-ish or just any empty one)
-                if self.is_lane_free(floor_lane, traffic_group):
-                    self.plan_overtake(floor_lane)
-                elif self.is_lane_free(ceil_lane, traffic_group):
-                    self.plan_overtake(ceil_lane)
+                # Floor first, then ceil; the merge path must stay clear like an overtake
+                merge_lane = self.first_clear_lane([floor_lane, ceil_lane], traffic_group)
+                if merge_lane is not None:
+                    self.plan_overtake(merge_lane)
 
             if self.detected_obj:
                 # If too close, switch to FOLLOW or OVERTAKE
@@ -243,10 +310,10 @@ class PlayerCar(Car):
                 if closest_dist < critical_gap:
                     # EMERGENCY BRAKING
                     self.target_speed = 0 # Aim for stop
-                    accel_rate = 1.0 # Brake 5x harder than normal
+                    accel_rate = HARD_BRAKE # Brake 5x harder than normal
                 elif closest_dist < safe_gap:
-                    self.target_speed = self.detected_obj.speed - 2 # Slow down to widen gap
-                    accel_rate = 0.5 # Braking slightly harder
+                    self.target_speed = self.detected_obj.speed - 120 # Slow down to widen gap
+                    accel_rate = BRAKE # Braking slightly harder
                 else:
                     self.target_speed = self.detected_obj.speed # Match speed
                 
@@ -266,16 +333,16 @@ class PlayerCar(Car):
                 self.state = "CRUISE"
                 
         elif self.state == "OVERTAKE":
-            self.target_speed = 12 # Speed up to overtake
+            self.target_speed = OVERTAKE_SPEED # Speed up to overtake
             if self.path_index < len(self.path_points):
                 target_pt = self.path_points[self.path_index]
                 
-                # Calculate simple rotation based on x movement
-                dx = target_pt[0] - self.rect.centerx
-                # Max angle clamp
-                target_angle = -dx * 4.0 
-                # Smoothing
-                self.angle += (target_angle - self.angle) * 0.2
+                # Tilt follows lateral speed
+                vx = (target_pt[0] - self.x) / dt
+                target_angle = -vx * STEER_GAIN
+                # Smoothing (same response whatever the step)
+                self.angle += (target_angle - self.angle) * (1 - (1 - STEER_SMOOTHING) ** (dt * 60))
+                self.x = target_pt[0]
                 self.rotate()
 
                 # Spawn Smoke if drifting hard
@@ -286,17 +353,14 @@ class PlayerCar(Car):
                     spawn_y = self.rect.bottom - 10
                     self.smoke_group.add(Particle(spawn_x, spawn_y))
 
-                self.rect.centerx = target_pt[0]
                 self.path_index += 1
             else:
                 self.state = "CRUISE"
                 self.lane_idx = self.target_lane_idx # Update lane index
 
-        # Apply Speed Update with dynamic accel_rate
-        if self.current_speed < self.target_speed:
-            self.current_speed += accel_rate
-        elif self.current_speed > self.target_speed:
-            self.current_speed -= accel_rate
+        # Apply Speed Update with dynamic accel_rate (no overshoot past the target)
+        dv = accel_rate * dt
+        self.current_speed += min(max(self.target_speed - self.current_speed, -dv), dv)
         
         # Clamp speed
         if self.current_speed < 0: self.current_speed = 0
@@ -304,7 +368,18 @@ class PlayerCar(Car):
     def plan_overtake(self, target_lane):
         self.state = "OVERTAKE"
         self.target_lane_idx = target_lane
-        start_x, start_y = self.rect.center
+        start_y = self.y
+        
+        # Store (x, y) relative to screen?
+        # Actually we just need X for each physics step of the maneuver.
+        self.path_points = [(px, start_y) for px in self.overtake_path(target_lane)] # Keep Y same on screen
+        self.path_index = 0
+
+    def overtake_path(self, target_lane):
+        """Per-physics-step x positions of a B-spline lane change to target_lane."""
+        from scipy.interpolate import splprep, splev
+        
+        start_x = self.x
         end_x = self.get_lane_x(target_lane)
         # We want the lane change to happen over some distance 'd'
         # e.g. 300 pixels forward in "world space"
@@ -323,7 +398,7 @@ class PlayerCar(Car):
         
         # Let's generate points in (x, t) where t is time/progress steps
         # Control points:
-        y_dist = 40 # Reduced frametime for sharper, faster drift overtake
+        y_dist = OVERTAKE_STEPS # Reduced frametime for sharper, faster drift overtake
         
         # P0: Start
         p0 = (start_x, 0)
@@ -340,70 +415,60 @@ class PlayerCar(Car):
         # Fit B-Spline
         tck, u = splprep([x_pts, t_pts], k=3, s=0)
         new_points = splev(np.linspace(0, 1, y_dist), tck)
-        
-        # Store (x, y) relative to screen?
-        # Actually we just need X for each frame of the maneuver.
-        self.path_points = []
-        for i in range(len(new_points[0])):
-            px = new_points[0][i]
-            # py = new_points[1][i] # Not needed if we just step through per frame
-            self.path_points.append((px, start_y)) # Keep Y same on screen
-
-        self.path_index = 0
+        return new_points[0]
 
-def main():
-    player = PlayerCar(LANE_CENTERS[1], 500)
+class Sim:
+    """World state of the overtaking demo, advanced in fixed DT physics steps.
     
-    traffic_group = pygame.sprite.Group()
-    all_sprites = pygame.sprite.Group()
-    all_sprites.add(player)
+    Everything that moves (player, traffic, smoke, road markings) is updated
+    in step(); draw() only reads state. Runs come out the same whatever the
+    render rate or fast-forward, given the same random seed.
+    """
     
-    # Road scrolling vars
-    road_y = 0
-    bg_speed = 0
+    def __init__(self):
+        self.player = PlayerCar(LANE_CENTERS[1], 500)
+        self.traffic_group = pygame.sprite.Group()
+        self.all_sprites = pygame.sprite.Group()
+        self.all_sprites.add(self.player)
     
-    running = True
-    while running:
-        clock.tick(FPS)
-        
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_r:
-                    main() # Reset (simple)
-                    return
-
-    # Initial Traffic Initialization (Total 4 traffic cars + 1 Player = 5 cars)
-    for _ in range(4):
-        # Find valid spawn
-        while True:
-            lane = random.choice(LANE_CENTERS)
-            spawn_y = random.randint(-1200, -100) # Spread out initially (More space for more cars)
-            collision = False
-            for t in traffic_group:
-                if abs(t.rect.y - spawn_y) < 200 and abs(t.rect.centerx - lane) < 50:
-                    collision = True
-            if not collision:
-                t_car = Car(lane, spawn_y, BLUE, random.randint(4, 9)) # Various velocity
-                traffic_group.add(t_car)
-                all_sprites.add(t_car)
-                break
+        # Total 4 traffic cars + 1 Player = 5 cars, placed by reset()
+        for _ in range(4):
+            t_car = Car(LANE_CENTERS[0], 0, BLUE, 0)
+            self.traffic_group.add(t_car)
+            self.all_sprites.add(t_car)
+        self.reset()
     
-    running = True
-    while running:
-        clock.tick(FPS)
+    def reset(self):
+        """New episode in place: the same sprites get fresh positions and speeds.
         
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_r:
-                    main() # Reset
-                    return
-
+        Draws the same random numbers as constructing a new Sim, so a seeded
+        reset replays exactly like a seeded Sim().
+        """
+        self.player.reset(LANE_CENTERS[1], 500)
+        self.road_y = 0.0 # Road scrolling
+        self.time = 0.0
+        self.steps = 0
+        
+        placed = []
+        for t_car in self.traffic_group:
+            # Find valid spawn
+            while True:
+                lane = random.choice(LANE_CENTERS)
+                spawn_y = random.randint(-1200, -100) # Spread out initially (More space for more cars)
+                collision = False
+                for t in placed:
+                    if abs(t.rect.y - spawn_y) < 200 and abs(t.rect.centerx - lane) < 50:
+                        collision = True
+                if not collision:
+                    t_car.place(lane, spawn_y)
+                    t_car.lane = LANE_CENTERS.index(lane)
+                    t_car.speed = random.choice(TRAFFIC_SPEEDS) # Various velocity
+                    placed.append(t_car)
+                    break
+        
+    def recycle_traffic(self):
         # Recycle Traffic (Keep same 4 cars)
-        for car in traffic_group:
+        for car in self.traffic_group:
             # If car falls behind (goes off bottom of screen)
             if car.rect.top > HEIGHT:
                 # Cycle it to top (ahead of player)
@@ -414,80 +479,136 @@ def main():
                     new_lane = random.choice(LANE_CENTERS)
                     new_y = random.randint(-800, -100) # Expanded recycle range
                     collision = False
-                    for other in traffic_group:
+                    for other in self.traffic_group:
                         if other != car and abs(other.rect.y - new_y) < 200 and abs(other.rect.centerx - new_lane) < 50:
                             collision = True
                     
                     if not collision:
-                        car.rect.center = (new_lane, new_y)
+                        car.place(new_lane, new_y)
                         car.lane = 0 # Updates not needed as checks are rect based, but good practice
-                        car.speed = random.randint(4, 9) # Various velocity on recycle
+                        car.speed = random.choice(TRAFFIC_SPEEDS) # Various velocity on recycle
                         reset_success = True
                     attempts += 1
                 
                 # If crowded, just push further back
                 if not reset_success:
-                     car.rect.y = -1000
+                     car.place(car.x, -1000 + car.rect.height // 2)
 
             # If car gets too far ahead (rect.bottom < -600)? 
             # In this logic (relative speed), if car is faster than player, it moves UP.
             # If it moves off TOP, it is "Gone". Recycle to BOTTOM?
             if car.rect.bottom < -600:
-                car.rect.y = HEIGHT + 100 # Reset to behind? 
-                pass
+                car.place(car.x, HEIGHT + 100 + car.rect.height // 2) # Reset to behind?
+
+    def step(self, dt=DT):
+        """One physics step."""
+        self.recycle_traffic()
 
         # Update Logic
-        player.drive(traffic_group)
-        bg_speed = player.current_speed
+        self.player.drive(self.traffic_group, dt)
         
         # Scroll Road (simulate movement)
-        road_y += bg_speed
-        if road_y >= HEIGHT:
-            road_y = 0
+        self.road_y = (self.road_y + self.player.current_speed * dt) % HEIGHT
             
         # Move Traffic (Relative speed)
-        for car in traffic_group:
-            car.rect.y += (player.current_speed - car.speed)
+        for car in self.traffic_group:
+            car.place(car.x, car.y + (self.player.current_speed - car.speed) * dt)
             
-            # Legacy kill checks (should not trigger if recycle works, but safe to keep/modify)
-            # Actually, recycle handles > HEIGHT. 
-            # We must ensure we don't Kill() anymore if we want fixed set.
-            # Removing kill logic.
+        self.time += dt
+        self.steps += 1
 
-        # Drawing
-        screen.fill(GREEN) # Grass
+    def draw(self, surface, fast_forward=1.0, hud=True):
+        player = self.player
+        surface.fill(GREEN) # Grass
         
         # Draw Road
-        pygame.draw.rect(screen, GRAY, (ROAD_LEFT, 0, ROAD_WIDTH, HEIGHT))
+        pygame.draw.rect(surface, GRAY, (ROAD_LEFT, 0, ROAD_WIDTH, HEIGHT))
         
         # Draw Lane Markers
         # Moving dashed line
-        marker_y = road_y % 40
+        marker_y = self.road_y % 40
         for lane_i in range(1, LANE_COUNT):
             line_x = ROAD_LEFT + lane_i * LANE_WIDTH
             for i in range(-1, HEIGHT // 40 + 2):
-                pygame.draw.rect(screen, WHITE, (line_x - 2, i * 40 + marker_y, 4, 20))
+                pygame.draw.rect(surface, WHITE, (line_x - 2, i * 40 + marker_y, 4, 20))
             
         # Draw Smoke under cars
-        player.smoke_group.draw(screen)
+        player.smoke_group.draw(surface)
 
-        all_sprites.draw(screen)
+        self.all_sprites.draw(surface)
         
+        if not hud:
+            return
+
         # Visualize BoxCast (Debug)
         if player.state in ["CRUISE", "FOLLOW"]:
-             pygame.draw.rect(screen, (255, 255, 0), (player.rect.left, player.rect.top - player.sensor_dist, player.rect.width, player.sensor_dist), 1)
+             pygame.draw.rect(surface, (255, 255, 0), (player.rect.left, player.rect.top - player.sensor_dist, player.rect.width, player.sensor_dist), 1)
 
         # UI
-        status_text = font.render(f"State: {player.state} | Speed: {player.current_speed:.1f}", True, BLACK)
-        screen.blit(status_text, (10, 10))
+        status_text = font.render(f"State: {player.state} | Speed: {player.current_speed:.0f} px/s | "
+                                  f"t={self.time:.1f}s x{fast_forward:g}", True, BLACK)
+        surface.blit(status_text, (10, 10))
         
         if player.detected_obj:
             warn_text = font.render("OBSTACLE DETECTED", True, RED)
-            screen.blit(warn_text, (WIDTH//2 - 100, HEIGHT - 50))
+            surface.blit(warn_text, (WIDTH//2 - 100, HEIGHT - 50))
             
+def run_headless(duration, seed=None):
+    """Physics only, as fast as possible (no window). Returns the Sim."""
+    if seed is not None:
+        random.seed(seed)
+    sim = Sim()
+    for _ in range(int(round(duration / DT))):
+        sim.step()
+    return sim
+
+def main(fast_forward=1.0, seed=None):
+    # Up/Down double or halve the fast-forward multiplier while running
+    init_display()
+    if seed is not None:
+        random.seed(seed)
+    sim = Sim()
+    accumulator = 0.0
+
+    running = True
+    while running:
+        frame_time = clock.tick(FPS) / 1000.0
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_r:
+                    sim.reset() # New episode, same sprites
+                    accumulator = 0.0
+                elif event.key == pygame.K_UP:
+                    fast_forward *= 2
+                elif event.key == pygame.K_DOWN:
+                    fast_forward /= 2
+
+        # Fixed-timestep physics: as many DT steps as the (scaled) wall time covers
+        accumulator += frame_time * fast_forward
+        steps = min(int(accumulator / DT), MAX_STEPS_PER_FRAME)
+        for _ in range(steps):
+            sim.step()
+        accumulator -= steps * DT
+        if accumulator >= DT:
+            accumulator %= DT  # Can't keep up: drop the backlog instead of spiralling
+
+        sim.draw(screen, fast_forward)
         pygame.display.flip()
 
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="4-lane B-spline overtaking demo")
+    parser.add_argument("--fast-forward", type=float, default=1.0, help="Sim seconds per wall second")
+    parser.add_argument("--headless", type=float, metavar="SECONDS",
+                        help="Run this many sim seconds without a window, as fast as possible")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    if args.headless:
+        sim = run_headless(args.headless, args.seed)
+        print(f"Simulated {sim.time:.1f}s in {sim.steps} steps, state {sim.player.state}")
+    else:
+        main(args.fast_forward, args.seed)
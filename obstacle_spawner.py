@@ -1,14 +1,16 @@
 
 import carla
 import random
-import time
+import utils
+from event_log import event
 
 class ObstacleSpawner:
-    def __init__(self, world, ego_vehicle):
+    def __init__(self, world, ego_vehicle, rng=None):
         self.world = world
         self.ego = ego_vehicle
+        self.rng = rng or random
         self.actors = []
-        self.last_spawn_time = time.time()
+        self.last_spawn_time = utils.sim_time(world)
         self.spawn_interval = 8.0  # Seconds between spawns
         
         # Immediate Spawn
@@ -35,7 +37,7 @@ class ObstacleSpawner:
             
             # If > 15m behind, destroy
             if dot < -15.0:
-                print("♻️ Garbage Collected Obstacle")
+                event("spawn", "♻️ Garbage Collected Obstacle")
                 actor.destroy()
             else:
                 active_actors.append(actor)
@@ -47,19 +49,20 @@ class ObstacleSpawner:
         if len(self.actors) >= 2:
             return
 
-        if time.time() - self.last_spawn_time < self.spawn_interval:
+        now = utils.sim_time(self.world)
+        if now - self.last_spawn_time < self.spawn_interval:
             return
             
-        self.last_spawn_time = time.time()
+        self.last_spawn_time = now
         
-        ego_wp = self.world.get_map().get_waypoint(self.ego.get_location())
+        ego_wp = utils.get_map(self.world).get_waypoint(self.ego.get_location())
         # Spawn 100m ahead (Increased from 80m)
         next_wps = ego_wp.next(100.0)
         
         if not next_wps: return
         
         target_wp = next_wps[0]
-        bp = random.choice(self.world.get_blueprint_library().filter("vehicle.*"))
+        bp = self.rng.choice(utils.get_blueprint_library(self.world).filter("vehicle.*"))
         
         transform = target_wp.transform
         transform.location.z += 0.5
@@ -68,7 +71,7 @@ class ObstacleSpawner:
         if vehicle:
             vehicle.set_simulate_physics(False) # Static obstacle
             self.actors.append(vehicle)
-            print("✅ Spawned Obstacle")
+            event("spawn", "✅ Spawned Obstacle")
 
     def cleanup(self):
         for a in self.actors:
@@ -0,0 +1,130 @@
+
+import math
+import numpy as np
+import config
+
+
+def radar_to_ego(points, mount):
+    """Radar detections (n, 4: velocity, azimuth, altitude, depth) to ego-frame xyz.
+
+    mount is the sensor's (x, y, z, yaw_deg) on the vehicle, or an (n, 4) array
+    of per-point mounts when frames of several sensors are fused. Ego frame
+    follows CARLA: x forward, y right, z up.
+    """
+    mount = np.asarray(mount, dtype=np.float32)
+    az = points[:, 1] + np.radians(mount[..., 3])
+    alt = points[:, 2]
+    depth = points[:, 3]
+    ground = depth * np.cos(alt)
+    out = np.empty((len(points), 3), dtype=np.float32)
+    out[:, 0] = ground * np.cos(az) + mount[..., 0]
+    out[:, 1] = ground * np.sin(az) + mount[..., 1]
+    out[:, 2] = depth * np.sin(alt) + mount[..., 2]
+    return out
+
+
+class OccupancyGrid:
+    """Rolling ego-centric occupancy grid built from radar points.
+
+    Every update re-samples the previous grid into the new ego pose (motion
+    compensation), decays it by the sim time since the last update and adds
+    the new hits. A summed-area table of
+    occupied cells is rebuilt once per update, so any rectangular corridor
+    query afterwards is four array lookups.
+    """
+
+    def __init__(self, res=None, x_back=None, x_front=None, y_half=None, decay=None):
+        self.res = res or config.GRID_RES
+        self.x_min = -(x_back or config.GRID_X_BACK)
+        self.x_max = x_front or config.GRID_X_FRONT
+        self.y_half = y_half or config.GRID_Y_HALF
+        self.decay = decay or config.GRID_DECAY
+
+        self.nx = int(round((self.x_max - self.x_min) / self.res))
+        self.ny = int(round(2 * self.y_half / self.res))
+        self.grid = np.zeros((self.nx, self.ny), dtype=np.float32)
+        self._scratch = np.zeros_like(self.grid)
+        self.sat = np.zeros((self.nx + 1, self.ny + 1), dtype=np.int32)
+
+        # Cell centres in ego frame (reused for motion compensation)
+        cx = self.x_min + (np.arange(self.nx) + 0.5) * self.res
+        cy = -self.y_half + (np.arange(self.ny) + 0.5) * self.res
+        self._cx, self._cy = np.meshgrid(cx, cy, indexing="ij")
+        self._pose = None
+        self._stamp = None  # Sim time of the last update
+
+    def reset(self):
+        self.grid.fill(0.0)
+        self.sat.fill(0)
+        self._pose = None
+        self._stamp = None
+
+    def _compensate(self, pose):
+        """Move grid content from the previous ego pose into the current one."""
+        if self._pose is None:
+            return
+        x0, y0, yaw0 = self._pose
+        x1, y1, yaw1 = pose
+        if x0 == x1 and y0 == y1 and yaw0 == yaw1:
+            return
+
+        # New cell centre -> world -> previous ego frame
+        c1, s1 = math.cos(yaw1), math.sin(yaw1)
+        c0, s0 = math.cos(yaw0), math.sin(yaw0)
+        wx = self._cx * c1 - self._cy * s1 + (x1 - x0)
+        wy = self._cx * s1 + self._cy * c1 + (y1 - y0)
+        px = wx * c0 + wy * s0
+        py = -wx * s0 + wy * c0
+
+        ix = np.floor((px - self.x_min) / self.res).astype(np.int32)
+        iy = np.floor((py + self.y_half) / self.res).astype(np.int32)
+        inside = (ix >= 0) & (ix < self.nx) & (iy >= 0) & (iy < self.ny)
+
+        self._scratch.fill(0.0)
+        self._scratch[inside] = self.grid[ix[inside], iy[inside]]
+        self.grid, self._scratch = self._scratch, self.grid
+
+    def update(self, points_xy, transform, stamp=None):
+        """Integrate ego-frame points (n, >=2) at ego transform and sim time stamp (s).
+
+        Without a stamp the update counts as one FIXED_DELTA_SECONDS tick.
+        """
+        pose = (transform.location.x, transform.location.y, math.radians(transform.rotation.yaw))
+        self._compensate(pose)
+        self._pose = pose
+        if stamp is None or self._stamp is None:
+            self.grid *= self.decay
+        else:
+            self.grid *= self.decay ** (max(stamp - self._stamp, 0.0) / config.FIXED_DELTA_SECONDS)
+        self._stamp = stamp
+
+        if len(points_xy):
+            ix = np.floor((points_xy[:, 0] - self.x_min) / self.res).astype(np.int32)
+            iy = np.floor((points_xy[:, 1] + self.y_half) / self.res).astype(np.int32)
+            inside = (ix >= 0) & (ix < self.nx) & (iy >= 0) & (iy < self.ny)
+            flat = ix[inside] * self.ny + iy[inside]
+            hits = np.bincount(flat, minlength=self.nx * self.ny).reshape(self.nx, self.ny)
+            self.grid += config.GRID_HIT * hits
+            np.minimum(self.grid, 1.0, out=self.grid)
+
+        occupied = (self.grid >= config.GRID_OCC_THRESHOLD).astype(np.int32)
+        np.cumsum(occupied, axis=0, out=self.sat[1:, 1:])
+        np.cumsum(self.sat[1:, 1:], axis=1, out=self.sat[1:, 1:])
+
+    def occupied_in(self, x0, x1, y0, y1):
+        """Number of occupied cells in the ego-frame box [x0, x1] x [y0, y1]. O(1)."""
+        i0 = min(max(int((x0 - self.x_min) / self.res), 0), self.nx)
+        i1 = min(max(int(math.ceil((x1 - self.x_min) / self.res)), 0), self.nx)
+        j0 = min(max(int((y0 + self.y_half) / self.res), 0), self.ny)
+        j1 = min(max(int(math.ceil((y1 + self.y_half) / self.res)), 0), self.ny)
+        if i1 <= i0 or j1 <= j0:
+            return 0
+        s = self.sat
+        return int(s[i1, j1] - s[i0, j1] - s[i1, j0] + s[i0, j0])
+
+    def lane_free(self, offset, lane_width, ahead=None, behind=None):
+        """Is the corridor of a lane whose centre is `offset` metres to the side (left < 0) free?"""
+        ahead = config.LANE_CHECK_AHEAD if ahead is None else ahead
+        behind = config.LANE_CHECK_BEHIND if behind is None else behind
+        half = 0.5 * lane_width
+        return self.occupied_in(-behind, ahead, offset - half, offset + half) == 0
@@ -0,0 +1,398 @@
+
+import multiprocessing as mp
+import os
+import numpy as np
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+from newfile import (HEIGHT, LANE_COUNT, LANE_WIDTH, ROAD_LEFT, LANE_CENTERS, OVERTAKE_STEPS, DT,
+                     CRUISE_SPEED, OVERTAKE_SPEED, TRAFFIC_SPEEDS, ACCEL, BRAKE, HARD_BRAKE)
+
+# Player states (same rules as newfile.PlayerCar)
+CRUISE, FOLLOW, OVERTAKE = 0, 1, 2
+STATES = ("CRUISE", "FOLLOW", "OVERTAKE")
+
+# Actions: AUTO = PlayerCar's own overtake rules, KEEP = never start an
+# overtake, LEFT/RIGHT = change lane that way as soon as it is clear
+AUTO, KEEP, LEFT, RIGHT = 0, 1, 2, 3
+
+N_TRAFFIC = 4
+CAR_W, CAR_H = 40, 80
+PLAYER_Y = 500              # Player centre y on screen (never moves)
+PLAYER_TOP = PLAYER_Y - CAR_H // 2
+SENSOR_DIST = 300
+EPISODE_STEPS = 3600        # Physics steps (1 min at 60 Hz)
+COLLISION_PENALTY = 100.0
+RECYCLE_ATTEMPTS = 20
+
+# Swept check of PlayerCar.checker: boxes (40, 20) half extents + 5 px margin
+_SWEPT_DX = 20 + 20 + 5
+_SWEPT_DY = 40 + 40 + 5
+_SWEPT_R2 = (np.hypot(40, 20) * 2 + 5) ** 2
+
+OBS_SIZE = 4 + 3 * N_TRAFFIC
+
+
+def _round(a):
+    """pygame Rect attribute assignment: round half away from zero."""
+    return np.trunc(a + np.copysign(0.5, a))
+
+
+def lane_x(lane):
+    return ROAD_LEFT + LANE_WIDTH // 2 + lane * LANE_WIDTH
+
+
+def overtake_paths(start_x, end_x):
+    """Per-step x of the B-spline lane change, for any array shape of starts/ends.
+
+    Closed form of PlayerCar.overtake_path: four control points with s=0 and
+    k=3 make splprep return the cubic interpolating them at chord-length
+    knots, so it is the Lagrange polynomial through (u_i, x_i).
+    """
+    start_x = np.asarray(start_x, dtype=np.float64)
+    dx = np.asarray(end_x, dtype=np.float64) - start_x
+    f = OVERTAKE_STEPS
+    d = np.stack(np.broadcast_arrays(0.0, 0.3 * f, np.hypot(dx, 0.4 * f), 0.3 * f), axis=-1)
+    knots = np.cumsum(d, axis=-1)
+    knots /= knots[..., -1:]
+    u = np.linspace(0.0, 1.0, f)
+    uk = knots[..., None, :]  # (..., 1, 4)
+    w = np.zeros(dx.shape + (f,))
+    for j in (2, 3):  # Basis of the two control points at end_x
+        lj = np.ones_like(w)
+        for m in range(4):
+            if m != j:
+                lj *= (u - uk[..., m]) / (uk[..., j] - uk[..., m])
+        w += lj
+    return start_x[..., None] + dx[..., None] * w
+
+
+class OvertakeEnv:
+    """B independent episodes of the newfile.py overtaking sim, stepped together.
+
+    Everything is a NumPy array over the batch: player x/lane/speed/state and
+    maneuver progress, traffic x/y/speed (N_TRAFFIC slots). step() is one
+    newfile.Sim.step of DT (recycle, PlayerCar.drive, move traffic) for all B
+    at once, with overlap tests on pygame's rounded integer Rects. The player
+    is kept at its unrotated 40x80 footprint (rotation and smoke are cosmetic).
+
+    Reward is the distance driven this step (px) minus COLLISION_PENALTY on
+    contact. Episodes end on contact or after episode_steps and are reset
+    in place; step() returns the first observation of the new episode.
+    """
+
+    def __init__(self, num_envs, seed=None, episode_steps=EPISODE_STEPS):
+        self.n = num_envs
+        self.episode_steps = episode_steps
+        self.rng = np.random.default_rng(seed)
+        B, T = num_envs, N_TRAFFIC
+        self.px = np.zeros(B)                   # Player centre x
+        self.lane = np.zeros(B)                 # Lane index, .5 while splitting
+        self.speed = np.zeros(B)
+        self.target_speed = np.zeros(B)
+        self.state = np.zeros(B, dtype=np.int64)
+        self.target_lane = np.zeros(B)
+        self.path = np.zeros((B, OVERTAKE_STEPS))
+        self.path_index = np.zeros(B, dtype=np.int64)
+        self.detected = np.zeros(B, dtype=bool)
+        self.tx = np.zeros((B, T))              # Traffic centre x
+        self.cy = np.zeros((B, T))              # Traffic centre y
+        self.ty = np.zeros((B, T))              # Traffic rect top (rounded centre - half height)
+        self.tspeed = np.zeros((B, T))
+        self.steps = np.zeros(B, dtype=np.int64)
+        self.reset()
+
+    # ------------------------------------------------------------------
+    # Episodes
+
+    def reset(self, mask=None):
+        """Reset all episodes (or those in mask). Returns observations."""
+        idx = np.arange(self.n) if mask is None else np.flatnonzero(mask)
+        if len(idx):
+            self.px[idx] = LANE_CENTERS[1]
+            self.lane[idx] = 1
+            self.speed[idx] = 0.0
+            self.target_speed[idx] = CRUISE_SPEED
+            self.state[idx] = CRUISE
+            self.target_lane[idx] = 0
+            self.path_index[idx] = 0
+            self.detected[idx] = False
+            self.steps[idx] = 0
+            self._spawn_traffic(idx)
+        return self.observe()
+
+    def _spawn_traffic(self, idx):
+        """Initial traffic: random lane/height, retried until clear of placed cars."""
+        for t in range(N_TRAFFIC):
+            todo = idx
+            while len(todo):
+                lanes = self.rng.choice(LANE_CENTERS, (len(todo), RECYCLE_ATTEMPTS))
+                ys = self.rng.integers(-1200, -100, (len(todo), RECYCLE_ATTEMPTS), endpoint=True)
+                hit = ((np.abs(self.ty[todo, :t, None] - ys[:, None]) < 200)
+                       & (np.abs(self.tx[todo, :t, None] - lanes[:, None]) < 50)).any(1)
+                ok = ~hit
+                done = ok.any(1)
+                pick = ok.argmax(1)[done]
+                rows = todo[done]
+                self.tx[rows, t] = lanes[done, pick]
+                self._place(rows, t, ys[done, pick])
+                self.tspeed[rows, t] = self.rng.choice(TRAFFIC_SPEEDS, done.sum())
+                todo = todo[~done]
+
+    def _recycle(self):
+        """Cars that fell off the bottom go back ahead of the player; too far ahead go behind."""
+        others = np.arange(N_TRAFFIC)
+        for t in range(N_TRAFFIC):
+            rows = np.flatnonzero(self.ty[:, t] > HEIGHT)
+            if len(rows):
+                lanes = self.rng.choice(LANE_CENTERS, (len(rows), RECYCLE_ATTEMPTS))
+                ys = self.rng.integers(-800, -100, (len(rows), RECYCLE_ATTEMPTS), endpoint=True)
+                o = others[others != t]
+                hit = ((np.abs(self.ty[rows][:, o, None] - ys[:, None]) < 200)
+                       & (np.abs(self.tx[rows][:, o, None] - lanes[:, None]) < 50)).any(1)
+                ok = ~hit
+                done = ok.any(1)
+                pick = ok.argmax(1)[done]
+                moved = rows[done]
+                self.tx[moved, t] = lanes[done, pick]
+                self._place(moved, t, ys[done, pick])
+                self.tspeed[moved, t] = self.rng.choice(TRAFFIC_SPEEDS, len(moved))
+                self._place(rows[~done], t, -1000 + CAR_H // 2)  # Crowded: push further back
+            gone = np.flatnonzero(self.ty[:, t] + CAR_H < -600)
+            self._place(gone, t, HEIGHT + 100 + CAR_H // 2)
+
+    def _place(self, rows, t, y):
+        self.cy[rows, t] = y
+        self.ty[rows, t] = _round(self.cy[rows, t]) - CAR_H // 2
+
+    # ------------------------------------------------------------------
+    # PlayerCar rules
+
+    def _lane_free(self, rows, lanes):
+        """PlayerCar.is_lane_free for (len(rows), K) candidate lanes (NaN = no candidate)."""
+        valid = (lanes >= 0) & (lanes < LANE_COUNT)  # False for NaN
+        split = valid & (lanes % 1 != 0)
+        w = np.where(split, 60, 70)
+        left = np.trunc(lane_x(lanes) - w // 2)
+        tx, ty = self.tx[rows, None], self.ty[rows, None]
+        blocked = ((tx - CAR_W // 2 < (left + w)[..., None]) & (left[..., None] < tx + CAR_W // 2)
+                   & (ty < PLAYER_TOP + 300) & (PLAYER_TOP - 300 < ty + CAR_H)).any(-1)
+        return valid & ~blocked
+
+    def _path_clear(self, rows, lanes):
+        """PlayerCar.checker swept test of the overtake paths to (len(rows), K) lanes."""
+        paths = overtake_paths(self.px[rows, None], lane_x(np.nan_to_num(lanes)))  # (R, K, F)
+        t = np.arange(OVERTAKE_STEPS) * DT
+        vel = self.speed[rows, None] - self.tspeed[rows]                            # (R, T)
+        cy = self.ty[rows] + CAR_H // 2
+        dy = cy[..., None] + vel[..., None] * t - PLAYER_Y                          # (R, T, F)
+        dx = self.tx[rows][:, None, :, None] - paths[:, :, None, :]                 # (R, K, T, F)
+        dy = dy[:, None]
+        hit = (np.abs(dx) <= _SWEPT_DX) & (np.abs(dy) <= _SWEPT_DY) & (dx * dx + dy * dy <= _SWEPT_R2)
+        return ~hit.any((-1, -2))
+
+    def _find_lane(self, rows, actions):
+        """PlayerCar.find_overtake_lane, restricted by the action. NaN where none."""
+        lane = self.lane[rows, None]
+        whole = lane % 1 == 0
+        fl = np.floor(lane)
+        cand = np.where(whole,
+                        np.concatenate([lane - 1, lane + 1, lane - 0.5, lane + 0.5], axis=1),
+                        np.concatenate([fl, fl + 1, np.full_like(fl, np.nan), np.full_like(fl, np.nan)], axis=1))
+        cand[(cand < 0) | (cand > LANE_COUNT - 1)] = np.nan
+        act = actions[rows, None]
+        cand[(act == KEEP) | ((act == LEFT) & (cand > lane)) | ((act == RIGHT) & (cand < lane))] = np.nan
+        ok = self._lane_free(rows, cand)
+        if ok.any():
+            sub = ok.any(1)
+            ok[sub] &= self._path_clear(rows[sub], cand[sub])
+        found = ok.any(1)
+        return np.where(found, cand[np.arange(len(rows)), ok.argmax(1)], np.nan)
+
+    def _plan(self, rows, lanes):
+        """PlayerCar.plan_overtake for each row (skipping NaN lanes)."""
+        go = ~np.isnan(lanes)
+        rows, lanes = rows[go], lanes[go]
+        if not len(rows):
+            return
+        self.state[rows] = OVERTAKE
+        self.target_lane[rows] = lanes
+        self.path[rows] = overtake_paths(self.px[rows], lane_x(lanes))
+        self.path_index[rows] = 0
+
+    def _drive(self, actions):
+        left = _round(self.px) - CAR_W // 2
+        accel = np.full(self.n, float(ACCEL))
+
+        # Box-cast sensor ahead of the player
+        seen = ((self.tx - CAR_W // 2 < left[:, None] + CAR_W) & (left[:, None] < self.tx + CAR_W // 2)
+                & (self.ty < PLAYER_TOP) & (PLAYER_TOP - SENSOR_DIST < self.ty + CAR_H))
+        dist = np.where(seen, PLAYER_TOP - (self.ty + CAR_H), SENSOR_DIST)
+        nearest = dist.argmin(1)
+        closest = dist[np.arange(self.n), nearest]
+        self.detected = seen.any(1)
+        ahead_speed = self.tspeed[np.arange(self.n), nearest]
+
+        cruise = np.flatnonzero(self.state == CRUISE)
+        follow = np.flatnonzero(self.state == FOLLOW)
+        overtake = np.flatnonzero(self.state == OVERTAKE)
+
+        # CRUISE: merge back from a split lane, overtake or follow when close
+        self.target_speed[cruise] = CRUISE_SPEED
+        split = cruise[self.lane[cruise] % 1 != 0]
+        if len(split):
+            fl = np.floor(self.lane[split])
+            free = self._lane_free(split, np.column_stack([fl, fl + 1]))
+            self._plan(split, np.where(free[:, 0], fl, np.where(free[:, 1], fl + 1, np.nan)))
+        close = cruise[self.detected[cruise] & (closest[cruise] < 150)]
+        if len(close):
+            lanes = self._find_lane(close, actions)
+            self._plan(close, lanes)
+            self.state[close[np.isnan(lanes)]] = FOLLOW
+
+        # FOLLOW: keep the gap, overtake when a lane opens
+        lost = follow[~self.detected[follow]]
+        self.state[lost] = CRUISE
+        follow = follow[self.detected[follow]]
+        if len(follow):
+            gap = closest[follow]
+            critical = gap < 80
+            safe = ~critical & (gap < 140)
+            self.target_speed[follow] = np.where(critical, 0, np.where(safe, ahead_speed[follow] - 120,
+                                                                        ahead_speed[follow]))
+            accel[follow] = np.where(critical, HARD_BRAKE, np.where(safe, BRAKE, ACCEL))
+            lanes = self._find_lane(follow, actions)
+            lanes[gap <= 50] = np.nan  # No swerving while slamming the brakes
+            self._plan(follow, lanes)
+
+        # OVERTAKE: follow the spline one step at a time
+        self.target_speed[overtake] = OVERTAKE_SPEED
+        moving = self.path_index[overtake] < OVERTAKE_STEPS
+        finished = overtake[~moving]
+        moving = overtake[moving]
+        self.px[moving] = self.path[moving, self.path_index[moving]]
+        self.path_index[moving] += 1
+        self.state[finished] = CRUISE
+        self.lane[finished] = self.target_lane[finished]
+
+        # Voluntary lane changes requested by the action
+        idle = np.flatnonzero((self.state != OVERTAKE) & ((actions == LEFT) | (actions == RIGHT)))
+        if len(idle):
+            self._plan(idle, self._find_lane(idle, actions))
+
+        dv = accel * DT
+        self.speed += np.clip(self.target_speed - self.speed, -dv, dv)
+        np.maximum(self.speed, 0.0, out=self.speed)
+
+    # ------------------------------------------------------------------
+
+    def step(self, actions=None):
+        """Advance every episode one physics step. Returns (obs, reward, done)."""
+        actions = (np.zeros(self.n, dtype=np.int64) if actions is None
+                   else np.broadcast_to(np.asarray(actions, dtype=np.int64), (self.n,)))
+        self._recycle()
+        self._drive(actions)
+        self.cy += (self.speed[:, None] - self.tspeed) * DT
+        self.ty = _round(self.cy) - CAR_H // 2
+        self.steps += 1
+
+        left = _round(self.px) - CAR_W // 2
+        crash = ((self.tx - CAR_W // 2 < left[:, None] + CAR_W) & (left[:, None] < self.tx + CAR_W // 2)
+                 & (self.ty < PLAYER_TOP + CAR_H) & (PLAYER_TOP < self.ty + CAR_H)).any(1)
+        reward = self.speed * DT - COLLISION_PENALTY * crash
+        done = crash | (self.steps >= self.episode_steps)
+        if done.any():
+            self.reset(done)
+        return self.observe(), reward, done
+
+    def observe(self):
+        """(B, OBS_SIZE) float32: lane, speed, state, maneuver progress, then per
+        traffic slot: lateral offset (lanes), gap (screen heights), relative
+        speed. Speeds are in units of CRUISE_SPEED."""
+        obs = np.empty((self.n, OBS_SIZE), dtype=np.float32)
+        obs[:, 0] = self.lane
+        obs[:, 1] = self.speed / CRUISE_SPEED
+        obs[:, 2] = self.state
+        obs[:, 3] = np.where(self.state == OVERTAKE, self.path_index / OVERTAKE_STEPS, 0.0)
+        obs[:, 4::3] = (self.tx - self.px[:, None]) / LANE_WIDTH
+        obs[:, 5::3] = (self.cy - PLAYER_Y) / HEIGHT
+        obs[:, 6::3] = (self.tspeed - self.speed[:, None]) / CRUISE_SPEED
+        return obs
+
+    def close(self):
+        pass
+
+
+def _worker(conn, num_envs, seed, kwargs):
+    env = OvertakeEnv(num_envs, seed=seed, **kwargs)
+    try:
+        while True:
+            cmd, arg = conn.recv()
+            if cmd == "step":
+                conn.send(env.step(arg))
+            elif cmd == "reset":
+                conn.send(env.reset())
+            else:
+                break
+    except (EOFError, KeyboardInterrupt):
+        pass
+    conn.close()
+
+
+class ParallelOvertakeEnv:
+    """OvertakeEnv sharded over worker processes, same step()/reset() API.
+
+    Each worker owns a contiguous slice of the batch, seeded from its own
+    SeedSequence child so shards never share random streams.
+    """
+
+    def __init__(self, num_envs, workers=None, seed=None, **kwargs):
+        workers = max(1, min(workers or os.cpu_count() or 1, num_envs))
+        self.n = num_envs
+        sizes = [len(s) for s in np.array_split(np.arange(num_envs), workers)]
+        self.bounds = np.cumsum([0] + sizes)
+        seeds = np.random.SeedSequence(seed).spawn(workers)
+        self.conns, self.procs = [], []
+        for size, ss in zip(sizes, seeds):
+            parent, child = mp.Pipe()
+            proc = mp.Process(target=_worker, args=(child, size, ss, kwargs), daemon=True)
+            proc.start()
+            child.close()
+            self.conns.append(parent)
+            self.procs.append(proc)
+
+    def reset(self):
+        for conn in self.conns:
+            conn.send(("reset", None))
+        return np.concatenate([conn.recv() for conn in self.conns])
+
+    def step(self, actions=None):
+        if actions is not None:
+            actions = np.broadcast_to(np.asarray(actions, dtype=np.int64), (self.n,))
+        for i, conn in enumerate(self.conns):
+            conn.send(("step", None if actions is None else actions[self.bounds[i]:self.bounds[i + 1]]))
+        obs, reward, done = zip(*[conn.recv() for conn in self.conns])
+        return np.concatenate(obs), np.concatenate(reward), np.concatenate(done)
+
+    def close(self):
+        for conn in self.conns:
+            try:
+                conn.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+        for proc in self.procs:
+            proc.join(timeout=1.0)
+        self.conns, self.procs = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def make_env(num_envs, workers=1, seed=None, **kwargs):
+    """Batched overtaking env; workers > 1 shards the batch over processes."""
+    if workers and workers > 1:
+        return ParallelOvertakeEnv(num_envs, workers=workers, seed=seed, **kwargs)
+    return OvertakeEnv(num_envs, seed=seed, **kwargs)
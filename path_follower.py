@@ -1,29 +1,62 @@
 import carla
 import math
+import numpy as np
+import config
+from mpc_lateral import MPCLateral, path_heading
+from route_planner import Route
+from speed_profile import build_profile, longitudinal
 
 class PathFollower:
-    def __init__(self, vehicle):
+    def __init__(self, vehicle, controller=None):
         self.vehicle = vehicle
-        self.path = []
+        # "pure_pursuit" or "mpc" (config.LATERAL_CONTROLLER by default)
+        self.mpc = MPCLateral() if (controller or config.LATERAL_CONTROLLER) == "mpc" else None
+        self.path = None       # route_planner.Route over the given points
         self.index = 0
         self.lookahead = 8.0   # meters
         self.last_steer = 0.0
+        self.profile = None
+        self.target = None     # Last aim point (x, y)
+        self.cross_track = 0.0  # Signed distance right of the path at the last tick (m)
 
-    def set_path(self, path):
-        self.path = path
+    def set_path(self, path, v_max=None):
+        """Path as carla.Location-likes, (x, y) tuples or an (n, 2) array."""
         self.index = 0
         self.last_steer = 0.0
+        self.target = None
+        self.cross_track = 0.0
+        if path is None or len(path) == 0:
+            xy = np.empty((0, 2))
+        elif hasattr(path[0], "x"):
+            xy = np.array([[p.x, p.y] for p in path])
+        else:
+            xy = np.asarray(path, dtype=np.float64)[:, :2]
+        if len(xy) < 2:
+            self.path = None
+            self.profile = None
+            return
+        yaw, _ = path_heading(xy)
+        self.path = Route(xy, yaw)
+        self.profile = build_profile(self.path.xy, self.path.s, v_max=v_max)
+        if self.mpc:
+            self.mpc.set_path(self.path.xy, yaw)
+            self.mpc.reset()
 
     def has_path(self):
-        return self.path and self.index < len(self.path)
+        return self.path is not None
+
+    def progress(self):
+        """Arc length (m) reached along the path."""
+        return float(self.path.s[self.index]) if self.path is not None else 0.0
 
     def tick(self):
+        """Control for this tick (the caller applies it), or None once the path is done."""
         if not self.has_path():
-            return False
+            return None
 
         loc = self.vehicle.get_location()
         yaw = math.radians(self.vehicle.get_transform().rotation.yaw)
-        
+
         # Dynamic lookahead
         vel = self.vehicle.get_velocity()
         speed = math.sqrt(vel.x**2 + vel.y**2 + vel.z**2)
@@ -31,62 +64,53 @@ class PathFollower:
         self.lookahead = 8.0 + 0.3 * speed
         self.lookahead = min(15.0, max(5.0, self.lookahead))
 
-        # Find lookahead point
-        target = None
-        for i in range(self.index, len(self.path)):
-            p = self.path[i]
-            # Handle both carla.Location objects and tuples
-            # User snippet uses p directly assuming it has .x .y .z
-            # I will ensure p is treated as such.
-            wp = carla.Location(x=p.x, y=p.y, z=p.z)
-            if loc.distance(wp) > self.lookahead:
-                target = wp
-                self.index = i
-                break
-
-        if target is None:
-            # If no point is far enough, target the LAST point
-            last_point = self.path[-1]
-            last_wp = carla.Location(x=last_point.x, y=last_point.y, z=last_point.z)
-            
-            if loc.distance(last_wp) < 3.0:
-                # We reached the end
-                self.path = []
-                # print("✅ Path Completed")
-                return False
-            else:
-                # Continue driving to the end
-                target = last_wp
-                self.index = len(self.path) - 1
+        # Closest point (windowed search ahead of the last one), aim by arc length
+        self.index = self.path.project(loc.x, loc.y, self.index)
+        px, py = self.path.xy[self.index]
+        pyaw = self.path.yaw[self.index]
+        self.cross_track = -math.sin(pyaw) * (loc.x - px) + math.cos(pyaw) * (loc.y - py)
+        end = self.path.xy[-1]
+        if self.path.remaining(self.index) < 3.0 and math.hypot(end[0] - loc.x, end[1] - loc.y) < 3.0:
+            # We reached the end
+            self.path = None
+            return None
+        tx, ty = self.path.lookahead(self.index, self.lookahead)
+        self.target = (float(tx), float(ty))
 
-        # Transform target to vehicle coordinates
-        dx = target.x - loc.x
-        dy = target.y - loc.y
+        if self.mpc:
+            # Whole path as reference; smoothness comes from the rate weight
+            steer = self.mpc.steer(loc.x, loc.y, yaw, speed)
+            self.last_steer = steer
+        else:
+            # Transform target to vehicle coordinates
+            dx = tx - loc.x
+            dy = ty - loc.y
 
-        # Rotate into vehicle frame
-        x =  math.cos(-yaw)*dx - math.sin(-yaw)*dy
-        y =  math.sin(-yaw)*dx + math.cos(-yaw)*dy
+            # Rotate into vehicle frame
+            x =  math.cos(-yaw)*dx - math.sin(-yaw)*dy
+            y =  math.sin(-yaw)*dx + math.cos(-yaw)*dy
 
-        if x <= 0.001:
-            return True
+            if x <= 0.001:
+                steer = self.last_steer  # Aim point behind: hold the wheel
+            else:
+                # Pure pursuit curvature, as a wheel angle (same bicycle model as the MPC)
+                L = self.lookahead
+                curvature = 2 * y / (L * L)
+                angle = math.atan(config.MPC_WHEELBASE * curvature) / math.radians(config.MPC_MAX_STEER_DEG)
 
-        # Pure pursuit curvature
-        L = self.lookahead
-        curvature = 2 * y / (L * L)
+                steer = max(-0.7, min(0.7, angle))
 
-        steer = max(-0.7, min(0.7, curvature))
+                # Slew Rate Limiter (Max delta 0.05 per frame)
+                # 0.05 @ 60Hz = 3.0 units/sec = Full lock in ~0.25s (Smooth)
+                delta = steer - self.last_steer
+                delta = max(-0.05, min(0.05, delta))
+                steer = self.last_steer + delta
+            self.last_steer = steer
 
-        # Slew Rate Limiter (Max delta 0.05 per frame)
-        # 0.05 @ 60Hz = 3.0 units/sec = Full lock in ~0.25s (Smooth)
-        delta = steer - self.last_steer
-        delta = max(-0.05, min(0.05, delta))
-        steer = self.last_steer + delta
-        self.last_steer = steer
+        throttle, brake = longitudinal(speed, self.profile.speed_at(self.path.s[self.index]))
 
         control = carla.VehicleControl()
-        control.throttle = 0.45
+        control.throttle = throttle
         control.steer = steer
-        control.brake = 0.0
-
-        self.vehicle.apply_control(control)
-        return True
+        control.brake = brake
+        return control
@@ -0,0 +1,196 @@
+
+import argparse
+import collections
+import mmap
+import queue
+import struct
+import threading
+import time
+import numpy as np
+import config
+from event_log import event
+from radar_processor import RadarProcessor, closest_in_lane
+from decision import DecisionEngine
+
+# File layout: MAGIC, then one record per radar frame:
+#   header (frame, timestamp, sensor x/y/z/pitch/yaw/roll, n_points)
+#   n_points * (velocity, azimuth, altitude, depth) float32 (CARLA raw order)
+MAGIC = b"VRRADAR1"
+HEADER = struct.Struct("<qd6fI")
+POINT_SIZE = 16
+
+Detection = collections.namedtuple("Detection", "velocity azimuth altitude depth")
+Pose = collections.namedtuple("Pose", "x y z pitch yaw roll")
+
+
+class RadarRecorder:
+    """Records raw radar frames to a compact binary file.
+
+    The sensor callback only copies the raw buffer and a few header fields
+    into a queue; packing and disk writes happen on a background thread.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, "wb")
+        self._f.write(MAGIC)
+        self._queue = queue.SimpleQueue()
+        self.frames = 0
+        self.bytes = len(MAGIC)
+        self._thread = threading.Thread(target=self._run, name="radar-rec", daemon=True)
+        self._thread.start()
+
+    def tap(self, listener=None):
+        """Sensor callback that records the frame, then forwards it to listener."""
+        def callback(data):
+            self.record(data)
+            if listener is not None:
+                listener(data)
+        return callback
+
+    def record(self, data):
+        tf = data.transform
+        loc, rot = tf.location, tf.rotation
+        self._queue.put((data.frame, data.timestamp,
+                         (loc.x, loc.y, loc.z, rot.pitch, rot.yaw, rot.roll),
+                         bytes(data.raw_data)))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            frame, ts, pose, raw = item
+            self._f.write(HEADER.pack(frame, ts, *pose, len(raw) // POINT_SIZE))
+            self._f.write(raw)
+            self.frames += 1
+            self.bytes += HEADER.size + len(raw)
+        self._f.flush()
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._f.close()
+        event("radar", "📼 Radar log: {} frames, {:.1f} MB", self.frames, self.bytes / 1e6)
+
+
+class RadarFrame:
+    """Recorded radar frame that quacks like a carla.RadarMeasurement."""
+
+    __slots__ = ("frame", "timestamp", "transform", "points")
+
+    def __init__(self, frame, timestamp, transform, points):
+        self.frame = frame
+        self.timestamp = timestamp
+        self.transform = transform
+        self.points = points  # (n, 4) float32 view: velocity, azimuth, altitude, depth
+
+    @property
+    def raw_data(self):
+        return memoryview(self.points).cast("B")
+
+    def __len__(self):
+        return len(self.points)
+
+    def __iter__(self):
+        for row in self.points.tolist():
+            yield Detection(*row)
+
+
+def read_frames(path):
+    """Yield RadarFrames from a recording. Point arrays are views into the mmap."""
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if buf[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a radar recording")
+
+    off = len(MAGIC)
+    end = len(buf)
+    while off + HEADER.size <= end:
+        frame, ts, x, y, z, pitch, yaw, roll, n = HEADER.unpack_from(buf, off)
+        off += HEADER.size
+        if off + n * POINT_SIZE > end:
+            break  # Truncated tail (recorder killed mid-write)
+        points = np.frombuffer(buf, dtype=np.float32, count=n * 4, offset=off).reshape(n, 4)
+        off += n * POINT_SIZE
+        yield RadarFrame(frame, ts, Pose(x, y, z, pitch, yaw, roll), points)
+
+
+def replay(path, processor=None, decision=None):
+    """Feed a recording through the perception/decision code, no server needed.
+
+    Runs as fast as the CPU allows and returns per-frame results as arrays.
+    """
+    processor = processor or RadarProcessor()
+    decision = decision or DecisionEngine()
+
+    frames, dist, vel, lane_dist, lane_vel, states, ttc = [], [], [], [], [], [], []
+    t0 = time.perf_counter()
+    for f in read_frames(path):
+        d, v = processor.process(f)
+        _, ld, lv = closest_in_lane(f.points)
+        state, t = decision.decide(d, v)
+
+        frames.append(f.frame)
+        dist.append(d)
+        vel.append(v)
+        lane_dist.append(ld)
+        lane_vel.append(lv)
+        states.append(state)
+        ttc.append(t)
+    elapsed = time.perf_counter() - t0
+
+    return {
+        "frame": np.array(frames, dtype=np.int64),
+        "dist": np.array(dist, dtype=np.float64),
+        "vel": np.array(vel, dtype=np.float64),
+        "lane_dist": np.array(lane_dist, dtype=np.float64),
+        "lane_vel": np.array(lane_vel, dtype=np.float64),
+        "state": np.array(states),
+        "ttc": np.array(ttc, dtype=np.float64),
+        "elapsed": elapsed,
+    }
+
+
+def compare(result, baseline, atol=1e-4):
+    """Frame numbers where a replay result differs from a saved baseline."""
+    n = min(len(result["frame"]), len(baseline["frame"]))
+    bad = np.zeros(n, dtype=bool)
+    for key in ("dist", "vel", "lane_dist", "lane_vel", "ttc"):
+        a, b = result[key][:n], baseline[key][:n]
+        same = np.isclose(a, b, atol=atol) | (np.isinf(a) & np.isinf(b) & (np.sign(a) == np.sign(b)))
+        bad |= ~same
+    bad |= result["state"][:n] != baseline["state"][:n]
+    return result["frame"][:n][bad]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline radar replay")
+    parser.add_argument("recording")
+    parser.add_argument("--save", help="Save results as a baseline (.npz)")
+    parser.add_argument("--compare", help="Baseline .npz to diff against")
+    args = parser.parse_args()
+
+    res = replay(args.recording)
+    n = len(res["frame"])
+    sim_time = n * config.FIXED_DELTA_SECONDS
+    speedup = sim_time / res["elapsed"] if res["elapsed"] > 0 else float("inf")
+    print(f"🔁 Replayed {n} frames in {res['elapsed']:.3f}s ({speedup:.0f}x real time)")
+
+    if args.save:
+        np.savez(args.save, **{k: v for k, v in res.items() if k != "elapsed"})
+        print(f"💾 Baseline saved to {args.save}")
+    if args.compare:
+        with np.load(args.compare) as base:
+            diff = compare(res, base)
+        if len(diff):
+            print(f"❌ {len(diff)} frames differ (first: {diff[:10].tolist()})")
+        else:
+            print("✅ Identical to baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,29 @@
 
-import math
+import numpy as np
+
+def decode(radar_data):
+    """Raw radar frame as an (n, 4) float32 array: velocity, azimuth, altitude, depth."""
+    return np.frombuffer(radar_data.raw_data, dtype=np.float32).reshape(-1, 4)
+
+def closest_in_lane(points, min_depth=3.0, half_width=2.5):
+    """Closest in-lane detection of one decoded radar frame (see decode()).
+    
+    Returns (point_count, distance, velocity); distance is 999.0 if nothing
+    is in the lane corridor.
+    """
+    depth = points[:, 3]
+    # CRITICAL: Ignore self-detection (anything < 3m is likely ego vehicle)
+    valid = depth >= min_depth
+    point_count = int(np.count_nonzero(valid))
+    
+    # Only consider forward-facing points within lane width
+    lateral = np.abs(depth * np.sin(points[:, 1]))
+    in_lane = valid & (lateral < half_width)
+    if not in_lane.any():
+        return point_count, 999.0, 0.0
+    
+    i = np.argmin(np.where(in_lane, depth, np.inf))
+    return point_count, float(depth[i]), float(points[i, 0])
 
 class RadarProcessor:
     def __init__(self):
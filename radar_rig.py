@@ -0,0 +1,192 @@
+
+import math
+import queue
+import numpy as np
+import carla
+import config
+import utils
+from event_log import event
+from radar_processor import decode
+from occupancy_grid import radar_to_ego
+
+# Columns of a fused rig array
+X, Y, Z, VEL, SENSOR = range(5)
+
+LEVEL_ORDER = ("idle", "cruise", "alert")
+
+
+def select_level(state, speed, closest):
+    """Radar level (key of config.RADAR_LEVELS) and forward range for a driving situation.
+
+    alert: lane change or a target inside AVOID_DIST. cruise: something is
+    tracked in lane. idle: empty road, forward range shrinks to what the
+    current speed needs (quantized so small speed changes don't respawn).
+    """
+    if state == "LANE_CHANGE" or closest < config.AVOID_DIST:
+        return "alert", config.RADAR_RANGE
+    if closest < config.RADAR_RANGE:
+        return "cruise", config.RADAR_RANGE
+    step = config.RADAR_ADAPT_RANGE_STEP
+    need = speed * config.RADAR_ADAPT_HORIZON + config.AVOID_DIST
+    rng = math.ceil(need / step) * step
+    return "idle", float(min(max(rng, config.RADAR_ADAPT_MIN_RANGE), config.RADAR_RANGE))
+
+
+def allocate_budgets(specs, max_pps=None):
+    """Points per second per unit, scaled down together if the rig exceeds max_pps."""
+    max_pps = max_pps or config.RADAR_RIG_MAX_PPS
+    want = np.array([s['pps'] for s in specs], dtype=np.float64)
+    scale = min(1.0, max_pps / want.sum()) if want.sum() > 0 else 1.0
+    return [int(p) for p in want * scale]
+
+
+class RadarRig:
+    """Several radars on one vehicle (config.RADAR_RIG), fused once per tick.
+
+    Unit 0 is the primary forward radar: its frames are the ones recorded and
+    used for in-lane distance. Every unit feeds fuse(), which turns a tick's
+    frames into one ego-frame array (x, y, z, velocity, sensor id) with a
+    single vectorized transform.
+
+    adapt() re-spawns units with a cheaper or richer configuration when the
+    driving situation changes (CARLA sensor attributes are fixed at spawn).
+    Escalations and reductions are rate-limited separately. adaptive
+    (default config.RADAR_ADAPT) starts the rig at the cruise level; pass
+    False for owners that never call adapt() so units keep their full budget.
+    """
+
+    def __init__(self, world, ego, specs=None, recorder=None, max_pps=None, adaptive=None):
+        self.world = world
+        self.ego = ego
+        self.specs = list(specs or config.RADAR_RIG)
+        self.names = [s['name'] for s in self.specs]
+        self.mounts = np.array([s['mount'] for s in self.specs], dtype=np.float32)
+        self.budgets = allocate_budgets(self.specs, max_pps)
+        self.queue = queue.Queue()
+        self.recorder = recorder
+
+        # Current per-unit (range, points/s) and adaptation state
+        self.level = None
+        self.config = [(s['range'], pps) for s, pps in zip(self.specs, self.budgets)]
+        if config.RADAR_ADAPT if adaptive is None else adaptive:
+            self.level = "cruise"
+            self.config = self._level_config("cruise", config.RADAR_RANGE)
+        self.last_change = -math.inf
+        self.respawns = 0
+
+        # Cost accounting (points actually received)
+        self.tick_points = 0
+        self.total_points = 0
+        self.ticks = 0
+        self.level_ticks = {}
+
+        self.sensors = [self._spawn(i, spec, *cfg) for i, (spec, cfg) in enumerate(zip(self.specs, self.config))]
+        event("rig", "📡 Radar rig: {} ({} pts/s total)",
+              ", ".join(self.names), sum(pps for _, pps in self.config))
+
+    def _level_config(self, level, front_range):
+        lv = config.RADAR_LEVELS[level]
+        cfg = []
+        for sid, (spec, pps) in enumerate(zip(self.specs, self.budgets)):
+            if sid == 0:
+                cfg.append((min(front_range, spec['range']), int(pps * lv['pps'])))
+            else:
+                cfg.append((spec['range'], int(pps * lv['side_pps'])))
+        return cfg
+
+    def _spawn(self, sid, spec, rng, pps):
+        bp = utils.get_blueprint_library(self.world).find('sensor.other.radar')
+        bp.set_attribute('horizontal_fov', str(spec['fov']))
+        bp.set_attribute('vertical_fov', str(spec['vfov']))
+        bp.set_attribute('range', str(rng))
+        bp.set_attribute('points_per_second', str(pps))
+
+        x, y, z, yaw = spec['mount']
+        tf = carla.Transform(carla.Location(x=x, y=y, z=z), carla.Rotation(yaw=yaw))
+        sensor = self.world.spawn_actor(bp, tf, attach_to=self.ego)
+        put = lambda data, sid=sid: self.queue.put((sid, data))
+        if sid == 0 and self.recorder:
+            sensor.listen(self.recorder.tap(put))
+        else:
+            sensor.listen(put)
+        return sensor
+
+    def drain(self):
+        """All (sensor id, measurement) pairs received since the last call."""
+        frames = []
+        points = 0
+        while not self.queue.empty():
+            sid, data = self.queue.get()
+            frames.append((sid, data))
+            points += len(data.raw_data) // 16
+        self.tick_points = points
+        self.total_points += points
+        self.ticks += 1
+        self.level_ticks[self.level] = self.level_ticks.get(self.level, 0) + 1
+        return frames
+
+    def reset(self):
+        """Drop queued frames and the adaptation hold. Sensors (and their level) stay."""
+        with self.queue.mutex:
+            self.queue.queue.clear()
+        self.tick_points = 0
+        self.last_change = -math.inf
+
+    def adapt(self, state, speed, closest, now):
+        """Reconfigure units for the driving situation. Returns True if any were respawned."""
+        if self.level is None:
+            return False
+        level, rng = select_level(state, speed, closest)
+        if level == self.level and 0.0 < self.config[0][0] - rng <= config.RADAR_ADAPT_RANGE_HYST:
+            rng = self.config[0][0]  # Range-only dip: keep the longer range
+        want = self._level_config(level, rng)
+        if want == self.config:
+            return False
+
+        up = LEVEL_ORDER.index(level) > LEVEL_ORDER.index(self.level) or want[0][0] > self.config[0][0]
+        hold = config.RADAR_ADAPT_UP_INTERVAL if up else config.RADAR_ADAPT_DOWN_INTERVAL
+        if now - self.last_change < hold:
+            return False
+
+        # Only units whose attributes change are respawned
+        for sid, (old, new) in enumerate(zip(self.config, want)):
+            if old != new:
+                s = self.sensors[sid]
+                s.stop()
+                s.destroy()
+                self.sensors[sid] = self._spawn(sid, self.specs[sid], *new)
+                self.respawns += 1
+        event("rig", "📡 Radar {} -> {} (front {:.0f}m, {} pts/s total)", self.level, level,
+              want[0][0], sum(pps for _, pps in want))
+        self.level = level
+        self.config = want
+        self.last_change = now
+        return True
+
+    def report(self):
+        if not self.ticks:
+            return
+        share = ", ".join("{} {:.0%}".format(k, v / self.ticks) for k, v in self.level_ticks.items())
+        event("rig", "📡 Radar cost: {:.0f} pts/tick avg, {} total, {} respawns ({})",
+              self.total_points / self.ticks, self.total_points, self.respawns, share)
+
+    def fuse(self, frames):
+        """One (n, 5) float32 ego-frame array for a list of (sensor id, measurement)."""
+        if not frames:
+            return np.empty((0, 5), dtype=np.float32)
+        points = [decode(data) for _, data in frames]
+        pts = np.concatenate(points)
+        sid = np.repeat(np.array([s for s, _ in frames], dtype=np.int32), [len(p) for p in points])
+
+        out = np.empty((len(pts), 5), dtype=np.float32)
+        out[:, X:VEL] = radar_to_ego(pts, self.mounts[sid])
+        out[:, VEL] = pts[:, 0]
+        out[:, SENSOR] = sid
+        return out
+
+    def destroy(self):
+        for s in self.sensors:
+            if s.is_alive:
+                s.stop()
+                s.destroy()
+        self.sensors = []
@@ -0,0 +1,66 @@
+
+import collections
+import math
+import numpy as np
+import config
+
+Task = collections.namedtuple("Task", "period phase cost")
+
+
+class RateScheduler:
+    """Rate groups on top of the world tick.
+
+    Modules register with a rate (Hz) and get a period in ticks plus a phase.
+    Without an explicit phase, the one that keeps the per-tick load (sum of
+    registered costs) lowest is picked, so 10 Hz planning and 15 Hz grid
+    updates don't all land on the same frame.
+    """
+
+    def __init__(self, base_hz=None):
+        self.base_hz = base_hz or 1.0 / config.FIXED_DELTA_SECONDS
+        self.tasks = {}
+        self.tick = 0
+        self._last = {}
+
+    def register(self, name, hz, phase=None, cost=1.0):
+        period = max(1, int(round(self.base_hz / hz)))
+        if phase is None:
+            phase = self._spread(period, cost)
+        self.tasks[name] = Task(period, phase % period, cost)
+        return self.tasks[name]
+
+    def _hyperperiod(self, period):
+        h = period
+        for t in self.tasks.values():
+            h = h * t.period // math.gcd(h, t.period)
+        return h
+
+    def load(self, period=1):
+        """Registered cost per tick slot over one hyperperiod."""
+        load = np.zeros(self._hyperperiod(period))
+        for t in self.tasks.values():
+            load[t.phase::t.period] += t.cost
+        return load
+
+    def _spread(self, period, cost):
+        load = self.load(period)
+        return min(range(period), key=lambda p: (load[p::period].max(), load[p::period].sum(), p))
+
+    def reset(self):
+        """Back to tick 0 with no cached results; registrations are kept."""
+        self.tick = 0
+        self._last = {}
+
+    def step(self):
+        """Advance one world tick. Call once per frame before due()/run()."""
+        self.tick += 1
+
+    def due(self, name):
+        t = self.tasks[name]
+        return (self.tick - t.phase) % t.period == 0
+
+    def run(self, name, fn, *args, **kwargs):
+        """Run fn if its group is due this tick, otherwise return its last result."""
+        if self.due(name):
+            self._last[name] = fn(*args, **kwargs)
+        return self._last.get(name)
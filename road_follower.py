@@ -1,16 +1,32 @@
 import math
 import carla
 import config
+import utils
+from mpc_lateral import MPCLateral
+from speed_profile import build_profile, longitudinal
 
 class RoadFollower:
-    def __init__(self, world, ego):
+    def __init__(self, world, ego, controller=None):
         self.world = world
         self.ego = ego
+        # "pure_pursuit" or "mpc" (config.LATERAL_CONTROLLER by default); MPC needs a route
+        self.mpc = MPCLateral() if (controller or config.LATERAL_CONTROLLER) == "mpc" else None
         self.last_steer = 0.0
+        self.route = None
+        self.route_idx = 0
+        self.profile = None
+
+    def set_route(self, route):
+        """Follow a precomputed route_planner.Route instead of querying waypoints."""
+        self.route = route
+        self.route_idx = 0
+        self.profile = build_profile(route.xy, route.s) if route is not None else None
+        if self.mpc and route is not None:
+            self.mpc.set_path(route.xy, route.yaw)
+            self.mpc.reset()
 
     def apply(self):
         loc = self.ego.get_location()
-        wp = self.world.get_map().get_waypoint(loc)
         
         # Dynamic lookahead
         vel = self.ego.get_velocity()
@@ -19,36 +35,46 @@ class RoadFollower:
         lookahead = 8.0 + 0.3 * (speed / 3.6)
         lookahead = min(15.0, max(5.0, lookahead))
 
-        next_wps = wp.next(lookahead)
-        if not next_wps: return # fast fail
-        target = next_wps[0].transform.location
+        if self.route is not None:
+            self.route_idx = self.route.project(loc.x, loc.y, self.route_idx)
+            target = carla.Location(*map(float, self.route.lookahead(self.route_idx, lookahead)), loc.z)
+        else:
+            wp = utils.get_map(self.world).get_waypoint(loc)
+            next_wps = wp.next(lookahead)
+            if not next_wps: return # fast fail
+            target = next_wps[0].transform.location
 
         yaw = math.radians(self.ego.get_transform().rotation.yaw)
 
-        dx = target.x - loc.x
-        dy = target.y - loc.y
+        if self.mpc and self.route is not None:
+            steer = self.mpc.steer(loc.x, loc.y, yaw, speed / 3.6)
+            self.last_steer = steer
+        else:
+            dx = target.x - loc.x
+            dy = target.y - loc.y
 
-        x =  math.cos(-yaw)*dx - math.sin(-yaw)*dy
-        y =  math.sin(-yaw)*dx + math.cos(-yaw)*dy
+            x =  math.cos(-yaw)*dx - math.sin(-yaw)*dy
+            y =  math.sin(-yaw)*dx + math.cos(-yaw)*dy
 
-        curvature = 2 * y / (lookahead * lookahead)
-        steer = max(-0.7, min(0.7, curvature))
+            curvature = 2 * y / (lookahead * lookahead)
+            steer = max(-0.7, min(0.7, curvature))
 
-        # Slew Rate Limiter (Smoothness)
-        delta = steer - self.last_steer
-        delta = max(-0.05, min(0.05, delta))
-        steer = self.last_steer + delta
-        self.last_steer = steer
+            # Slew Rate Limiter (Smoothness)
+            delta = steer - self.last_steer
+            delta = max(-0.05, min(0.05, delta))
+            steer = self.last_steer + delta
+            self.last_steer = steer
 
-        # Speed Controller (Simple P)
-        if speed < config.TARGET_SPEED_KMH:
-            throttle = 0.6 # Increased to ensure start on hills
+        # Speed from the route profile (flat target without a route)
+        if self.profile is not None:
+            v_ref = self.profile.speed_at(self.route.s[self.route_idx])
         else:
-            throttle = 0.0
+            v_ref = config.TARGET_SPEED_KMH / 3.6
+        throttle, brake = longitudinal(speed / 3.6, v_ref)
 
         control = carla.VehicleControl()
         control.throttle = throttle
         control.steer = steer
-        control.brake = 0.0
+        control.brake = brake
 
         self.ego.apply_control(control)
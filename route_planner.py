@@ -0,0 +1,258 @@
+
+import heapq
+import math
+import numpy as np
+import carla
+import config
+
+
+class Route:
+    """Dense precomputed route: xy (N, 2), yaw (N,) in radians and arc length s (N,).
+
+    Followers index it directly instead of querying waypoints every tick.
+    lane_changes lists (index, 'left'/'right') for each lane-change link: the
+    route jumps sideways onto the neighbour lane between index - 1 and index.
+    """
+
+    def __init__(self, xy, yaw, lane_changes=()):
+        self.xy = np.ascontiguousarray(xy, dtype=np.float64)
+        self.yaw = np.ascontiguousarray(yaw, dtype=np.float64)
+        self.lane_changes = list(lane_changes)
+        if len(self.xy) > 1:
+            step = np.hypot(*np.diff(self.xy, axis=0).T)
+            self.s = np.concatenate([[0.0], np.cumsum(step)])
+        else:
+            self.s = np.zeros(len(self.xy))
+        self.length = float(self.s[-1]) if len(self.s) else 0.0
+
+    def __len__(self):
+        return len(self.xy)
+
+    def project(self, x, y, hint=0, window=None):
+        """Index of the closest route point, searching forward from hint."""
+        window = window or config.ROUTE_SEARCH_WINDOW
+        lo = max(hint - 2, 0)
+        hi = min(hint + window, len(self.xy))
+        seg = self.xy[lo:hi]
+        d = (seg[:, 0] - x)**2 + (seg[:, 1] - y)**2
+        return lo + int(np.argmin(d))
+
+    def index_at(self, s):
+        """First index at or beyond arc length s (clamped to the last point)."""
+        i = int(np.searchsorted(self.s, s))
+        return min(i, len(self.s) - 1)
+
+    def lookahead(self, idx, dist):
+        """Route point `dist` metres of arc length ahead of idx."""
+        return self.xy[self.index_at(self.s[idx] + dist)]
+
+    def remaining(self, idx):
+        return self.length - self.s[idx]
+
+
+class RoutePlanner:
+    """A* route planner over the lane graph from map.get_topology().
+
+    The graph and a dense polyline per topology segment are built once. Routes
+    are cached per (origin segment, destination segment), so warm queries are
+    a nearest-point lookup plus an array concatenation.
+    """
+
+    def __init__(self, world_map, resolution=None):
+        self.map = world_map
+        self.resolution = resolution or config.ROUTE_RESOLUTION
+        self.seg_xy = []    # Per segment (n, 2)
+        self.seg_yaw = []   # Per segment (n,) radians
+        self.seg_len = []
+        self.seg_from = []  # Entry node id
+        self.seg_to = []    # Exit node id
+        self.nodes = []     # Node id -> (x, y)
+        self.adj = {}       # Node id -> [(segment id, exit node id)]
+        self.link_side = {}  # Lane-change link segment id -> 'left' or 'right'
+        self._cache = {}
+        self._build()
+
+    def _node(self, loc, index):
+        key = (round(loc.x, 1), round(loc.y, 1), round(loc.z, 1))
+        nid = index.get(key)
+        if nid is None:
+            nid = index[key] = len(self.nodes)
+            self.nodes.append((loc.x, loc.y))
+        return nid
+
+    def _densify(self, entry, exit_wp):
+        end = exit_wp.transform.location
+        wps = [entry]
+        w = entry
+        max_steps = 10000
+        while w.transform.location.distance(end) > self.resolution and max_steps:
+            nxt = w.next(self.resolution)
+            if not nxt:
+                break
+            # Stay on the branch that leads to this segment's exit
+            w = min(nxt, key=lambda c: c.transform.location.distance(end))
+            wps.append(w)
+            max_steps -= 1
+        wps.append(exit_wp)
+        xy = np.array([[p.transform.location.x, p.transform.location.y] for p in wps])
+        yaw = np.radians([p.transform.rotation.yaw for p in wps])
+        return xy, yaw
+
+    def _build(self):
+        index = {}
+        topology = self.map.get_topology()
+        for entry, exit_wp in topology:
+            a = self._node(entry.transform.location, index)
+            b = self._node(exit_wp.transform.location, index)
+            xy, yaw = self._densify(entry, exit_wp)
+            sid = len(self.seg_xy)
+            self.seg_xy.append(xy)
+            self.seg_yaw.append(yaw)
+            self.seg_len.append(float(np.hypot(*np.diff(xy, axis=0).T).sum()) if len(xy) > 1 else 0.0)
+            self.seg_from.append(a)
+            self.seg_to.append(b)
+            self.adj.setdefault(a, []).append((sid, b))
+        self.node_xy = np.array(self.nodes)
+
+        # Spatial hash of every dense point -> (segment, index) for locate()
+        self._all_xy = np.vstack(self.seg_xy)
+        self._all_seg = np.concatenate([np.full(len(xy), i) for i, xy in enumerate(self.seg_xy)])
+        self._all_idx = np.concatenate([np.arange(len(xy)) for xy in self.seg_xy])
+        cell = config.ROUTE_HASH_CELL
+        keys = np.floor(self._all_xy / cell).astype(np.int64)
+        self._buckets = {}
+        for i, (kx, ky) in enumerate(map(tuple, keys)):
+            self._buckets.setdefault((kx, ky), []).append(i)
+        self._buckets = {k: np.array(v) for k, v in self._buckets.items()}
+
+        # Lane-change links: entry node -> entry node of a same-direction
+        # neighbour segment. Added after the spatial hash so locate() only
+        # ever returns real lane segments.
+        n_real = len(self.seg_xy)
+        for sid, (entry, _) in enumerate(topology[:n_real]):
+            for side, lane in (('left', entry.get_left_lane()), ('right', entry.get_right_lane())):
+                if not lane or lane.lane_type != carla.LaneType.Driving or lane.lane_id * entry.lane_id <= 0:
+                    continue
+                loc = lane.transform.location
+                nseg, nidx = self.locate(loc.x, loc.y)
+                if nseg == sid or nidx > 1:
+                    continue
+                link = len(self.seg_xy)
+                self.seg_xy.append(self.seg_xy[nseg][:1])
+                self.seg_yaw.append(self.seg_yaw[nseg][:1])
+                self.seg_len.append(config.ROUTE_LANE_CHANGE_COST)
+                self.seg_from.append(self.seg_from[sid])
+                self.seg_to.append(self.seg_from[nseg])
+                self.adj.setdefault(self.seg_from[sid], []).append((link, self.seg_from[nseg]))
+                self.link_side[link] = side
+
+    def locate(self, x, y):
+        """(segment id, point index) of the dense route point closest to (x, y)."""
+        cell = config.ROUTE_HASH_CELL
+        kx, ky = math.floor(x / cell), math.floor(y / cell)
+        cand = [self._buckets[k] for k in ((kx + i, ky + j) for i in (-1, 0, 1) for j in (-1, 0, 1))
+                if k in self._buckets]
+        if cand:
+            ids = np.concatenate(cand)
+        else:
+            ids = np.arange(len(self._all_xy))  # Far off the road network
+        pts = self._all_xy[ids]
+        best = ids[int(np.argmin((pts[:, 0] - x)**2 + (pts[:, 1] - y)**2))]
+        return int(self._all_seg[best]), int(self._all_idx[best])
+
+    def ahead(self, x, y, distance):
+        """(x, y, yaw rad) `distance` metres down the lane from the point nearest (x, y).
+
+        Walks the dense segments, taking the straightest successor at
+        junctions. None if the lane ends first.
+        """
+        seg, idx = self.locate(x, y)
+        left = distance
+        for _ in range(len(self.seg_xy)):
+            xy, yaw = self.seg_xy[seg], self.seg_yaw[seg]
+            s = np.concatenate([[0.0], np.cumsum(np.hypot(*np.diff(xy, axis=0).T))])
+            target = s[idx] + left
+            if target <= s[-1]:
+                i = max(int(np.searchsorted(s, target)), 1)
+                f = (target - s[i - 1]) / max(s[i] - s[i - 1], 1e-9)
+                px, py = xy[i - 1] + f * (xy[i] - xy[i - 1])
+                return float(px), float(py), float(yaw[i])
+            left = target - s[-1]
+            # Lane-change links are single points, skip them
+            nxt = [sid for sid, _ in self.adj.get(self.seg_to[seg], ()) if len(self.seg_xy[sid]) > 1]
+            if not nxt:
+                return None
+            seg = min(nxt, key=lambda sid: abs((self.seg_yaw[sid][0] - yaw[-1] + math.pi) % (2 * math.pi) - math.pi))
+            idx = 0
+        return None
+
+    def _astar(self, start, goal):
+        """Segment ids leading from node start to node goal (None if unreachable)."""
+        if start == goal:
+            return []
+        gx, gy = self.nodes[goal]
+        open_set = [(0.0, 0.0, start)]
+        came = {start: None}
+        cost = {start: 0.0}
+        while open_set:
+            _, g, node = heapq.heappop(open_set)
+            if node == goal:
+                break
+            if g > cost[node]:
+                continue
+            for sid, nxt in self.adj.get(node, ()):
+                ng = g + self.seg_len[sid]
+                if ng < cost.get(nxt, math.inf):
+                    cost[nxt] = ng
+                    came[nxt] = (node, sid)
+                    nx, ny = self.nodes[nxt]
+                    heapq.heappush(open_set, (ng + math.hypot(gx - nx, gy - ny), ng, nxt))
+        if goal not in came:
+            return None
+        segs = []
+        node = goal
+        while came[node] is not None:
+            node, sid = came[node]
+            segs.append(sid)
+        segs.reverse()
+        return segs
+
+    def _middle(self, o_seg, d_seg):
+        """Cached dense (xy, yaw, lane_changes) between the end of o_seg and the start of d_seg."""
+        key = (o_seg, d_seg)
+        hit = self._cache.get(key)
+        if hit is None:
+            segs = self._astar(self.seg_to[o_seg], self.seg_from[d_seg])
+            if segs is None:
+                hit = None
+            elif segs:
+                # Drop each segment's first point (same node as previous exit);
+                # that leaves links with no points, just a sideways jump
+                changes = []
+                n = 0
+                for s in segs:
+                    if s in self.link_side:
+                        changes.append((n, self.link_side[s]))
+                    n += len(self.seg_xy[s]) - 1
+                hit = (np.vstack([self.seg_xy[s][1:] for s in segs]),
+                       np.concatenate([self.seg_yaw[s][1:] for s in segs]), changes)
+            else:
+                hit = (np.empty((0, 2)), np.empty(0), [])
+            self._cache[key] = hit
+        return hit
+
+    def route(self, origin, destination):
+        """Dense Route from origin to destination (carla.Location-likes), or None."""
+        o_seg, o_idx = self.locate(origin.x, origin.y)
+        d_seg, d_idx = self.locate(destination.x, destination.y)
+
+        if o_seg == d_seg and o_idx <= d_idx:
+            return Route(self.seg_xy[o_seg][o_idx:d_idx + 1], self.seg_yaw[o_seg][o_idx:d_idx + 1])
+
+        mid = self._middle(o_seg, d_seg)
+        if mid is None:
+            return None
+        xy = np.vstack([self.seg_xy[o_seg][o_idx:], mid[0], self.seg_xy[d_seg][1:d_idx + 1]])
+        yaw = np.concatenate([self.seg_yaw[o_seg][o_idx:], mid[1], self.seg_yaw[d_seg][1:d_idx + 1]])
+        head = len(self.seg_xy[o_seg]) - o_idx
+        return Route(xy, yaw, [(head + i, side) for i, side in mid[2] if head + i < len(xy)])
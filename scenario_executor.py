@@ -0,0 +1,491 @@
+
+import argparse
+import collections
+import json
+import multiprocessing as mp
+import os
+import shlex
+import subprocess
+import time
+import numpy as np
+from multiprocessing.connection import wait
+import config
+
+# fake=True: the worker runs an in-process fake_carla stand-in instead of connecting
+Endpoint = collections.namedtuple("Endpoint", "host port tm_port fake")
+Endpoint.__new__.__defaults__ = (False,)
+
+
+def endpoints_from_config():
+    return [Endpoint(*e) for e in (config.ENDPOINTS or [(config.HOST, config.PORT, config.TM_PORT)])]
+
+
+def local_endpoints(n, host="localhost", port=None, tm_port=None, fake=False):
+    """n endpoints on distinct ports. World ports step by 2 (a CARLA server also
+    takes port+1 for streaming), Traffic Manager ports by 1."""
+    port = port or config.PORT
+    tm_port = tm_port or config.TM_PORT
+    return [Endpoint(host, port + 2 * i, tm_port + i, fake) for i in range(n)]
+
+
+def make_scenarios(n, seed=0, ticks=900, traffic=0, obstacle_distance=150.0):
+    """n scenario specs (scenarios.py format) with consecutive seeds."""
+    return [{"id": i, "name": "default", "seed": seed + i, "ticks": ticks, "traffic": traffic,
+             "obstacles": [{"distance": obstacle_distance}]} for i in range(n)]
+
+
+class EpisodeSession:
+    """Actors reused across the episodes run on one endpoint.
+
+    Each scenario is compiled to a spawn plan and realized in one batch.
+    The first episode sets the world up (nuclear cleanup, fresh spawns), as
+    does a scenario on another map or with different config overrides (the
+    agent, radar rig and planners read config when built). Later ones reset
+    in place when EXECUTOR_RESET_IN_PLACE is on: the ego, obstacles and
+    traffic are teleported to the new plan (surplus destroyed, missing spawned in the
+    same batch) and the agent's state and radar queue cleared. The radar
+    rig stays attached and world settings are not touched.
+    """
+
+    def __init__(self, client, tm_port):
+        self.client = client
+        self.tm_port = tm_port
+        self.world = None
+        self.ego = None
+        self.agent = None
+        self.obstacles = []
+        self.traffic = None
+        self.config = None  # Overrides the current agent was built under
+
+    def begin(self, scenario):
+        """Ready the actors for a scenario. Returns (seed, rng, spawn plan)."""
+        import utils
+        import scenarios
+        from episode import make_rng
+        from simple_agent import SimpleAgent
+        from traffic_spawner import TrafficSpawner
+
+        seed, rng = make_rng(scenario["seed"])
+        overrides = scenario.get("config") or {}
+        if (self.world is None or not config.EXECUTOR_RESET_IN_PLACE or overrides != self.config
+                or scenarios.needs_map(self.world, scenario)):
+            self.close()
+            self.config = overrides
+            if scenarios.needs_map(self.client.get_world(), scenario):
+                self.client.load_world(scenario["map"])
+            self.world = utils.setup_world(self.client)
+            plan = scenarios.compile_plan(self.world, scenario)
+            self.ego, self.obstacles, vehicles = scenarios.realize(self.client, self.world, plan,
+                                                                   tm_port=self.tm_port)
+            self.agent = SimpleAgent(self.world, self.ego)
+            self.traffic = TrafficSpawner(self.world, self.ego, rng=rng, tm_port=self.tm_port, client=self.client)
+            self.traffic.spawned = vehicles
+            self.world.tick()  # Batched spawns show up on the next tick
+        else:
+            plan = scenarios.compile_plan(self.world, scenario)
+            _, self.obstacles, self.traffic.spawned = scenarios.realize(
+                self.client, self.world, plan, self.ego, [o for o in self.obstacles if o.is_alive],
+                self.traffic.spawned, tm_port=self.tm_port)
+            self.world.tick()  # Teleports apply on the next tick
+            self.agent.reset()
+            self.traffic.rng = rng
+        self.traffic.tm.set_random_device_seed(seed)
+        return seed, rng, plan
+
+    def close(self):
+        if self.agent is not None:
+            self.agent.destroy()
+        self.world = self.ego = self.agent = self.traffic = self.config = None
+        self.obstacles = []
+
+
+def run_episode(session, scenario):
+    """One seeded main.py-style episode on a session. Returns its metrics."""
+    import scenarios
+
+    with scenarios.config_overrides(scenario.get("config")):
+        return _run_episode(session, scenario)
+
+
+def _run_episode(session, scenario):
+    import utils
+    from agent_loop import step, respawn_obstacle
+    from episode import EpisodeRecorder, destination_rng
+    from decision import DecisionEngine
+    from controller import Controller
+    from watchdog import TickWatchdog
+
+    t0 = time.perf_counter()
+    seed, _, plan = session.begin(scenario)
+    world, ego, agent, traffic = session.world, session.ego, session.agent, session.traffic
+    setup = time.perf_counter() - t0
+    watchdog = agent.watchdog = TickWatchdog()
+    decision = DecisionEngine()
+    controller = Controller()
+
+    # Recorded like main.py's episodes
+    episode = EpisodeRecorder(seed, utils.get_map(world).name)
+    episode.meta["config"] = scenario.get("config") or {}
+    episode.add_actor("ego", ego.type_id, plan.ego)
+    for bp_id, tf in plan.obstacles:
+        episode.add_actor("obstacle", bp_id, tf)
+    for bp_id, tf in plan.traffic:
+        episode.add_actor("traffic", bp_id, tf)
+    if traffic.spawned:
+        episode.meta["tm_seed"] = seed
+
+    destinations = utils.get_spawn_points(world)
+    dest_rng = destination_rng(seed)
+
+    def next_destination():
+        location = dest_rng.choice(destinations).location
+        episode.add_destination(location)
+        agent.set_destination(location)
+
+    next_destination()
+
+    ticks = scenario["ticks"]
+    tick_ms = np.empty(ticks)
+    step_ms = np.empty(ticks)
+    speeds = np.empty(ticks)
+    min_gap = float("inf")
+    emergency = lane_changes = 0
+    state = agent.state
+    last_spawn = utils.sim_time(world)
+    for i in range(ticks):
+        t = time.perf_counter()
+        world.tick()
+        step_ms[i] = (time.perf_counter() - t) * 1000.0
+        traffic.record_step(step_ms[i] / 1000.0)
+        t = time.perf_counter()
+        watchdog.begin()
+        _, dstate, ttc = step(ego, agent, decision, controller, watchdog, episode=episode,
+                              next_destination=next_destination)
+        if dstate == "EMERGENCY" and ttc < config.WATCHDOG_EMERGENCY_TTC:
+            emergency += 1
+        # Respawned obstacles join the session's, so a reset in place clears them
+        obstacle, last_spawn = respawn_obstacle(world, ego, plan.respawn, watchdog, last_spawn, episode=episode)
+        if obstacle is not None:
+            session.obstacles.append(obstacle)
+        watchdog.end()
+        tick_ms[i] = (time.perf_counter() - t) * 1000.0
+
+        v = ego.get_velocity()
+        speeds[i] = (v.x**2 + v.y**2)**0.5
+        if agent.obstacle_dist < config.RADAR_RANGE:
+            min_gap = min(min_gap, agent.obstacle_dist)
+        if agent.state != state and agent.state == "LANE_CHANGE":
+            lane_changes += 1
+        state = agent.state
+
+    if config.EPISODE_DIR and episode.frame:
+        episode.meta["skips"] = watchdog.skip_log
+        episode.save(os.path.join(config.EPISODE_DIR, f"episode-{scenario['id']}-{seed}.npz"))
+
+    return {
+        "id": scenario["id"],
+        "scenario": scenario.get("name"),
+        "seed": seed,
+        "ticks": ticks,
+        "sim_seconds": ticks * config.FIXED_DELTA_SECONDS,
+        "distance": float(speeds.sum() * config.FIXED_DELTA_SECONDS),
+        "mean_speed": float(speeds.mean()) if ticks else 0.0,
+        "min_obstacle_dist": min_gap if min_gap < float("inf") else None,
+        "emergency_ticks": emergency,
+        "lane_changes": lane_changes,
+        "traffic": len(traffic.spawned),
+        "step_ms_mean": float(step_ms.mean()) if ticks else 0.0,
+        "step_ms_p95": float(np.percentile(step_ms, 95)) if ticks else 0.0,
+        "tick_ms_mean": float(tick_ms.mean()) if ticks else 0.0,
+        "tick_ms_p95": float(np.percentile(tick_ms, 95)) if ticks else 0.0,
+        "setup_seconds": setup,
+        "wall_seconds": time.perf_counter() - t0,
+    }
+
+
+def _worker(conn, endpoint, log_file):
+    """Persistent episode runner for one endpoint. Replies ("ok", result) or ("error", message)."""
+    if endpoint.fake:
+        import fake_carla
+        fake_carla.install()
+    config.LOG_FILE = log_file
+    import carla
+    import event_log
+    session = None
+    try:
+        while True:
+            scenario = conn.recv()
+            if scenario is None:
+                break
+            try:
+                if session is None:
+                    client = carla.Client(endpoint.host, endpoint.port)
+                    client.set_timeout(config.TIMEOUT)
+                    session = EpisodeSession(client, endpoint.tm_port)
+                conn.send(("ok", run_episode(session, scenario)))
+            except Exception as e:  # Lost server, RPC timeout, no spawn point...
+                session = None  # Reconnect and set up from scratch for the next episode
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        if session is not None:
+            session.close()
+        event_log.shutdown()
+
+
+class _Slot:
+    """One endpoint: its worker process, optional local server, and the job in flight."""
+
+    def __init__(self, index, endpoint):
+        self.index = index
+        self.endpoint = endpoint
+        self.proc = None
+        self.conn = None
+        self.server = None
+        self.job = None
+        self.started = 0.0
+        self.failures = 0  # Consecutive
+        self.done = 0
+        self.retired = False
+
+
+class ScenarioExecutor:
+    """Runs scenario episodes from a work queue across a pool of simulator endpoints.
+
+    Each endpoint gets a persistent worker process (one episode at a time,
+    as a server runs one world). A failed episode (exception, worker death
+    or timeout) is requeued for any endpoint up to `retries` times; the
+    failing worker is restarted, along with its server when launched
+    locally (server_cmd). An endpoint failing max_failures times in a row
+    is retired. Throughput scales with the number of endpoints.
+    """
+
+    def __init__(self, endpoints, retries=None, timeout=None, max_failures=None, log_dir=None,
+                 server_cmd=None):
+        self.slots = [_Slot(i, ep) for i, ep in enumerate(endpoints)]
+        self.retries = config.EXECUTOR_RETRIES if retries is None else retries
+        self.timeout = timeout or config.EXECUTOR_EPISODE_TIMEOUT
+        self.max_failures = max_failures or config.EXECUTOR_MAX_FAILURES
+        self.log_dir = log_dir
+        self.server_cmd = server_cmd
+        self.ctx = mp.get_context("spawn")  # No forked CARLA client/RPC state
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+
+    def _log_file(self, slot):
+        if not self.log_dir:
+            return os.devnull
+        return os.path.join(self.log_dir, f"endpoint-{slot.index:02d}-{slot.endpoint.port}.log")
+
+    def _start(self, slot):
+        ep = slot.endpoint
+        if self.server_cmd and not ep.fake and (slot.server is None or slot.server.poll() is not None):
+            cmd = self.server_cmd.format(host=ep.host, port=ep.port, tm_port=ep.tm_port)
+            slot.server = subprocess.Popen(shlex.split(cmd), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            print(f"🖥️  [{slot.index}] server launched on :{ep.port}, waiting {config.EXECUTOR_SERVER_STARTUP:.0f}s")
+            time.sleep(config.EXECUTOR_SERVER_STARTUP)
+        slot.conn, child = self.ctx.Pipe()
+        slot.proc = self.ctx.Process(target=_worker, args=(child, ep, self._log_file(slot)), daemon=True)
+        slot.proc.start()
+        child.close()
+
+    def _stop(self, slot, kill=False):
+        if slot.proc is not None:
+            if kill:
+                slot.proc.kill()
+            else:
+                try:
+                    slot.conn.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+            slot.proc.join(5.0)
+            if slot.proc.is_alive():
+                slot.proc.kill()
+                slot.proc.join()
+            slot.conn.close()
+            slot.proc = slot.conn = None
+        if kill and slot.server is not None:
+            slot.server.kill()
+            slot.server.wait()
+            slot.server = None
+
+    def _fail(self, slot, error, pending, attempts, results, restart):
+        job = slot.job
+        slot.job = None
+        attempts[job["id"]] += 1
+        ep = slot.endpoint
+        print(f"⚠️  [{slot.index}] {ep.host}:{ep.port} episode {job['id']} "
+              f"attempt {attempts[job['id']]} failed: {error}")
+        if attempts[job["id"]] <= self.retries:
+            pending.appendleft(job)
+        else:
+            results[job["id"]] = {"id": job["id"], "seed": job["seed"], "status": "failed", "error": error,
+                                  "endpoint": f"{ep.host}:{ep.port}", "attempts": attempts[job["id"]]}
+
+        slot.failures += 1
+        if slot.failures >= self.max_failures:
+            print(f"🛑 [{slot.index}] {ep.host}:{ep.port} retired after {slot.failures} failures in a row")
+            slot.retired = True
+            self._stop(slot, kill=True)
+        elif restart or not slot.proc.is_alive():
+            self._stop(slot, kill=True)
+            self._start(slot)
+
+    def run(self, scenarios):
+        """Run every scenario; returns their results ordered by id (failed ones marked)."""
+        pending = collections.deque(scenarios)
+        attempts = collections.Counter()
+        results = {}
+        for slot in self.slots:
+            self._start(slot)
+        try:
+            while True:
+                live = [s for s in self.slots if not s.retired]
+                if not live:
+                    for job in pending:
+                        results[job["id"]] = {"id": job["id"], "seed": job["seed"], "status": "failed",
+                                              "error": "no live endpoints", "attempts": attempts[job["id"]]}
+                    break
+                for slot in live:
+                    if slot.job is None and pending:
+                        slot.job = pending.popleft()
+                        slot.started = time.monotonic()
+                        slot.conn.send(slot.job)
+                busy = [s for s in live if s.job is not None]
+                if not busy:
+                    break
+
+                now = time.monotonic()
+                left = min(s.started + self.timeout - now for s in busy)
+                ready = wait([s.conn for s in busy], timeout=max(0.0, left))
+                for slot in busy:
+                    if slot.conn in ready:
+                        try:
+                            status, payload = slot.conn.recv()
+                        except (EOFError, OSError):
+                            slot.proc.join(1.0)
+                            self._fail(slot, f"worker died (exit code {slot.proc.exitcode})",
+                                       pending, attempts, results, restart=True)
+                            continue
+                        if status == "ok":
+                            ep = slot.endpoint
+                            payload.update(status="ok", endpoint=f"{ep.host}:{ep.port}",
+                                           attempts=attempts[slot.job["id"]] + 1)
+                            results[slot.job["id"]] = payload
+                            slot.job = None
+                            slot.failures = 0
+                            slot.done += 1
+                        else:
+                            self._fail(slot, payload, pending, attempts, results, restart=False)
+                    elif time.monotonic() - slot.started > self.timeout:
+                        self._fail(slot, f"timeout after {self.timeout:g}s", pending, attempts, results,
+                                   restart=True)
+        finally:
+            for slot in self.slots:
+                self._stop(slot, kill=slot.job is not None)
+                if slot.server is not None:
+                    slot.server.terminate()
+                    slot.server.wait()
+        return [results[k] for k in sorted(results)]
+
+
+def summarize(results, wall_seconds):
+    """Merged totals over all episodes plus a per-endpoint breakdown."""
+    ok = [r for r in results if r["status"] == "ok"]
+    sim = sum(r["sim_seconds"] for r in ok)
+    per_endpoint = collections.defaultdict(lambda: {"episodes": 0, "sim_seconds": 0.0})
+    for r in ok:
+        per_endpoint[r["endpoint"]]["episodes"] += 1
+        per_endpoint[r["endpoint"]]["sim_seconds"] += r["sim_seconds"]
+    gaps = [r["min_obstacle_dist"] for r in ok if r["min_obstacle_dist"] is not None]
+    return {
+        "episodes": len(results),
+        "ok": len(ok),
+        "failed": len(results) - len(ok),
+        "retried": sum(1 for r in results if r["attempts"] > 1),
+        "wall_seconds": wall_seconds,
+        "sim_seconds": sim,
+        "sim_speedup": sim / wall_seconds if wall_seconds > 0 else 0.0,
+        "episodes_per_hour": len(ok) / wall_seconds * 3600 if wall_seconds > 0 else 0.0,
+        "setup_ms_mean": float(np.mean([r["setup_seconds"] for r in ok])) * 1000.0 if ok else 0.0,
+        "distance": sum(r["distance"] for r in ok),
+        "mean_speed": float(np.mean([r["mean_speed"] for r in ok])) if ok else 0.0,
+        "min_obstacle_dist": min(gaps) if gaps else None,
+        "emergency_ticks": sum(r["emergency_ticks"] for r in ok),
+        "lane_changes": sum(r["lane_changes"] for r in ok),
+        "step_ms_p95": max((r["step_ms_p95"] for r in ok), default=0.0),
+        "tick_ms_p95": max((r["tick_ms_p95"] for r in ok), default=0.0),
+        "per_endpoint": dict(per_endpoint),
+    }
+
+
+def _parse_endpoint(text):
+    host, port, tm_port = text.rsplit(":", 2)
+    return Endpoint(host, int(port), int(tm_port))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run scenario episodes across several simulator endpoints")
+    parser.add_argument("--episodes", type=int, default=8)
+    parser.add_argument("--ticks", type=int, default=900, help="World ticks per episode")
+    parser.add_argument("--traffic", type=int, default=0, help="Autopilot vehicles per episode")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of episode 0 (then +1 per episode)")
+    parser.add_argument("--scenarios", nargs="+", metavar="FILE",
+                        help="Scenario files (scenarios.py format) instead of --episodes default scenarios")
+    parser.add_argument("--endpoints", nargs="+", type=_parse_endpoint, metavar="HOST:PORT:TM_PORT",
+                        help="Default: config.ENDPOINTS")
+    parser.add_argument("--local", type=int, metavar="N", help="N endpoints on localhost from PORT/TM_PORT")
+    parser.add_argument("--fake", type=int, metavar="N", help="N fake_carla stand-in endpoints (no server)")
+    parser.add_argument("--launch", action="store_true", help="Start a server per endpoint (EXECUTOR_SERVER_CMD)")
+    parser.add_argument("--timeout", type=float, help="Episode timeout (s)")
+    parser.add_argument("--retries", type=int)
+    parser.add_argument("--log-dir", help="Per-endpoint event logs (default: discarded)")
+    parser.add_argument("--out", help="Write per-episode results and the summary as JSON")
+    args = parser.parse_args()
+
+    if args.fake:
+        endpoints = local_endpoints(args.fake, fake=True)
+    elif args.local:
+        endpoints = local_endpoints(args.local)
+    else:
+        endpoints = args.endpoints or endpoints_from_config()
+    if args.launch and not config.EXECUTOR_SERVER_CMD:
+        parser.error("--launch needs config.EXECUTOR_SERVER_CMD")
+
+    if args.scenarios:
+        if args.fake:
+            import fake_carla  # Workers compile the plans; here the loader only needs carla importable
+            fake_carla.install()
+        import scenarios
+        jobs = [spec for path in args.scenarios for spec in scenarios.load(path, args.seed, args.ticks)]
+        for i, spec in enumerate(jobs):
+            spec["id"] = i  # Unique across files
+    else:
+        jobs = make_scenarios(args.episodes, args.seed, args.ticks, args.traffic)
+
+    executor = ScenarioExecutor(endpoints, retries=args.retries, timeout=args.timeout, log_dir=args.log_dir,
+                                server_cmd=config.EXECUTOR_SERVER_CMD if args.launch else None)
+    print(f"🚦 {len(jobs)} episodes on {len(endpoints)} endpoints")
+    t0 = time.perf_counter()
+    results = executor.run(jobs)
+    summary = summarize(results, time.perf_counter() - t0)
+
+    print(f"✅ {summary['ok']}/{summary['episodes']} ok ({summary['retried']} retried) in "
+          f"{summary['wall_seconds']:.1f}s: {summary['sim_speedup']:.1f}x real time, "
+          f"{summary['episodes_per_hour']:.0f} episodes/h, {summary['setup_ms_mean']:.0f}ms setup/episode")
+    print(f"   distance {summary['distance']:.0f} m, mean speed {summary['mean_speed']:.1f} m/s, "
+          f"{summary['emergency_ticks']} emergency ticks, {summary['lane_changes']} lane changes")
+    for name, st in summary["per_endpoint"].items():
+        print(f"   {name:<22} {st['episodes']:4d} episodes  {st['sim_seconds']:8.1f} sim s")
+    for r in results:
+        if r["status"] != "ok":
+            print(f"❌ episode {r['id']} (seed {r['seed']}): {r['error']}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"summary": summary, "episodes": results}, f, indent=2)
+        print(f"💾 Results saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+
+import argparse
+import collections
+import contextlib
+import json
+import math
+import random
+import sys
+import time
+import numpy as np
+
+# --fake must swap in the stand-in before anything imports carla
+if __name__ == "__main__" and "--fake" in sys.argv:
+    import fake_carla
+    fake_carla.install()
+
+import carla
+import config
+import utils
+import event_log
+from event_log import event
+
+# Scenario file (JSON): one scenario, a list of them, or
+#   {"defaults": {...}, "scenarios": [{...}, ...]}
+# Scenario keys (all optional; DEFAULT has the built-in values):
+#   name, map ("Town04"; loaded if the current map differs), seed, ticks,
+#   ego: {"spawn": "multi_lane" | "any" | spawn point index, "left": bool, "right": bool}
+#   obstacles: [{"distance": m down the ego lane, "lane": -1 left / +1 right, "offset": m, "blueprint": id}]
+#   traffic: autopilot vehicle count
+#   respawn: {"interval": sim s, "distance": m} or null
+#   config: {"CONFIG_KEY": value} overrides for the episode
+#   repeat: n copies with seeds seed, seed+1, ...
+DEFAULT = {
+    "name": "default",
+    "map": None,
+    "seed": None,
+    "ticks": 900,
+    "ego": {"spawn": "multi_lane"},
+    "obstacles": [{"distance": 150.0}],
+    "traffic": 0,
+    "respawn": {"interval": 20.0, "distance": 80.0},
+    "config": {},
+}
+
+_XY_CACHE = {}  # world.id -> spawn point xy (n, 2)
+
+# Fully resolved: transforms and blueprint ids, nothing left to query or draw
+SpawnPlan = collections.namedtuple("SpawnPlan", "id name map seed ticks ego ego_bp obstacles traffic respawn config")
+
+
+def load(path, seed=None, ticks=None):
+    """Scenario specs from a file, defaults merged, ids and seeds assigned.
+
+    Scenarios without a seed get seed + index (seed=None: config.SEED, else 0),
+    so a file always expands to the same episodes.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    defaults = {}
+    if isinstance(data, dict) and "scenarios" in data:
+        defaults, data = data.get("defaults", {}), data["scenarios"]
+    elif isinstance(data, dict):
+        data = [data]
+    base = seed if seed is not None else (config.SEED or 0)
+
+    specs = []
+    for raw in data:
+        spec = dict(DEFAULT, **defaults)
+        spec.update(raw)
+        unknown = set(spec) - set(DEFAULT) - {"repeat"}
+        if unknown:
+            raise ValueError(f"{path}: unknown scenario keys {sorted(unknown)}")
+        if ticks is not None and "ticks" not in raw and "ticks" not in defaults:
+            spec["ticks"] = ticks
+        repeat = spec.pop("repeat", 1)
+        first = spec["seed"]
+        for k in range(repeat):
+            s = dict(spec, id=len(specs))
+            s["seed"] = base + s["id"] if first is None else first + k
+            specs.append(s)
+    return specs
+
+
+def apply_config(values):
+    """Set config overrides; returns the previous values (for restoring)."""
+    previous = {}
+    for key, value in (values or {}).items():
+        if not hasattr(config, key):
+            raise ValueError(f"Unknown config override {key}")
+        previous[key] = getattr(config, key)
+        setattr(config, key, value)
+    return previous
+
+
+@contextlib.contextmanager
+def config_overrides(values):
+    previous = apply_config(values)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            setattr(config, key, value)
+
+
+def needs_map(world, spec):
+    """Map name to load for spec, or None if the world already has it."""
+    name = spec.get("map")
+    if name and utils.get_map(world).name.split("/")[-1] != name.split("/")[-1]:
+        return name
+    return None
+
+
+def _pick_ego(world, selector, rng):
+    spawn = selector.get("spawn", "multi_lane")
+    if isinstance(spawn, int):
+        points = utils.get_spawn_points(world)
+        return points[spawn % len(points)]
+    if spawn == "any":
+        return rng.choice(utils.get_spawn_points(world))
+    choices = [sp for sp, has_left, has_right in utils.multi_lane_spawns(world)
+               if (has_left or not selector.get("left")) and (has_right or not selector.get("right"))]
+    if not choices:
+        raise ValueError(f"No spawn point matches ego selector {selector}")
+    return rng.choice(choices)
+
+
+def _obstacle_transform(world, ego_tf, obstacle):
+    """Obstacle distance metres down the ego lane (dense route segments), shifted by lane/offset."""
+    loc = ego_tf.location
+    point = utils.get_route_planner(world).ahead(loc.x, loc.y, obstacle.get("distance", 100.0))
+    if point is None:
+        raise ValueError(f"No road {obstacle.get('distance', 100.0)}m ahead of the ego spawn")
+    wp = utils.get_map(world).get_waypoint(carla.Location(x=point[0], y=point[1], z=loc.z))
+    lane = obstacle.get("lane", 0)
+    for _ in range(abs(lane)):
+        wp = wp.get_right_lane() if lane > 0 else wp.get_left_lane()
+        if not wp or wp.lane_type != carla.LaneType.Driving:
+            raise ValueError(f"No driving lane {lane:+d} at {obstacle.get('distance', 100.0)}m")
+    tf = wp.transform
+    yaw = math.radians(tf.rotation.yaw)
+    offset = obstacle.get("offset", 0.0)  # Right of the lane centre is +
+    return carla.Transform(carla.Location(x=tf.location.x - math.sin(yaw) * offset,
+                                          y=tf.location.y + math.cos(yaw) * offset,
+                                          z=tf.location.z + 0.5),  # Drop prevention
+                           carla.Rotation(pitch=tf.rotation.pitch, yaw=tf.rotation.yaw, roll=tf.rotation.roll))
+
+
+def _spawn_xy(world):
+    xy = _XY_CACHE.get(world.id)
+    if xy is None:
+        xy = _XY_CACHE[world.id] = np.array([(sp.location.x, sp.location.y) for sp in utils.get_spawn_points(world)])
+    return xy
+
+
+def compile_plan(world, spec):
+    """Resolve a spec against the world's cached map data into a SpawnPlan.
+
+    Every random choice (ego spawn, traffic spawn points and blueprints) is
+    drawn here from the spec's seed, so the same spec always compiles to the
+    same plan. Raises ValueError for specs the map can't satisfy.
+    """
+    with config_overrides(spec.get("config")):
+        rng = random.Random(spec["seed"])
+        try:
+            ego = _pick_ego(world, spec.get("ego") or {}, rng)
+            obstacles = [(o.get("blueprint") or config.OBSTACLE_FILTER, _obstacle_transform(world, ego, o))
+                         for o in spec.get("obstacles") or ()]
+        except ValueError as e:
+            raise ValueError(f"Scenario {spec.get('id', 0)} ({spec.get('name')}, seed {spec['seed']}): {e}") from None
+
+        traffic = []
+        count = spec.get("traffic") or 0
+        if count:
+            spawns = utils.get_spawn_points(world)
+            xy = _spawn_xy(world)
+            free = np.hypot(*(xy - (ego.location.x, ego.location.y)).T) > config.SCENARIO_TRAFFIC_CLEARANCE
+            for _, tf in obstacles:
+                free &= np.hypot(*(xy - (tf.location.x, tf.location.y)).T) > 8.0
+            points = [spawns[i] for i in np.flatnonzero(free)]
+            rng.shuffle(points)
+            if len(points) < count:
+                event("spawn", "⚠️  Scenario {}: only {} free spawn points for {} vehicles",
+                      spec.get("name"), len(points), count)
+            blueprints = [bp.id for bp in utils.get_blueprint_library(world).filter("vehicle.*")]
+            traffic = [(rng.choice(blueprints), sp) for sp in points[:count]]
+
+        respawn = spec.get("respawn")
+        return SpawnPlan(spec.get("id", 0), spec.get("name"), spec.get("map"), spec["seed"], spec.get("ticks"),
+                         ego, config.EGO_FILTER, obstacles, traffic,
+                         (respawn["interval"], respawn["distance"]) if respawn else None,
+                         dict(spec.get("config") or {}))
+
+
+def compile_all(world, specs):
+    return [compile_plan(world, spec) for spec in specs]
+
+
+def _blueprint(world, bp_id, role):
+    lib = utils.get_blueprint_library(world)
+    bp = lib.find(bp_id) if "*" not in bp_id else lib.filter(bp_id)[0]
+    bp.set_attribute('role_name', role)
+    return bp
+
+
+def realize(client, world, plan, ego=None, obstacles=(), traffic=(), tm_port=None):
+    """Bring the world to plan in one apply_batch_sync.
+
+    Existing actors are reused: the ego, obstacles and traffic passed in are
+    teleported to the plan's transforms and stopped (keeping their
+    blueprints), missing ones are spawned and surplus ones destroyed. Applies
+    on the next tick. Returns (ego, obstacles, traffic) actor lists.
+    """
+    cmd = carla.command
+    tm_port = tm_port or config.TM_PORT
+    stop = carla.Vector3D()
+    obstacles, traffic = list(obstacles), list(traffic)
+    batch, roles = [], []
+
+    def add(command, role=None):
+        batch.append(command)
+        roles.append(role)
+
+    for actor in obstacles[len(plan.obstacles):] + traffic[len(plan.traffic):]:
+        add(cmd.DestroyActor(actor.id))
+    obstacles, traffic = obstacles[:len(plan.obstacles)], traffic[:len(plan.traffic)]
+
+    if ego is not None:
+        add(cmd.ApplyTransform(ego.id, plan.ego))
+        add(cmd.ApplyTargetVelocity(ego.id, stop))
+        add(cmd.ApplyTargetAngularVelocity(ego.id, stop))
+        add(cmd.ApplyVehicleControl(ego.id, carla.VehicleControl()))
+    else:
+        add(cmd.SpawnActor(_blueprint(world, plan.ego_bp, 'hero'), plan.ego), "ego")  # Centre of the TM hybrid radius
+    for i, (bp_id, tf) in enumerate(plan.obstacles):
+        if i < len(obstacles):
+            add(cmd.ApplyTransform(obstacles[i].id, tf))
+            add(cmd.ApplyTargetVelocity(obstacles[i].id, stop))
+            add(cmd.ApplyTargetAngularVelocity(obstacles[i].id, stop))
+            add(cmd.ApplyVehicleControl(obstacles[i].id, carla.VehicleControl(hand_brake=True)))
+        else:
+            add(cmd.SpawnActor(_blueprint(world, bp_id, 'obstacle'), tf)
+                .then(cmd.ApplyVehicleControl(cmd.FutureActor, carla.VehicleControl(hand_brake=True))), "obstacle")
+    for i, (bp_id, tf) in enumerate(plan.traffic):
+        if i < len(traffic):
+            add(cmd.ApplyTransform(traffic[i].id, tf))
+            add(cmd.ApplyTargetVelocity(traffic[i].id, stop))
+        else:
+            add(cmd.SpawnActor(_blueprint(world, bp_id, 'autopilot'), tf)
+                .then(cmd.SetAutopilot(cmd.FutureActor, True, tm_port)), "traffic")
+
+    new = {"ego": [], "obstacle": [], "traffic": []}
+    failed = 0
+    for response, role in zip(client.apply_batch_sync(batch, False), roles):
+        if role is None:
+            continue
+        if response.has_error():
+            if role == "ego":
+                raise RuntimeError(f"❌ Scenario {plan.name}: ego spawn failed ({response.error})")
+            failed += 1
+        else:
+            new[role].append(response.actor_id)
+    ids = new["ego"] + new["obstacle"] + new["traffic"]
+    actors = {a.id: a for a in world.get_actors(ids)} if ids else {}
+    if new["ego"]:
+        ego = actors[new["ego"][0]]
+    obstacles += [actors[i] for i in new["obstacle"] if i in actors]
+    traffic += [actors[i] for i in new["traffic"] if i in actors]
+    event("spawn", "🎬 Scenario {} (seed {}): {} commands in one batch, {} spawned, {} failed",
+          plan.name, plan.seed, len(batch), len(ids), failed)
+    return ego, obstacles, traffic
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load and compile scenario files into spawn plans")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--fake", action="store_true", help="Compile against fake_carla (no server)")
+    parser.add_argument("--spawn", type=int, metavar="N", help="Also realize the first N plans in turn")
+    args = parser.parse_args()
+
+    client = carla.Client(config.HOST, config.PORT)
+    client.set_timeout(config.TIMEOUT)
+    world = utils.setup_world(client)
+    try:
+        t0 = time.perf_counter()
+        specs = [spec for path in args.files for spec in load(path)]
+        t1 = time.perf_counter()
+        plans = compile_all(world, specs)
+        t2 = time.perf_counter()
+        print(f"🎬 {len(plans)} scenarios: load {(t1 - t0) * 1000:.0f}ms, compile {(t2 - t1) * 1000:.0f}ms "
+              f"({(t2 - t1) * 1e6 / max(len(plans), 1):.0f}us each), "
+              f"{sum(1 + len(p.obstacles) + len(p.traffic) for p in plans)} actors planned")
+        if args.spawn:
+            ego, obstacles, traffic = None, [], []
+            t0 = time.perf_counter()
+            for plan in plans[:args.spawn]:
+                ego, obstacles, traffic = realize(client, world, plan, ego, obstacles, traffic)
+                world.tick()
+            print(f"🚀 {min(args.spawn, len(plans))} plans realized in {(time.perf_counter() - t0) * 1000:.0f}ms")
+            utils.setup_world(client, prefetch=False)  # Nuclear cleanup
+    finally:
+        event_log.shutdown()
+
+
+if __name__ == "__main__":
+    main()
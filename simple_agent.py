@@ -1,131 +1,374 @@
 
 import carla
 import math
-import queue
-import time
 import config
+import utils
+from event_log import event
+from radar_processor import closest_in_lane, decode
+from radar_rig import RadarRig, Z
+from occupancy_grid import OccupancyGrid
+from speed_profile import build_profile, stop_speed, longitudinal
+from watchdog import TickWatchdog
+from rate_scheduler import RateScheduler
+from mpc_lateral import MPCLateral
+from bspline_planner import BSplinePlanner
+from lane_offset_planner import LaneOffsetPlanner
+from path_follower import PathFollower
+from collision_checker import CollisionChecker
 
 class SimpleAgent:
     """Robust autonomous driving agent with debug output."""
     
-    def __init__(self, world, ego):
+    def __init__(self, world, ego, radar_recorder=None, watchdog=None):
         self.world = world
         self.ego = ego
-        self.map = world.get_map()
+        self.watchdog = watchdog or TickWatchdog()  # Shared with main's loop when given
+        self.map = utils.get_map(world)
         
         # Sensors
-        self.radar_queue = queue.Queue()
-        self.radar = self._setup_radar()
+        self.radar = RadarRig(world, ego, recorder=radar_recorder)
+        self.grid = OccupancyGrid()
+        self._grid_frames = []  # Radar frames not yet in the grid
+        
+        # Rate groups: perception and steering every tick, the rest slower
+        self.sched = RateScheduler()
+        self.sched.register("radar", config.RATE_RADAR)
+        self.sched.register("plan", config.RATE_PLAN)
+        self.sched.register("grid", config.RATE_GRID)
+        self.sched.register("radar_adapt", config.RATE_RADAR_ADAPT, cost=0.1)
+        self._target = None  # Steering target picked by the last planning step
         
         # State
         self.state = "CRUISE"
-        self.lane_change_until = 0
+        self.lane_change_until = 0  # Abort deadline
         self.cooldown_until = 0
         self.lane_change_dir = None  # 'left' or 'right'
         
-    def _setup_radar(self):
-        bp = self.world.get_blueprint_library().find('sensor.other.radar')
-        bp.set_attribute('horizontal_fov', str(config.RADAR_FOV_AZIMUTH))
-        bp.set_attribute('vertical_fov', str(config.RADAR_FOV_ELEVATION))
-        bp.set_attribute('range', str(config.RADAR_RANGE))
-        bp.set_attribute('points_per_second', str(config.RADAR_POINTS_PER_SECOND))
+        # Lane change path: planned once when the change starts, then tracked
+        self.bspline = BSplinePlanner(self.map)
+        self.offset_planner = LaneOffsetPlanner(world)
+        self.lane_follower = PathFollower(ego)
+        self.checker = CollisionChecker()  # Lane change path vs. the vehicles around
+        self.lane_change_end = 0  # Path index where the lateral move is done
+        
+        # Global route (see set_destination)
+        self.destination = None
+        self.route = None
+        self.route_idx = 0
+        self.profile = None  # Speed profile along the route
+        self.replan_pending = False
+        self.mpc = MPCLateral() if config.LATERAL_CONTROLLER == "mpc" else None  # Route steering
+        
+        # Last perception result (read by telemetry)
+        self.obstacle_dist = 999.0
+        self.obstacle_vel = 0.0
+        # Stop envelope input: the last in-lane hit, held through radar dropouts
+        self.stop_dist = 999.0
+        self.stop_vel = 0.0
+        self._stop_seen = 0.0  # Sim time of that hit
+        self._stop_misses = 0
         
-        tf = carla.Transform(carla.Location(x=2.5, z=1.0))
-        sensor = self.world.spawn_actor(bp, tf, attach_to=self.ego)
-        sensor.listen(self.radar_queue.put)
-        return sensor
-
     def destroy(self):
         if self.radar: self.radar.destroy()
 
+    def reset(self):
+        """Forget the episode (state, route, grid, queued radar frames); sensors stay attached."""
+        self.radar.reset()
+        self.grid.reset()
+        self._grid_frames = []
+        self.sched.reset()
+        self._target = None
+        self.state = "CRUISE"
+        self.lane_change_until = 0
+        self.cooldown_until = 0
+        self.lane_change_dir = None
+        self.lane_follower.set_path(None)
+        self.lane_change_end = 0
+        self.destination = None
+        self.route = None
+        self.route_idx = 0
+        self.profile = None
+        self.replan_pending = False
+        self.obstacle_dist = 999.0
+        self.obstacle_vel = 0.0
+        self.stop_dist = 999.0
+        self.stop_vel = 0.0
+        self._stop_seen = 0.0
+        self._stop_misses = 0
+        if self.mpc: self.mpc.reset()
+
     def _get_obstacle_dist(self):
         """Get closest obstacle distance (with filters)."""
         min_dist = 999.0
+        min_vel = 0.0
         point_count = 0
+        frames = self.radar.drain()
+        
+        # In-lane distance from the forward unit, every unit feeds the grid
+        for sid, data in frames:
+            if sid != 0:
+                continue
+            count, dist, vel = closest_in_lane(decode(data))
+            point_count += count
+            if dist < min_dist:
+                min_dist = dist
+                min_vel = vel
         
-        while not self.radar_queue.empty():
-            data = self.radar_queue.get()
-            for det in data:
-                # CRITICAL: Ignore self-detection (anything < 3m is likely ego vehicle)
-                if det.depth < 3.0:
-                    continue
-                    
-                point_count += 1
-                # Only consider forward-facing points within lane width
-                lateral = abs(det.depth * math.sin(det.azimuth))
-                if lateral < 2.5:  # Within ~lane width
-                    if det.depth < min_dist:
-                        min_dist = det.depth
+        # Grid and rig budgeting run at their own rates and can slip a frame;
+        # the in-lane distance can't
+        wd = self.watchdog
+        self._grid_frames.extend(frames)
+        if self.sched.due("grid"):
+            wd.deferrable("grid", self._update_grid)
+        if self.sched.due("radar_adapt"):
+            vel = self.ego.get_velocity()
+            wd.deferrable("radar_adapt", self.radar.adapt, self.state, math.sqrt(vel.x**2 + vel.y**2),
+                          min_dist, utils.sim_time(self.world))
         
         # Debug: Show radar detection (only when detecting real obstacles)
         if point_count > 0 and min_dist < 100:
-            print(f"📡 Radar: {point_count} pts, closest: {min_dist:.1f}m")
+            event("radar", "📡 Radar: {} pts, closest: {:.1f}m", point_count, min_dist)
         
+        self.obstacle_dist = min_dist
+        self.obstacle_vel = min_vel
+        self._hold_stop(min_dist, min_vel)
         return min_dist
 
+    def _hold_stop(self, dist, vel):
+        """Stop envelope gap: a miss (e.g. while RadarRig.adapt respawns units) keeps
+        the last hit for RADAR_HOLD_FRAMES frames, closing at its relative speed."""
+        now = utils.sim_time(self.world)
+        if dist < config.RADAR_RANGE:
+            self.stop_dist, self.stop_vel = dist, vel
+            self._stop_seen = now
+            self._stop_misses = 0
+        elif self.stop_dist < config.RADAR_RANGE and self._stop_misses < config.RADAR_HOLD_FRAMES:
+            self._stop_misses += 1
+            self.stop_dist = max(0.0, self.stop_dist + self.stop_vel * (now - self._stop_seen))
+            self._stop_seen = now
+        else:
+            self.stop_dist, self.stop_vel = dist, vel
+
+    def set_destination(self, location):
+        """Plan a route to location; the agent follows it instead of wp.next()."""
+        self.destination = location
+        loc = self.ego.get_location()
+        self.route = utils.get_route_planner(self.world).route(loc, location)
+        self.route_idx = 0
+        self.replan_pending = False
+        if self.route is None:
+            self.profile = None
+            event("route", "⚠️ No route to destination")
+        else:
+            self.profile = build_profile(self.route.xy, self.route.s)
+            if self.mpc:
+                # Only up to the first lane-change link, the checked lane change does the rest
+                end = self._route_end()
+                self.mpc.set_path(self.route.xy[:end], self.route.yaw[:end])
+        return self.route
+
+    def _route_end(self):
+        """Route points drivable by path tracking: up to the first lane-change link."""
+        return self.route.lane_changes[0][0] if self.route.lane_changes else len(self.route)
+
+    def _route_change(self, now):
+        """Side of the route's next lane-change link once it is close enough to start, else None."""
+        if self.route is None or self.replan_pending or not self.route.lane_changes or now <= self.cooldown_until:
+            return None
+        idx, side = self.route.lane_changes[0]
+        if self.route.s[idx - 1] - self.route.s[self.route_idx] > config.ROUTE_LANE_CHANGE_AHEAD:
+            return None
+        return side
+
+    def _update_grid(self):
+        """Accumulate radar points (all units) since the last update into the ego-frame occupancy grid."""
+        fused = self.radar.fuse(self._grid_frames)
+        self._grid_frames = []
+        fused = fused[fused[:, Z] > config.GRID_MIN_Z]
+        snap = self.world.get_snapshot()
+        self.grid.update(fused, snap.find(self.ego.id).get_transform(), snap.timestamp.elapsed_seconds)
+
+    def _lane_free(self, lane):
+        """Target lane exists, is drivable and its corridor is clear on the grid."""
+        if not lane or lane.lane_type != carla.LaneType.Driving:
+            return False
+        # Corridor on the target lane's centre line in the ego frame (+ right),
+        # so the ego's own offset in its lane doesn't shift it
+        tf = self.ego.get_transform()
+        yaw = math.radians(tf.rotation.yaw)
+        c = lane.transform.location
+        offset = -math.sin(yaw) * (c.x - tf.location.x) + math.cos(yaw) * (c.y - tf.location.y)
+        return self.grid.lane_free(offset, lane.lane_width)
+
     def tick(self):
         """Main control loop."""
-        now = time.time()
+        self.sched.step()
+        now = utils.sim_time(self.world)
+        obstacle_dist = self.sched.run("radar", self.watchdog.critical, "radar", self._get_obstacle_dist)
+        
+        # Re-route after a lane change when the frame budget allows it
+        if self.replan_pending:
+            self.watchdog.deferrable("replan", self.set_destination, self.destination)
+        
+        # Lane changes track their precomputed path every tick, no map queries
+        if self.state == "LANE_CHANGE":
+            return self._follow_lane_change(now)
+        
+        if self.sched.due("plan"):
+            return self._plan(now, obstacle_dist)
+        
+        # Between planning steps only steering runs, towards the last target
+        if self.route is not None and not self.replan_pending and self.state == "CRUISE":
+            return self._follow_route()
+        if self._target is None:
+            return self._drive_forward()
+        return self._steer_towards(self._target)
+
+    def _plan(self, now, obstacle_dist):
+        """Lane-change decisions and waypoint lookups (RATE_PLAN)."""
+        # On a route, plain cruising needs no map queries at all
+        if self.route is not None and not self.replan_pending and self.state == "CRUISE":
+            if not (now > self.cooldown_until and obstacle_dist < config.AVOID_DIST) and self._route_change(now) is None:
+                return self._follow_route()
+        
         loc = self.ego.get_location()
         wp = self.map.get_waypoint(loc)
         
         # If no waypoint, just drive forward
         if not wp:
-            print("⚠️ No waypoint found - driving forward")
+            event("waypoint", "⚠️ No waypoint found - driving forward")
             return self._drive_forward()
         
-        obstacle_dist = self._get_obstacle_dist()
-        
         # STATE: CRUISE
         if self.state == "CRUISE":
             # Check for obstacles (only if not in cooldown)
             if now > self.cooldown_until and obstacle_dist < config.AVOID_DIST:
-                left = wp.get_left_lane()
-                right = wp.get_right_lane()
-                
-                can_left = left and left.lane_type == carla.LaneType.Driving
-                can_right = right and right.lane_type == carla.LaneType.Driving
+                left, right = wp.get_left_lane(), wp.get_right_lane()
                 
-                if can_left:
-                    self.state = "LANE_CHANGE"
-                    self.lane_change_dir = 'left'
-                    self.lane_change_until = now + 3.0
-                    print(f"🚗 Lane Change LEFT! Obstacle at {obstacle_dist:.1f}m")
-                elif can_right:
-                    self.state = "LANE_CHANGE"
-                    self.lane_change_dir = 'right'
-                    self.lane_change_until = now + 3.0
-                    print(f"🚗 Lane Change RIGHT! Obstacle at {obstacle_dist:.1f}m")
+                if self._lane_free(left) and self._start_lane_change(now, wp, left, 'left'):
+                    event("agent", "🚗 Lane Change LEFT! Obstacle at {:.1f}m", obstacle_dist)
+                    return self._follow_lane_change(now)
+                if self._lane_free(right) and self._start_lane_change(now, wp, right, 'right'):
+                    event("agent", "🚗 Lane Change RIGHT! Obstacle at {:.1f}m", obstacle_dist)
+                    return self._follow_lane_change(now)
+            
+            # Lane-change links on the route go through the same grid check
+            side = self._route_change(now)
+            if side is not None:
+                lane = wp.get_left_lane() if side == 'left' else wp.get_right_lane()
+                if self._lane_free(lane) and self._start_lane_change(now, wp, lane, side):
+                    event("agent", "🛣️ Route lane change {}", side.upper())
+                    return self._follow_lane_change(now)
             
             # Follow lane normally
             return self._follow_lane(wp)
-            
-        # STATE: LANE_CHANGE
-        elif self.state == "LANE_CHANGE":
+        
+        return self._follow_lane(wp)
+
+    def _start_lane_change(self, now, wp, lane, side):
+        """Plan the whole lane change from here: a B-spline lateral move onto the
+        target lane's centre, laid along the route (or lane) ahead."""
+        loc = self.ego.get_location()
+        vel = self.ego.get_velocity()
+        speed = math.sqrt(vel.x**2 + vel.y**2)
+        length = max(config.LANE_CHANGE_MIN_LENGTH, speed * config.LANE_CHANGE_TIME)
+        
+        # Offsets are relative to the current lane centre, + right
+        tf = wp.transform
+        yaw = math.radians(tf.rotation.yaw)
+        d0 = -math.sin(yaw) * (loc.x - tf.location.x) + math.cos(yaw) * (loc.y - tf.location.y)
+        d1 = 0.5 * (wp.lane_width + lane.lane_width) * (-1.0 if side == 'left' else 1.0)
+        profile = self.bspline.lateral_profile(length, d0, d1)
+        
+        route = self.route if self.route is not None and not self.replan_pending and not self.route.lane_changes else None
+        path = self.offset_planner.generate_path(loc, profile, length + config.LANE_CHANGE_TAIL,
+                                                 config.LANE_CHANGE_STEP, route=route)
+        if len(path) < 2:
+            return False
+        if not self._path_clear(path, speed, wp):
+            event("agent", "🚧 Lane change {} blocked: path conflicts with traffic", side.upper())
+            return False
+        self.lane_follower.set_path(path)
+        self.lane_change_end = min(int(length / config.LANE_CHANGE_STEP), len(path)) - 1
+        self.state = "LANE_CHANGE"
+        self.lane_change_dir = side
+        self.lane_change_until = now + config.LANE_CHANGE_TIMEOUT
+        return True
+
+    def _path_clear(self, path, speed, wp):
+        """Path (driven at the current speed) misses the other vehicles, each
+        moving at its current velocity. Catches what the grid can't: cars
+        closing in from behind or cutting into the target lane. Vehicles ahead
+        in the ego's own lane are left to the radar stop envelope, which keeps
+        braking for them until the ego is out of the lane."""
+        tf = wp.transform
+        yaw = math.radians(tf.rotation.yaw)
+        others = []
+        for a in self.world.get_actors().filter('vehicle.*'):
+            loc = a.get_location()
+            dx, dy = loc.x - tf.location.x, loc.y - tf.location.y
+            ahead = math.cos(yaw) * dx + math.sin(yaw) * dy > 0
+            if not (ahead and abs(-math.sin(yaw) * dx + math.cos(yaw) * dy) < 0.5 * wp.lane_width):
+                others.append(a)
+        self.checker.set_actors(others, exclude_id=self.ego.id)
+        return self.checker.path_clear(path, speed=max(speed, 1.0))
+
+    def _follow_lane_change(self, now):
+        """Track the lane change path; done once the lateral move is behind us and the ego is on it."""
+        follower = self.lane_follower
+        control = follower.tick()
+        settled = follower.index >= self.lane_change_end and abs(follower.cross_track) < config.LANE_CHANGE_SETTLED
+        if control is None or settled or now >= self.lane_change_until:
             if now >= self.lane_change_until:
-                print("✅ Lane change complete!")
-                self.state = "CRUISE"
-                self.cooldown_until = now + 5.0
-                self.lane_change_dir = None
-                return self._follow_lane(wp)
-            
-            # Steer towards target lane
-            target_lane = None
-            if self.lane_change_dir == 'left':
-                target_lane = wp.get_left_lane()
+                event("agent", "⚠️ Lane change timed out")
             else:
-                target_lane = wp.get_right_lane()
-            
-            if target_lane and target_lane.lane_type == carla.LaneType.Driving:
-                return self._steer_to_lane(target_lane)
-            else:
-                # Lost target lane - abort and continue
-                return self._follow_lane(wp)
+                event("agent", "✅ Lane change complete!")
+            self.state = "CRUISE"
+            self.cooldown_until = now + 5.0
+            self.lane_change_dir = None
+            self.lane_follower.set_path(None)
+            if self.destination is not None:
+                self.replan_pending = True  # Re-route from the new lane (deferrable)
+            if control is None:
+                return self._drive_forward()
         
-        return self._follow_lane(wp)
+        if follower.target is not None:
+            self._target = carla.Location(x=follower.target[0], y=follower.target[1])
+        # Path tracking steers; speed still comes from the route profile and the radar envelope
+        control.throttle, control.brake = self._longitudinal()
+        return control
+
+    def _follow_route(self):
+        """Pure pursuit (or MPC) on the precomputed route (no waypoint queries)."""
+        loc = self.ego.get_location()
+        self.route_idx = self.route.project(loc.x, loc.y, self.route_idx)
+        if self.route.remaining(self.route_idx) < config.ROUTE_END_DIST:
+            event("agent", "🏁 Destination reached")
+            self.route = None
+            self.profile = None
+            return self._follow_lane(self.map.get_waypoint(loc))
+        end = self._route_end()
+        if self.route_idx >= end - 1:
+            # Reached a lane-change link without a clear lane: hold this lane and re-route from it
+            self.replan_pending = True
+            return self._follow_lane(self.map.get_waypoint(loc))
+        # Never aim across a lane-change link
+        x, y = self.route.xy[min(self.route.index_at(self.route.s[self.route_idx] + 10.0), end - 1)]
+        target = carla.Location(x=float(x), y=float(y), z=loc.z)
+        if self.mpc:
+            self._target = target
+            vel = self.ego.get_velocity()
+            yaw = math.radians(self.ego.get_transform().rotation.yaw)
+            steer = self.mpc.steer(loc.x, loc.y, yaw, math.sqrt(vel.x**2 + vel.y**2), limit=0.5)
+            throttle, brake = self._longitudinal()
+            return carla.VehicleControl(throttle=throttle, steer=steer, brake=brake)
+        return self._steer_towards(target)
 
     def _follow_lane(self, wp):
         """Follow current lane with fallback."""
+        if self.route is not None and not self.replan_pending:
+            return self._follow_route()
+        
         # Try to get next waypoint at different distances
         for dist in [10.0, 5.0, 3.0]:
             wps = wp.next(dist)
@@ -135,16 +378,26 @@ class SimpleAgent:
         # No waypoints found - just drive forward
         return self._drive_forward()
 
-    def _steer_to_lane(self, target_lane):
-        """Steer towards target lane."""
-        # Aim 10m ahead in target lane for smooth merge
-        ahead = target_lane.next(10.0)
-        if ahead:
-            return self._steer_towards(ahead[0].transform.location)
-        return self._steer_towards(target_lane.transform.location)
+    def _target_speed(self, speed):
+        """Reference speed (m/s): route profile, capped by the radar stop envelope."""
+        if self.profile is not None:
+            v_ref = self.profile.speed_at(self.route.s[self.route_idx])
+        else:
+            v_ref = config.TARGET_SPEED_KMH / 3.6
+        if self.stop_dist < config.RADAR_RANGE:
+            # stop_vel is relative (negative = closing)
+            v_ref = min(v_ref, stop_speed(self.stop_dist, speed + self.stop_vel))
+        return v_ref
+
+    def _longitudinal(self):
+        vel = self.ego.get_velocity()
+        speed = math.sqrt(vel.x**2 + vel.y**2)
+        gap = self.stop_dist if self.stop_dist < config.RADAR_RANGE else None
+        return longitudinal(speed, self._target_speed(speed), gap)
 
     def _steer_towards(self, target_loc):
-        """Pure Pursuit steering with FIXED throttle."""
+        """Pure Pursuit steering, speed from the precomputed profile."""
+        self._target = target_loc
         loc = self.ego.get_location()
         yaw = math.radians(self.ego.get_transform().rotation.yaw)
         
@@ -160,30 +413,11 @@ class SimpleAgent:
         curvature = 2.0 * y_local / (L**2)
         steer = max(-0.5, min(0.5, curvature))
         
-        # ALWAYS apply throttle (unless at target speed)
-        vel = self.ego.get_velocity()
-        speed = 3.6 * math.sqrt(vel.x**2 + vel.y**2)
-        
-        # More aggressive throttle control
-        if speed < config.TARGET_SPEED_KMH * 0.8:
-            throttle = 0.7  # Strong acceleration if slow
-        elif speed < config.TARGET_SPEED_KMH:
-            throttle = 0.4  # Gentle acceleration if close to target
-        else:
-            throttle = 0.0  # Coast if at speed
-        
-        return carla.VehicleControl(throttle=throttle, steer=steer)
+        throttle, brake = self._longitudinal()
+        return carla.VehicleControl(throttle=throttle, steer=steer, brake=brake)
 
     def _drive_forward(self):
         """Fallback - drive straight with throttle."""
-        vel = self.ego.get_velocity()
-        speed = 3.6 * math.sqrt(vel.x**2 + vel.y**2)
-        
-        if speed < config.TARGET_SPEED_KMH * 0.8:
-            throttle = 0.7
-        elif speed < config.TARGET_SPEED_KMH:
-            throttle = 0.4
-        else:
-            throttle = 0.0
-            
-        return carla.VehicleControl(throttle=throttle, steer=0.0)
+        self._target = None
+        throttle, brake = self._longitudinal()
+        return carla.VehicleControl(throttle=throttle, steer=0.0, brake=brake)
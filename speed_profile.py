@@ -0,0 +1,104 @@
+
+import math
+import numpy as np
+import config
+
+
+def curvature(xy):
+    """Unsigned curvature (1/m) at each point of an (n, 2) polyline (Menger, 3-point)."""
+    k = np.zeros(len(xy))
+    if len(xy) < 3:
+        return k
+    a = xy[1:-1] - xy[:-2]
+    b = xy[2:] - xy[1:-1]
+    c = xy[2:] - xy[:-2]
+    cross = np.abs(a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0])
+    denom = np.hypot(*a.T) * np.hypot(*b.T) * np.hypot(*c.T)
+    k[1:-1] = np.divide(2.0 * cross, denom, out=np.zeros_like(cross), where=denom > 1e-9)
+    k[0], k[-1] = k[1], k[-2]
+    return k
+
+
+class SpeedProfile:
+    """Reference speed (m/s) sampled on a uniform arc-length grid. speed_at() is O(1)."""
+
+    def __init__(self, v, ds):
+        self.v = v
+        self.ds = ds
+        self._inv_ds = 1.0 / ds
+
+    def speed_at(self, s):
+        i = int(s * self._inv_ds)
+        return float(self.v[min(max(i, 0), len(self.v) - 1)])
+
+
+def build_profile(xy, s=None, v_max=None, a_lat=None, a_accel=None, a_decel=None,
+                  v_start=None, v_end=None, ds=None):
+    """Forward-backward speed profile along a path, run once per planned path.
+
+    Speeds are capped by v_max and by lateral acceleration in curves, then the
+    forward pass limits acceleration from v_start and the backward pass limits
+    deceleration into v_end. Both passes work on v^2, where each one is a
+    running minimum and vectorizes with np.minimum.accumulate.
+    """
+    v_max = (config.TARGET_SPEED_KMH / 3.6) if v_max is None else v_max
+    a_lat = a_lat or config.SPEED_A_LAT
+    a_accel = a_accel or config.SPEED_A_ACCEL
+    a_decel = a_decel or config.SPEED_A_DECEL
+    ds = ds or config.SPEED_PROFILE_DS
+
+    xy = np.asarray(xy, dtype=np.float64)
+    if s is None:
+        s = np.concatenate([[0.0], np.cumsum(np.hypot(*np.diff(xy, axis=0).T))]) if len(xy) > 1 else np.zeros(len(xy))
+    if len(xy) < 2 or s[-1] < ds:
+        return SpeedProfile(np.full(1, v_max), ds)
+
+    # Resample onto a uniform grid so lookups are a single index
+    grid = np.arange(0.0, s[-1] + ds, ds)
+    pts = np.column_stack([np.interp(grid, s, xy[:, 0]), np.interp(grid, s, xy[:, 1])])
+    # Curvature over a wider stencil: 1 m samples of a waypoint polyline are noisy
+    step = max(1, int(round(config.SPEED_CURV_BASE / ds)))
+    k = curvature(pts[::step])
+    k = np.interp(grid, grid[::step], k)
+
+    v2 = np.minimum(v_max**2, a_lat / np.maximum(k, 1e-6))
+    if v_start is not None:
+        v2[0] = min(v2[0], v_start**2)
+    if v_end is not None:
+        v2[-1] = min(v2[-1], v_end**2)
+
+    # Forward: v2[i] <= v2[j] + 2*a*ds*(i-j) for all j <= i
+    ramp = 2.0 * a_accel * ds * np.arange(len(v2))
+    v2 = np.minimum(v2, np.minimum.accumulate(v2 - ramp) + ramp)
+    # Backward: same with decel, walking from the end
+    ramp = 2.0 * a_decel * ds * np.arange(len(v2))
+    rev = v2[::-1]
+    v2 = np.minimum(rev, np.minimum.accumulate(rev - ramp) + ramp)[::-1]
+
+    return SpeedProfile(np.sqrt(np.maximum(v2, 0.0)), ds)
+
+
+def stop_speed(gap, target_speed=0.0, a_decel=None, margin=None):
+    """Highest speed (m/s) that can still brake to target_speed within gap metres.
+
+    Closed form of the backward pass for a single obstacle: v^2 = vt^2 + 2*a*d.
+    """
+    a_decel = a_decel or config.SPEED_A_DECEL
+    margin = config.SPEED_STOP_MARGIN if margin is None else margin
+    vt = max(target_speed, 0.0)
+    return math.sqrt(vt * vt + 2.0 * a_decel * max(gap - margin, 0.0))
+
+
+def longitudinal(speed, v_ref, gap=None):
+    """(throttle, brake) tracking v_ref (m/s) from the current speed (m/s).
+
+    Within SPEED_STOP_MARGIN of a radar target (gap, m) it never accelerates
+    and brakes on any overspeed, deadband or not.
+    """
+    err = v_ref - speed
+    if gap is not None and gap < config.SPEED_STOP_MARGIN:
+        return 0.0, (min(1.0, config.LONG_STOP_BRAKE - config.LONG_KB * err) if err <= 0.0 else 0.0)
+    if err < -config.LONG_BRAKE_DEADBAND:
+        return 0.0, min(1.0, config.LONG_KB * (-err - config.LONG_BRAKE_DEADBAND))
+    ff = config.LONG_THROTTLE_FF if v_ref > 0.1 else 0.0
+    return min(config.LONG_THROTTLE_MAX, max(0.0, ff + config.LONG_KP * err)), 0.0
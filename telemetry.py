@@ -0,0 +1,123 @@
+
+import json
+import os
+import numpy as np
+import config
+
+# Column layout of a run directory: one raw little-endian file per column
+COLUMNS = [
+    ("frame", "<i8"),
+    ("sim_time", "<f8"),
+    ("x", "<f4"),
+    ("y", "<f4"),
+    ("z", "<f4"),
+    ("yaw", "<f4"),
+    ("speed", "<f4"),       # m/s
+    ("radar_dist", "<f4"),  # m (999 = nothing in lane)
+    ("radar_vel", "<f4"),   # m/s, radial velocity of closest target
+    ("state", "<u1"),       # Index into meta["states"]
+    ("ttc", "<f4"),         # s (inf = no closing target)
+    ("throttle", "<f4"),
+    ("steer", "<f4"),
+    ("brake", "<f4"),
+    ("radar_pts", "<u4"),   # Radar points received this tick (all units)
+]
+
+META_FILE = "meta.json"
+
+
+class TickRecorder:
+    """Columnar per-tick telemetry recorder.
+
+    Each tick writes into preallocated NumPy column buffers. When a chunk is
+    full it is appended to the per-column files on disk, so memory stays at
+    one chunk no matter how long the run is. Read back with load_run().
+    """
+
+    def __init__(self, out_dir, chunk_size=None):
+        self.out_dir = out_dir
+        self.chunk_size = chunk_size or config.TELEMETRY_CHUNK
+        os.makedirs(out_dir, exist_ok=True)
+
+        self.cols = {name: np.zeros(self.chunk_size, dtype=dt) for name, dt in COLUMNS}
+        self._files = {name: open(os.path.join(out_dir, name + ".bin"), "ab") for name, _ in COLUMNS}
+        self.states = []
+        self._state_codes = {}
+        self.n = 0       # Rows in current chunk
+        self.rows = 0    # Rows on disk
+        self._write_meta()
+
+    def record(self, frame, sim_time, transform, speed, radar_dist, radar_vel, state, ttc, control, radar_pts=0):
+        code = self._state_codes.get(state)
+        if code is None:
+            code = self._state_codes[state] = len(self.states)
+            self.states.append(state)
+
+        i = self.n
+        c = self.cols
+        loc = transform.location
+        c["frame"][i] = frame
+        c["sim_time"][i] = sim_time
+        c["x"][i] = loc.x
+        c["y"][i] = loc.y
+        c["z"][i] = loc.z
+        c["yaw"][i] = transform.rotation.yaw
+        c["speed"][i] = speed
+        c["radar_dist"][i] = radar_dist
+        c["radar_vel"][i] = radar_vel
+        c["state"][i] = code
+        c["ttc"][i] = ttc
+        c["throttle"][i] = control.throttle
+        c["steer"][i] = control.steer
+        c["brake"][i] = control.brake
+        c["radar_pts"][i] = radar_pts
+
+        self.n += 1
+        if self.n == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.n == 0:
+            return
+        for name, f in self._files.items():
+            self.cols[name][:self.n].tofile(f)
+            f.flush()
+        self.rows += self.n
+        self.n = 0
+        self._write_meta()
+
+    def _write_meta(self):
+        meta = {
+            "rows": self.rows,
+            "columns": [[name, dt] for name, dt in COLUMNS],
+            "states": self.states,
+            "fixed_delta_seconds": config.FIXED_DELTA_SECONDS,
+        }
+        tmp = os.path.join(self.out_dir, META_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.out_dir, META_FILE))
+
+    def close(self):
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+
+def load_run(out_dir):
+    """Memory-map a recorded run. Returns (columns, meta); no data is copied.
+
+    Only rows committed in meta.json are exposed, so it is safe to open a run
+    that is still being recorded.
+    """
+    with open(os.path.join(out_dir, META_FILE)) as f:
+        meta = json.load(f)
+    rows = meta["rows"]
+    cols = {}
+    for name, dt in meta["columns"]:
+        if rows == 0:
+            cols[name] = np.zeros(0, dtype=dt)
+        else:
+            cols[name] = np.memmap(os.path.join(out_dir, name + ".bin"), dtype=dt, mode="r", shape=(rows,))
+    return cols, meta
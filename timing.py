@@ -0,0 +1,36 @@
+
+import time
+from contextlib import contextmanager
+from event_log import event
+
+
+class StageTimer:
+    """Collects (stage, seconds) pairs and reports a timing breakdown."""
+
+    def __init__(self):
+        self.stages = []
+        self.t0 = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - t0))
+
+    def timed(self, name, fn, *args, **kwargs):
+        """Run fn and record its duration (safe to call from worker threads)."""
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.stages.append((name, time.perf_counter() - t0))
+
+    def elapsed(self):
+        return time.perf_counter() - self.t0
+
+    def report(self, title):
+        event("timing", "⏱️ {}: {:.0f}ms total", title, self.elapsed() * 1000.0)
+        for name, secs in self.stages:
+            event("timing", "   {:<28} {:8.1f}ms", name, secs * 1000.0)
@@ -0,0 +1,63 @@
+
+import argparse
+import random
+import sys
+import time
+import numpy as np
+
+# --fake must swap in the stand-in before anything imports carla
+if "--fake" in sys.argv:
+    import fake_carla
+    fake_carla.install()
+
+import carla
+import config
+import utils
+import event_log
+from traffic_spawner import TrafficSpawner
+
+
+def ramp(client, levels, ticks=300, seed=0):
+    """Server step time as traffic grows: [(vehicles, mean ms, p95 ms)] per level."""
+    world = utils.setup_world(client)
+    rng = random.Random(seed)
+    ego = utils.spawn_safe_ego(world, rng=rng)
+    spawner = TrafficSpawner(world, ego, rng=rng, client=client)
+    spawner.tm.set_random_device_seed(seed)
+    out = []
+    try:
+        for level in levels:
+            if level > len(spawner.spawned):
+                spawner.populate(level - len(spawner.spawned))
+            world.tick()  # Batch-spawned actors appear on the next tick
+            secs = np.empty(ticks)
+            for i in range(ticks):
+                t0 = time.perf_counter()
+                world.tick()
+                secs[i] = time.perf_counter() - t0
+            out.append((len(spawner.spawned), secs.mean() * 1000.0, np.percentile(secs, 95) * 1000.0))
+    finally:
+        spawner.destroy()
+        ego.destroy()
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server step time vs. background traffic density")
+    parser.add_argument("--levels", type=int, nargs="+", default=[0, 50, 100, 200, 300], help="Vehicle counts")
+    parser.add_argument("--ticks", type=int, default=300, help="Ticks timed per level")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fake", action="store_true", help="Run against fake_carla (no server)")
+    args = parser.parse_args()
+
+    client = carla.Client(config.HOST, config.PORT)
+    client.set_timeout(config.TIMEOUT)
+    try:
+        for n, mean, p95 in ramp(client, sorted(args.levels), args.ticks, args.seed):
+            print(f"🚦 {n:4d} vehicles: step {mean:7.2f}ms mean, {p95:7.2f}ms p95 ({1000.0 / mean:6.1f} steps/s)")
+    finally:
+        event_log.shutdown()
+
+
+if __name__ == "__main__":
+    main()
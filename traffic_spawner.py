@@ -1,22 +1,120 @@
 import random
 import time
+import numpy as np
 import carla
+import config
+import utils
+from event_log import event
 
 class TrafficSpawner:
-    def __init__(self, world, ego_vehicle):
+    """Background autopilot traffic on one Traffic Manager.
+
+    With a client, the TM is set up for density: synchronous, hybrid physics
+    (full physics only within TRAFFIC_HYBRID_RADIUS of the 'hero' ego) and
+    populate() registers vehicles in SpawnActor+SetAutopilot batches. tick()
+    also trickles single vehicles near the ego up to MAX_VEHICLES.
+    """
+
+    def __init__(self, world, ego_vehicle, rng=None, tm_port=None, client=None):
         self.world = world
         self.ego = ego_vehicle
-        self.blueprints = world.get_blueprint_library().filter("vehicle.*")
+        self.rng = rng or random
+        self.tm_port = tm_port or config.TM_PORT
+        self.client = client
+        self.tm = None
+        self.blueprints = utils.get_blueprint_library(world).filter("vehicle.*")
         self.spawned = []
         self.last_spawn_time = 0.0
+        self.step_times = []  # (vehicles, world.tick seconds)
+        self.last_report_time = 0.0
+        if client is not None:
+            self.tm = client.get_trafficmanager(self.tm_port)
+            self.configure_tm()
 
         self.SPAWN_INTERVAL = 5.0
         self.MAX_VEHICLES = 10
         self.MIN_DISTANCE = 20.0
         self.MAX_DISTANCE = 60.0
 
+    def configure_tm(self):
+        self.tm.set_synchronous_mode(config.SYNC_MODE)
+        self.tm.set_hybrid_physics_mode(True)
+        self.tm.set_hybrid_physics_radius(config.TRAFFIC_HYBRID_RADIUS)
+        self.tm.set_global_distance_to_leading_vehicle(config.TRAFFIC_LEADING_DISTANCE)
+
+    def populate(self, count, batch_size=None):
+        """Spawn up to count autopilot vehicles on free spawn points, batch_size commands per RPC."""
+        batch_size = batch_size or config.TRAFFIC_BATCH_SIZE
+        ego_loc = self.ego.get_location()
+        taken = [v.get_location() for v in self.spawned]
+        points = [sp for sp in utils.get_map(self.world).get_spawn_points()
+                  if sp.location.distance(ego_loc) > self.MIN_DISTANCE
+                  and all(sp.location.distance(loc) > 5.0 for loc in taken)]
+        self.rng.shuffle(points)
+        points = points[:count]
+        if len(points) < count:
+            event("spawn", "⚠️  Only {} free spawn points for {} vehicles", len(points), count)
+
+        t0 = time.perf_counter()
+        failed = 0
+        for i in range(0, len(points), batch_size):
+            batch = [carla.command.SpawnActor(self.rng.choice(self.blueprints), sp)
+                     .then(carla.command.SetAutopilot(carla.command.FutureActor, True, self.tm_port))
+                     for sp in points[i:i + batch_size]]
+            ids = []
+            for response in self.client.apply_batch_sync(batch, False):
+                if response.has_error():
+                    failed += 1
+                else:
+                    ids.append(response.actor_id)
+            self.spawned.extend(self.world.get_actors(ids))
+        event("spawn", "🚗 Traffic: {} vehicles in {:.0f}ms ({} failed), TM port {}",
+              len(self.spawned), (time.perf_counter() - t0) * 1000.0, failed, self.tm_port)
+        return len(self.spawned)
+
+    def resize(self, count):
+        """Populate up to count vehicles, or destroy the most recent ones beyond it."""
+        if count > len(self.spawned):
+            return self.populate(count - len(self.spawned))
+        extra, self.spawned = self.spawned[count:], self.spawned[:count]
+        self._destroy(extra)
+        return len(self.spawned)
+
+    def destroy(self):
+        self._destroy(self.spawned)
+        self.spawned = []
+
+    def _destroy(self, vehicles):
+        if self.client is not None:
+            self.client.apply_batch([carla.command.DestroyActor(v.id) for v in vehicles])
+        else:
+            for v in vehicles:
+                v.destroy()
+
+    def record_step(self, seconds):
+        """Log one world.tick() duration against the current vehicle count."""
+        self.step_times.append((len(self.spawned), seconds))
+        now = utils.sim_time(self.world)
+        if now - self.last_report_time >= config.TRAFFIC_REPORT_INTERVAL:
+            self.last_report_time = now
+            recent = [s for _, s in self.step_times[-int(config.TRAFFIC_REPORT_INTERVAL
+                                                          / config.FIXED_DELTA_SECONDS):]]
+            event("traffic", "🚦 {} vehicles | server step {:.1f}ms (p95 {:.1f}ms)", len(self.spawned),
+                  np.mean(recent) * 1000.0, np.percentile(recent, 95) * 1000.0)
+
+    def report(self):
+        """Server step time per vehicle count seen."""
+        if not self.step_times:
+            return
+        counts = np.array([n for n, _ in self.step_times])
+        secs = np.array([s for _, s in self.step_times]) * 1000.0
+        for n in np.unique(counts):
+            s = secs[counts == n]
+            event("traffic", "🚦 {:4d} vehicles: step {:6.1f}ms mean, {:6.1f}ms p95 ({} ticks)",
+                  int(n), s.mean(), np.percentile(s, 95), len(s))
+
     def tick(self):
-        now = time.time()
+        now = utils.sim_time(self.world)
 
         if now - self.last_spawn_time < self.SPAWN_INTERVAL:
             return
@@ -32,14 +130,14 @@ class TrafficSpawner:
         ego_tf = self.ego.get_transform()
         ego_loc = ego_tf.location
 
-        world_map = self.world.get_map()
+        world_map = utils.get_map(self.world)
         ego_wp = world_map.get_waypoint(ego_loc)
 
         if ego_wp is None:
             return
 
-        direction = random.choice(["forward", "forward", "forward", "backward"])
-        dist = random.uniform(self.MIN_DISTANCE, self.MAX_DISTANCE)
+        direction = self.rng.choice(["forward", "forward", "forward", "backward"])
+        dist = self.rng.uniform(self.MIN_DISTANCE, self.MAX_DISTANCE)
 
         if direction == "forward":
             candidates = ego_wp.next(dist)
@@ -49,9 +147,9 @@ class TrafficSpawner:
         if not candidates:
             return
 
-        wp = random.choice(candidates)
+        wp = self.rng.choice(candidates)
 
-        lane_choice = random.choice(["same", "left", "right"])
+        lane_choice = self.rng.choice(["same", "left", "right"])
 
         if lane_choice == "left" and wp.get_left_lane():
             wp = wp.get_left_lane()
@@ -61,11 +159,12 @@ class TrafficSpawner:
         transform = wp.transform
         transform.location.z += 0.5
 
-        bp = random.choice(self.blueprints)
+        bp = self.rng.choice(self.blueprints)
 
         vehicle = self.world.try_spawn_actor(bp, transform)
 
         if vehicle:
-            vehicle.set_autopilot(True)
+            vehicle.set_autopilot(True, self.tm_port)
             self.spawned.append(vehicle)
-            print("🚗 Spawned traffic vehicle")
+            event("spawn", "🚗 Spawned traffic vehicle")
+
@@ -1,15 +1,74 @@
 
 import carla
 import random
-import time
 import config
+from concurrent.futures import ThreadPoolExecutor
+from event_log import event
+from timing import StageTimer
+from route_planner import RoutePlanner
 
-def setup_world(client):
-    """Resets world settings and performs Nuclear Cleanup."""
-    world = client.get_world()
-    
-    # 1. Nuclear Cleanup
-    print("☢️  Nuclear Cleanup: Destroying all actors...")
+# Per-world caches. get_map() downloads and parses the OpenDRIVE, so it is
+# fetched once per world (world.id changes on map reload).
+_MAP_CACHE = {}
+_BP_CACHE = {}
+_SPAWN_CACHE = {}
+_POINTS_CACHE = {}
+_ROUTE_CACHE = {}
+
+def get_map(world):
+    """Cached world.get_map()."""
+    m = _MAP_CACHE.get(world.id)
+    if m is None:
+        m = _MAP_CACHE[world.id] = world.get_map()
+    return m
+
+def get_blueprint_library(world):
+    """Cached world.get_blueprint_library()."""
+    lib = _BP_CACHE.get(world.id)
+    if lib is None:
+        lib = _BP_CACHE[world.id] = world.get_blueprint_library()
+    return lib
+
+def get_route_planner(world):
+    """Cached RoutePlanner (lane graph is built once per world)."""
+    planner = _ROUTE_CACHE.get(world.id)
+    if planner is None:
+        planner = _ROUTE_CACHE[world.id] = RoutePlanner(get_map(world))
+    return planner
+
+def get_spawn_points(world):
+    """Cached map.get_spawn_points()."""
+    points = _POINTS_CACHE.get(world.id)
+    if points is None:
+        points = _POINTS_CACHE[world.id] = get_map(world).get_spawn_points()
+    return points
+
+def multi_lane_spawns(world):
+    """Spawn points with a drivable neighbour lane: [(transform, has_left, has_right)]."""
+    spawns = _SPAWN_CACHE.get(world.id)
+    if spawns is None:
+        curr_map = get_map(world)
+        spawns = []
+        for sp in curr_map.get_spawn_points():
+            wp = curr_map.get_waypoint(sp.location)
+            # Check Neighbors
+            left = wp.get_left_lane()
+            right = wp.get_right_lane()
+            
+            has_left = bool(left and left.lane_type == carla.LaneType.Driving)
+            has_right = bool(right and right.lane_type == carla.LaneType.Driving)
+            if has_left or has_right:
+                spawns.append((sp, has_left, has_right))
+        _SPAWN_CACHE[world.id] = spawns
+    return spawns
+
+def _prefetch_map(world, timer):
+    # Chained: both later steps need the map
+    timer.timed("get_map", get_map, world)
+    timer.timed("spawn_scan", multi_lane_spawns, world)
+    timer.timed("route_graph", get_route_planner, world)
+
+def _nuclear_cleanup(client, world):
     batch = []
     for actor in world.get_actors().filter('vehicle.*'):
         batch.append(carla.command.DestroyActor(actor))
@@ -17,7 +76,7 @@ def setup_world(client):
         batch.append(carla.command.DestroyActor(actor))
     if batch: client.apply_batch(batch)
 
-    # 2. Sync Settings (30Hz)
+def _apply_settings(world):
     settings = world.get_settings()
     settings.synchronous_mode = config.SYNC_MODE
     settings.fixed_delta_seconds = config.FIXED_DELTA_SECONDS
@@ -25,67 +84,101 @@ def setup_world(client):
     settings.max_substep_delta_time = 0.02
     settings.max_substeps = 10
     world.apply_settings(settings)
-    
-    # Spectrum Setup
+
+def _unload_layers(world):
     try:
         world.unload_map_layer(carla.MapLayer.Foliage)
         world.unload_map_layer(carla.MapLayer.Buildings)
         world.unload_map_layer(carla.MapLayer.ParkedVehicles)
     except: pass
 
+def setup_world(client, timer=None, prefetch=True):
+    """Resets world settings and performs Nuclear Cleanup.
+    
+    The independent setup RPCs (cleanup, settings, layer unloads) run
+    concurrently, together with the map/blueprint/spawn-point prefetch used
+    by the spawners. Per-step durations are recorded on timer if given.
+    """
+    timer = timer or StageTimer()
+    world = timer.timed("get_world", client.get_world)
+    
+    event("setup", "☢️  Nuclear Cleanup: Destroying all actors...")
+    jobs = [
+        ("nuclear_cleanup", _nuclear_cleanup, client, world),
+        ("apply_settings", _apply_settings, world),
+        ("unload_layers", _unload_layers, world),
+    ]
+    if prefetch:
+        jobs += [
+            ("map prefetch (wall)", _prefetch_map, world, timer),
+            ("blueprint_library", get_blueprint_library, world),
+        ]
+    
+    if config.SETUP_PARALLEL:
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            futures = [pool.submit(timer.timed, name, fn, *args) for name, fn, *args in jobs]
+            for f in futures:
+                f.result()
+    else:
+        for name, fn, *args in jobs:
+            timer.timed(name, fn, *args)
+
     return world
 
-def spawn_safe_ego(world):
-    """Spawns Ego ONLY on multi-lane roads."""
-    bp = world.get_blueprint_library().filter(config.EGO_FILTER)[0]
-    points = world.get_map().get_spawn_points()
-    random.shuffle(points)
+def spawn_safe_ego(world, rng=None, episode=None):
+    """Spawns Ego ONLY on multi-lane roads.
     
-    ego = None
-    curr_map = world.get_map()
+    Pass a seeded random.Random as rng for a reproducible spawn; the chosen
+    spawn is recorded on episode if given.
+    """
+    rng = rng or random
+    bp = get_blueprint_library(world).filter(config.EGO_FILTER)[0]
+    bp.set_attribute('role_name', 'hero') # Centre of the TM hybrid physics radius
+    points = list(multi_lane_spawns(world))
+    rng.shuffle(points)
     
-    for sp in points:
-        wp = curr_map.get_waypoint(sp.location)
-        # Check Neighbors
-        left = wp.get_left_lane()
-        right = wp.get_right_lane()
-        
-        has_left = left and left.lane_type == carla.LaneType.Driving
-        has_right = right and right.lane_type == carla.LaneType.Driving
-        
-        if (has_left or has_right):
-            ego = world.try_spawn_actor(bp, sp)
-            if ego:
-                print(f"✅ Safe Spawn: Multi-Lane (L:{has_left} R:{has_right})")
-                return ego
+    for sp, has_left, has_right in points:
+        ego = world.try_spawn_actor(bp, sp)
+        if ego:
+            event("spawn", "✅ Safe Spawn: Multi-Lane (L:{} R:{})", has_left, has_right)
+            if episode: episode.add_actor("ego", bp.id, sp)
+            return ego
                 
     raise RuntimeError("❌ Could not find a safe multi-lane spawn point!")
 
-def spawn_obstacle(world, ego, distance=100.0):
-    """Spawns a static obstacle ahead."""
-    bp = world.get_blueprint_library().filter(config.OBSTACLE_FILTER)[0]
-    bp.set_attribute('role_name', 'obstacle')
-    
-    ego_loc = ego.get_location()
-    wp = world.get_map().get_waypoint(ego_loc)
+def _obstacle_transform(world, ego, distance):
+    wp = get_map(world).get_waypoint(ego.get_location())
     
     # Scan ahead
     targets = wp.next(distance)
     if not targets: return None
     
-    target_wp = targets[0]
-    transform = target_wp.transform
+    transform = targets[0].transform
     transform.location.z += 0.5 # Drop prevention
+    return transform
+
+def spawn_obstacle(world, ego, distance=100.0, episode=None):
+    """Spawns a static obstacle ahead."""
+    bp = get_blueprint_library(world).filter(config.OBSTACLE_FILTER)[0]
+    bp.set_attribute('role_name', 'obstacle')
+    
+    transform = _obstacle_transform(world, ego, distance)
+    if transform is None: return None
     
     obs = world.try_spawn_actor(bp, transform)
     if obs:
         obs.set_simulate_physics(True) # Physics on but Handbrake
         control = carla.VehicleControl(hand_brake=True)
         obs.apply_control(control)
-        print(f"⚠️  Obstacle Spawned at {distance}m")
+        event("spawn", "⚠️  Obstacle Spawned at {}m", distance)
+        if episode: episode.add_actor("obstacle", bp.id, transform)
     
     return obs
 
+def sim_time(world):
+    """Simulation clock (s). Deterministic in synchronous mode, unlike time.time()."""
+    return world.get_snapshot().timestamp.elapsed_seconds
+
 def update_spectator(world, ego):
     """Updates spectator camera to follow ego vehicle."""
     spectator = world.get_spectator()
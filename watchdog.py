@@ -0,0 +1,107 @@
+
+import time
+import config
+from event_log import event
+
+
+class TickWatchdog:
+    """Per-frame deadline tracking for the control loop.
+
+    Stages are tagged when they run: critical stages always run, deferrable
+    ones are skipped when their expected cost (EMA of past runs) does not fit
+    in what is left of the frame budget. A skipped stage returns its previous
+    result. A stage skipped WATCHDOG_MAX_SKIPS frames in a row runs anyway, so
+    it is never starved. Frames that skipped something or blew the budget are
+    counted.
+
+    Skips are logged per frame (skip_log, saved with episodes). A watchdog
+    built with skips=<a recorded skip_log> ignores the budget and skips
+    exactly those stages on those frames, so replays take the same path.
+    """
+
+    def __init__(self, budget=None, reserve=None, metrics=None, skips=None):
+        self.budget = budget or config.FIXED_DELTA_SECONDS
+        self.reserve = config.WATCHDOG_RESERVE if reserve is None else reserve
+        self.metrics = metrics  # metrics.Metrics: stage and frame latencies
+        self.t0 = None
+        self.frames = 0
+        self.degraded = 0   # Frames with at least one skipped stage
+        self.overruns = 0   # Frames that took longer than the budget
+        self.cost = {}      # Stage -> EMA seconds
+        self.runs = {}
+        self.skips = {}
+        self._streak = {}   # Consecutive skips per stage
+        self._last = {}
+        self._skipped = False
+        self.skip_log = {}  # Stage -> frames it was skipped on
+        self._forced = None if skips is None else {k: set(v) for k, v in skips.items()}
+
+    def begin(self):
+        self.t0 = time.perf_counter()
+        self._skipped = False
+
+    def remaining(self):
+        if self.t0 is None:
+            return float("inf")
+        return self.budget - (time.perf_counter() - self.t0)
+
+    def _run(self, name, fn, args, kwargs):
+        t0 = time.perf_counter()
+        result = fn(*args, **kwargs)
+        dt = time.perf_counter() - t0
+        prev = self.cost.get(name)
+        self.cost[name] = dt if prev is None else prev + config.WATCHDOG_EMA * (dt - prev)
+        self.runs[name] = self.runs.get(name, 0) + 1
+        self._last[name] = result
+        if self.metrics is not None:
+            self.metrics.observe("agent_stage_seconds", dt, stage=name)
+        return result
+
+    def critical(self, name, fn, *args, **kwargs):
+        """Always runs (radar distance, emergency brake, ...)."""
+        return self._run(name, fn, args, kwargs)
+
+    def deferrable(self, name, fn, *args, fallback=None, reuse=True, **kwargs):
+        """Runs only if it fits the remaining budget.
+
+        A skipped stage returns its last result (or fallback with reuse=False).
+        """
+        streak = self._streak.get(name, 0)
+        if self._forced is not None:
+            skip = self.frames in self._forced.get(name, ())
+        else:
+            skip = streak < config.WATCHDOG_MAX_SKIPS and self.cost.get(name, 0.0) > self.remaining() - self.reserve
+        if skip:
+            self.skip_log.setdefault(name, []).append(self.frames)
+            self._streak[name] = streak + 1
+            self.skips[name] = self.skips.get(name, 0) + 1
+            self._skipped = True
+            return self._last.get(name, fallback) if reuse else fallback
+        self._streak[name] = 0
+        return self._run(name, fn, args, kwargs)
+
+    def end(self):
+        """Close the frame. Returns True if it was degraded or over budget."""
+        if self.t0 is None:
+            return False
+        elapsed = time.perf_counter() - self.t0
+        over = elapsed > self.budget
+        self.frames += 1
+        self.overruns += over
+        self.degraded += self._skipped
+        self.t0 = None
+        if self.metrics is not None:
+            self.metrics.observe("agent_stage_seconds", elapsed, stage="frame")
+        if self._skipped or over:
+            event("watchdog", "⏰ Degraded frame {}: {:.1f}ms of {:.0f}ms{}", self.frames,
+                  elapsed * 1000.0, self.budget * 1000.0, " (stages skipped)" if self._skipped else "")
+        return self._skipped or over
+
+    def report(self):
+        if not self.frames:
+            return
+        event("timing", "⏰ Watchdog: {} frames, {} degraded, {} over budget",
+              self.frames, self.degraded, self.overruns)
+        for name in sorted(self.cost):
+            event("timing", "   {:<20} {:7.2f}ms avg, {} runs, {} skipped", name,
+                  self.cost[name] * 1000.0, self.runs.get(name, 0), self.skips.get(name, 0))